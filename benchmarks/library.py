@@ -0,0 +1,139 @@
+"""
+Synthetic media libraries for the benchmarks.
+
+The same spec and seed always generate the same tree, so timings can be compared between runs.
+"""
+import io
+import json
+import math
+import os
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from pydantic import BaseModel
+
+SPEC_FILENAME = ".library.json"
+
+_DATE_PLACEHOLDER = b"2000:01:01 00:00:00"
+_ID_PLACEHOLDER = b"#" * 32
+
+_template = None
+
+
+class LibrarySpec(BaseModel):
+    files: int = 10_000
+    seed: int = 0
+    # directory tree shape, files get spread over `fanout ** depth` leaf directories
+    depth: int = 3
+    fanout: int = 10
+    # file sizes follow a log-normal distribution
+    median_size: int = 4_000
+    size_sigma: float = 1.0
+    max_size: int = 10_000_000
+    # share of files which are copies of an earlier file
+    duplicate_ratio: float = 0.1
+    # share of files which are images, the rest are plain binary files
+    image_ratio: float = 0.8
+    # share of images with an EXIF creation date
+    exif_ratio: float = 0.7
+    date_from: datetime = datetime(2010, 1, 1)
+    date_to: datetime = datetime(2024, 1, 1)
+
+    def leaf_directories(self):
+        return max(self.fanout ** self.depth, 1)
+
+
+def _image_template():
+    """
+    Tiny JPEG with placeholders for its EXIF date and a unique id, filled in for each generated image
+    """
+    global _template
+    if _template is None:
+        from PIL import Image
+
+        image = Image.new("RGB", (8, 8), color=(200, 120, 40))
+        exif = Image.Exif()
+        exif[0x0132] = _DATE_PLACEHOLDER.decode()  # DateTime
+        exif[0x010E] = _ID_PLACEHOLDER.decode()  # ImageDescription
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", exif=exif.tobytes())
+        _template = buffer.getvalue()
+    return _template
+
+
+def _plain_image_template():
+    template = _image_template()
+    return template.replace(_DATE_PLACEHOLDER, b"----:--:-- --:--:--")
+
+
+def _relative_directory(rng: random.Random, spec: LibrarySpec) -> Path:
+    parts = [f"dir_{rng.randrange(spec.fanout):03d}" for _ in range(spec.depth)]
+    return Path(*parts)
+
+
+def _file_size(rng: random.Random, spec: LibrarySpec) -> int:
+    size = int(rng.lognormvariate(math.log(spec.median_size), spec.size_sigma))
+    return min(max(size, 1), spec.max_size)
+
+
+def _random_date(rng: random.Random, spec: LibrarySpec) -> datetime:
+    seconds = int((spec.date_to - spec.date_from).total_seconds())
+    return spec.date_from + timedelta(seconds=rng.randrange(seconds))
+
+
+def _file_content(rng: random.Random, spec: LibrarySpec, index: int):
+    size = _file_size(rng, spec)
+    if rng.random() >= spec.image_ratio:
+        return "bin", rng.randbytes(size)
+
+    unique_id = f"{spec.seed:08x}{index:024x}".encode()
+    if rng.random() < spec.exif_ratio:
+        date = _random_date(rng, spec).strftime("%Y:%m:%d %H:%M:%S").encode()
+        content = _image_template().replace(_DATE_PLACEHOLDER, date)
+    else:
+        content = _plain_image_template()
+    content = content.replace(_ID_PLACEHOLDER, unique_id)
+    # bytes after the end of image marker are ignored by decoders
+    return "jpg", content + rng.randbytes(max(size - len(content), 0))
+
+
+def generate_library(path: Path, spec: LibrarySpec) -> Path:
+    """
+    Writes a library following `spec` into `path`, a library already generated there with the same spec is reused.
+    """
+    path = Path(path)
+    spec_path = path.joinpath(SPEC_FILENAME)
+    if spec_path.exists() and LibrarySpec.parse_file(spec_path) == spec:
+        return path
+
+    path.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(spec.seed)
+    written = []  # content of a sample of files, duplicates are picked from it
+    for index in range(spec.files):
+        directory = path.joinpath(_relative_directory(rng, spec))
+        if written and rng.random() < spec.duplicate_ratio:
+            extension, content = rng.choice(written)
+        else:
+            extension, content = _file_content(rng, spec, index)
+            if len(written) < 1000:
+                written.append((extension, content))
+            else:
+                written[rng.randrange(len(written))] = (extension, content)
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory.joinpath(f"file_{index:07d}.{extension}"), "wb") as fd:
+            fd.write(content)
+
+    with open(spec_path, "w") as fd:
+        fd.write(spec.json())
+    return path
+
+
+def library_files(path: Path):
+    """
+    Files of a generated library, leaving out its spec
+    """
+    for dirpath, dirnames, filenames in os.walk(path):
+        for filename in filenames:
+            if filename != SPEC_FILENAME:
+                yield Path(dirpath).joinpath(filename)
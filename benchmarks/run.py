@@ -0,0 +1,338 @@
+"""
+Times the main operations over synthetic libraries and records the results.
+
+    python -m benchmarks.run --files 10000 --files 100000 --files 1000000  # or python benchmarks/run.py
+
+Every run gets appended to a JSON lines file and compared with the previous run of the same case and spec.
+"""
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import click
+from click.testing import CliRunner
+from rich import box
+from rich.console import Console
+from rich.table import Table
+
+if not __package__:
+    # run as a script rather than with `-m`
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.library import LibrarySpec, generate_library, library_files
+
+RESULTS_PATH = Path(__file__).parent.joinpath("results.jsonl")
+DEFAULT_SIZES = (10_000,)
+REGRESSION_THRESHOLD = 0.2
+
+console = Console()
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ("git", "rev-parse", "--short", "HEAD"),
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _invoke(storage_path: Path, *args):
+    from cataloguer.cli import cli
+
+    result = CliRunner().invoke(
+        cli,
+        ("--no-interactive", *args),
+        env={"CATALOGUER_STORAGE_LOCATION": str(storage_path)},
+        catch_exceptions=False,
+    )
+    if result.exit_code != 0:
+        raise click.ClickException(f"{args} failed: {result.output}")
+
+
+def bench_explore(library_path, workdir):
+    from cataloguer.filesystem.directory import Directory
+
+    Directory.from_path(library_path)
+
+
+def bench_detect_duplicates(library_path, workdir):
+    from cataloguer.filesystem.directory import Directory
+
+    Directory.from_path(library_path).detect_duplicates()
+
+
+def bench_inspect(library_path, workdir):
+    _invoke(workdir.joinpath("storage"), "inspect", str(library_path))
+
+
+def bench_copy(library_path, workdir):
+    workdir.joinpath("copied").mkdir(exist_ok=True)
+    _invoke(
+        workdir.joinpath("storage"),
+        "--format-pattern",
+        "%Y/%m/{file}",
+        "--unknown-format-pattern",
+        "unknown/{file}",
+        "copy",
+        str(library_path),
+        str(workdir.joinpath("copied")),
+    )
+
+
+def bench_move(library_path, workdir):
+    # moves what the copy case left behind, so the generated library is kept intact
+    source_path = workdir.joinpath("copied")
+    if not source_path.exists():
+        bench_copy(library_path, workdir)
+    workdir.joinpath("moved").mkdir(exist_ok=True)
+    _invoke(
+        workdir.joinpath("storage"),
+        "--format-pattern",
+        "{relative_path}/{file}",
+        "move",
+        str(source_path),
+        str(workdir.joinpath("moved")),
+    )
+
+
+def bench_catalogue_save(library_path, workdir):
+    from cataloguer.storage import Storage
+    from cataloguer.filesystem.directory import Catalogue
+
+    catalogue = Catalogue(
+        name="benchmark",
+        path=library_path,
+        creation_date=datetime.now(tz=timezone.utc),
+        format_pattern="%Y/%m/{file}",
+    )
+    catalogue.explore()
+    Storage(path=workdir.joinpath("storage")).save_catalogue(catalogue)
+
+
+def bench_catalogue_load(library_path, workdir):
+    from cataloguer.storage import Storage
+
+    storage = Storage(path=workdir.joinpath("storage"))
+    if not storage.path.joinpath("benchmark.json").exists():
+        bench_catalogue_save(library_path, workdir)
+    catalogue = storage.load_catalogue("benchmark", force_reload=False)
+    catalogue.ensure_loaded()
+
+
+CASES = {
+    "explore": bench_explore,
+    "detect_duplicates": bench_detect_duplicates,
+    "inspect": bench_inspect,
+    "copy": bench_copy,
+    "move": bench_move,
+    "catalogue_save": bench_catalogue_save,
+    "catalogue_load": bench_catalogue_load,
+}
+
+
+def run_case(name, library_path: Path, workdir: Path, repeat=1):
+    """
+    Best wall time out of `repeat` runs, each one starting from the same state
+    """
+    timings = []
+    for _ in range(repeat):
+        case_workdir = workdir.joinpath(name)
+        shutil.rmtree(case_workdir, ignore_errors=True)
+        case_workdir.joinpath("storage").mkdir(parents=True)
+        if name == "catalogue_load":
+            bench_catalogue_save(library_path, case_workdir)
+        elif name == "move":
+            bench_copy(library_path, case_workdir)
+        start = time.perf_counter()
+        CASES[name](library_path, case_workdir)
+        timings.append(time.perf_counter() - start)
+    shutil.rmtree(workdir.joinpath(name), ignore_errors=True)
+    return min(timings)
+
+
+def load_results(results_path: Path):
+    if not results_path.exists():
+        return []
+    with open(results_path) as fd:
+        return [json.loads(line) for line in fd if line.strip()]
+
+
+def previous_result(results, result):
+    for previous in reversed(results):
+        if previous["case"] == result["case"] and previous["spec"] == result["spec"]:
+            return previous
+    return None
+
+
+def run_benchmarks(
+    sizes,
+    cases,
+    library_root: Path,
+    results_path: Path,
+    spec_overrides=None,
+    repeat=1,
+):
+    results = load_results(results_path)
+    revision = _git_revision()
+    new_results = []
+    for size in sizes:
+        spec = LibrarySpec(**{**(spec_overrides or {}), "files": size})
+        library_path = library_root.joinpath(f"library-{size}-{spec.seed}")
+        console.log(f"Generating {size:,} files library in {library_path}")
+        generate_library(library_path, spec)
+        library_size = sum(os.path.getsize(path) for path in library_files(library_path))
+
+        with tempfile.TemporaryDirectory(dir=library_root) as workdir:
+            for name in cases:
+                console.log(f"Running {name} over {size:,} files")
+                seconds = run_case(name, library_path, Path(workdir), repeat=repeat)
+                new_results.append(
+                    {
+                        "case": name,
+                        "files": size,
+                        "bytes": library_size,
+                        "seconds": seconds,
+                        "files_per_second": size / seconds if seconds else None,
+                        "spec": json.loads(spec.json()),
+                        "revision": revision,
+                        "python": platform.python_version(),
+                        "date": datetime.now(tz=timezone.utc).isoformat(),
+                    }
+                )
+
+    with open(results_path, "a") as fd:
+        for result in new_results:
+            fd.write(json.dumps(result) + "\n")
+    return [(result, previous_result(results, result)) for result in new_results]
+
+
+def print_results(compared_results, threshold=REGRESSION_THRESHOLD):
+    table = Table(show_header=True, header_style="bold", box=box.SIMPLE)
+    table.add_column("Case")
+    table.add_column("Files", justify="right")
+    table.add_column("Seconds", justify="right")
+    table.add_column("Files/s", justify="right")
+    table.add_column("Previous", justify="right")
+    table.add_column("Change", justify="right")
+    regressions = 0
+    for result, previous in compared_results:
+        previous_seconds = change = ""
+        if previous:
+            previous_seconds = f"{previous['seconds']:.3f}"
+            ratio = result["seconds"] / previous["seconds"] - 1 if previous["seconds"] else 0
+            style = "red" if ratio > threshold else "green" if ratio < -threshold else ""
+            regressions += ratio > threshold
+            change = f"[{style}]{ratio:+.0%}" if style else f"{ratio:+.0%}"
+        table.add_row(
+            result["case"],
+            f"{result['files']:,}",
+            f"{result['seconds']:.3f}",
+            f"{result['files_per_second']:,.0f}" if result["files_per_second"] else "",
+            previous_seconds,
+            change,
+        )
+    console.print(table)
+    return regressions
+
+
+@click.command()
+@click.option(
+    "--files",
+    "sizes",
+    type=int,
+    multiple=True,
+    default=DEFAULT_SIZES,
+    show_default=True,
+    help="Library size, can be given several times e.g. --files 10000 --files 100000 --files 1000000",
+)
+@click.option(
+    "--case",
+    "cases",
+    type=click.Choice(list(CASES)),
+    multiple=True,
+    help="Cases to run, all of them by default",
+)
+@click.option(
+    "--library-root",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=Path(tempfile.gettempdir()).joinpath("cataloguer-benchmarks"),
+    show_default=True,
+    help="Where libraries get generated, they are reused between runs",
+)
+@click.option(
+    "--results",
+    "results_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=RESULTS_PATH,
+    show_default=True,
+    help="JSON lines file results get appended to",
+)
+@click.option("--seed", type=int, default=0, show_default=True)
+@click.option("--depth", type=int, default=LibrarySpec.__fields__["depth"].default, show_default=True)
+@click.option("--fanout", type=int, default=LibrarySpec.__fields__["fanout"].default, show_default=True)
+@click.option(
+    "--median-size",
+    type=int,
+    default=LibrarySpec.__fields__["median_size"].default,
+    show_default=True,
+    help="Median file size in bytes",
+)
+@click.option(
+    "--duplicate-ratio",
+    type=float,
+    default=LibrarySpec.__fields__["duplicate_ratio"].default,
+    show_default=True,
+)
+@click.option("--repeat", type=int, default=1, show_default=True, help="Keeps the best of N runs")
+@click.option(
+    "--fail-on-regression/--no-fail-on-regression",
+    default=False,
+    help=f"Exits with an error when a case got more than {REGRESSION_THRESHOLD:.0%} slower",
+)
+def main(
+    sizes,
+    cases,
+    library_root,
+    results_path,
+    seed,
+    depth,
+    fanout,
+    median_size,
+    duplicate_ratio,
+    repeat,
+    fail_on_regression,
+):
+    library_root.mkdir(parents=True, exist_ok=True)
+    compared_results = run_benchmarks(
+        sizes=sizes,
+        cases=cases or list(CASES),
+        library_root=library_root,
+        results_path=results_path,
+        spec_overrides={
+            "seed": seed,
+            "depth": depth,
+            "fanout": fanout,
+            "median_size": median_size,
+            "duplicate_ratio": duplicate_ratio,
+        },
+        repeat=repeat,
+    )
+    regressions = print_results(compared_results)
+    if regressions and fail_on_regression:
+        raise click.ClickException(f"{regressions} case(s) regressed")
+
+
+if __name__ == "__main__":
+    main()
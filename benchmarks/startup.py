@@ -0,0 +1,175 @@
+"""
+Measures CLI startup: cold `cataloguer --help` and `import cataloguer.cli` in fresh interpreters.
+
+    python -m benchmarks.startup  # or python benchmarks/startup.py
+
+Results get appended to the same JSON lines file as `benchmarks.run` and compared with the previous run.
+"""
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import click
+from rich import box
+from rich.console import Console
+from rich.table import Table
+
+ROOT_PATH = Path(__file__).resolve().parent.parent
+if not __package__:
+    # run as a script rather than with `-m`
+    sys.path.insert(0, str(ROOT_PATH))
+
+from benchmarks.run import (
+    RESULTS_PATH,
+    REGRESSION_THRESHOLD,
+    _git_revision,
+    load_results,
+    previous_result,
+)
+
+# dependencies which must not be imported until a command needs them
+HEAVY_MODULES = (
+    "PIL",
+    "magic",
+    "dateutil",
+    "pydantic",
+    "asyncio",
+    "sqlite3",
+    "rich.console",
+    "rich.markdown",
+)
+
+CASES = {
+    "startup:--help": ("-c", "from cataloguer.cli import cli; cli()", "--help"),
+    "startup:import": ("-c", "import cataloguer.cli"),
+}
+
+console = Console()
+
+
+def time_command(args, repeat=10):
+    """
+    Best wall time out of `repeat` runs of a fresh interpreter
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run((sys.executable, *args), cwd=ROOT_PATH, capture_output=True, check=True)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def imported_modules(statement):
+    output = subprocess.run(
+        (
+            sys.executable,
+            "-c",
+            f"import sys; {statement}; print(','.join(sorted(sys.modules)))",
+        ),
+        cwd=ROOT_PATH,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return set(output.strip().split(","))
+
+
+def imported_heavy_modules(statement="import cataloguer.cli"):
+    """
+    Heavy modules imported by `statement`, apart from those rich-click imports itself
+    (versions older than 1.8, like the locked one, import rich.console and rich.markdown)
+    """
+    modules = imported_modules(statement) - imported_modules("import rich_click")
+    return [name for name in HEAVY_MODULES if name in modules]
+
+
+def slowest_imports(limit=10):
+    """
+    Cumulative import time of the slowest modules, as reported by `python -X importtime`
+    """
+    stderr = subprocess.run(
+        (sys.executable, "-X", "importtime", "-c", "import cataloguer.cli"),
+        cwd=ROOT_PATH,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    timings = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        timings.append((int(cumulative), name.strip()))
+    return sorted(timings, reverse=True)[:limit]
+
+
+@click.command()
+@click.option(
+    "--results",
+    "results_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=RESULTS_PATH,
+    show_default=True,
+    help="JSON lines file results get appended to",
+)
+@click.option("--repeat", type=int, default=10, show_default=True, help="Keeps the best of N runs")
+@click.option(
+    "--fail-on-regression/--no-fail-on-regression",
+    default=False,
+    help=f"Exits with an error when startup got more than {REGRESSION_THRESHOLD:.0%} slower "
+    f"or a heavy dependency gets imported at startup",
+)
+def main(results_path, repeat, fail_on_regression):
+    results = load_results(results_path)
+    baseline = time_command(("-c", "pass"), repeat=repeat)
+    new_results = [
+        {
+            "case": name,
+            "seconds": time_command(args, repeat=repeat),
+            "interpreter_seconds": baseline,
+            "spec": {},
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "date": datetime.now(tz=timezone.utc).isoformat(),
+        }
+        for name, args in CASES.items()
+    ]
+    with open(results_path, "a") as fd:
+        for result in new_results:
+            fd.write(json.dumps(result) + "\n")
+
+    table = Table(show_header=True, header_style="bold", box=box.SIMPLE)
+    table.add_column("Case")
+    table.add_column("ms", justify="right")
+    table.add_column("Previous", justify="right")
+    table.add_column("Change", justify="right")
+    regressions = 0
+    for result in new_results:
+        previous = previous_result(results, result)
+        previous_ms = change = ""
+        if previous:
+            previous_ms = f"{previous['seconds'] * 1000:.0f}"
+            ratio = result["seconds"] / previous["seconds"] - 1
+            regressions += ratio > REGRESSION_THRESHOLD
+            change = f"{ratio:+.0%}"
+        table.add_row(result["case"], f"{result['seconds'] * 1000:.0f}", previous_ms, change)
+    table.caption = f"Bare interpreter: {baseline * 1000:.0f} ms"
+    console.print(table)
+
+    heavy_modules = imported_heavy_modules()
+    if heavy_modules:
+        console.print(f"[red]Imported at startup: {', '.join(heavy_modules)}")
+    console.print("Slowest imports (cumulative µs):")
+    for cumulative, name in slowest_imports():
+        console.print(f"  {cumulative:>8} {name}")
+
+    if fail_on_regression and (regressions or heavy_modules):
+        raise click.ClickException("Startup regressed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,53 @@
+from __future__ import annotations
+
 import logging
+from collections import deque
 from contextlib import suppress
 from datetime import timezone, datetime
 from enum import Enum
 from itertools import chain
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 
 import rich_click as click
-from pydantic import BaseModel
-from rich.prompt import Confirm
 
 from .console.default import console
-from .console.output import print_table_summary, print_duplicate_files
-from .console.tree import DirectoryTree
-from .filesystem.directory import Catalogue, Directory
+from .console.events import EventStream, OutputFormat
+from .console.tree import COLLAPSE_THRESHOLD, DirectoryTree
+from .filesystem.classify import MetadataReader, set_metadata_reader
+from .filesystem.devices import DeviceQueues, Renamer, get_device_queues, set_device_queues
+from .filesystem.directory import Catalogue, Directory, hardlinked_files, read_metadata
 from .filesystem.file import File
-from .filesystem.utils import generate_filename
-from .settings import GlobalSettings
-from .storage import Storage
+from .filesystem.layout import IOOrder, set_io_order, sort_for_reading
+from .filesystem.rules import WalkRules, parse_patterns, set_walk_rules
+from .filesystem.similarity import DEFAULT_MAX_DISTANCE
+from .filesystem.throttle import IOBudget, set_io_budget
+from .filesystem.utils import create_directories, generate_filename
+from .profiling import profiler
 
 click.rich_click.SHOW_ARGUMENTS = True
 # click.rich_click.GROUP_ARGUMENTS_OPTIONS = True
 
 
-class Context(BaseModel):
-    global_settings: GlobalSettings
-    storage: Storage
-    workdir: Path
-    verbose: bool
-    interactive: bool
+if TYPE_CHECKING:
+    from .context import Context
+
+
+def __getattr__(name):
+    # pydantic models get imported once a command runs, keeping `--help` fast
+    if name == "Context":
+        from .context import Context
+
+        return Context
+    if name == "GlobalSettings":
+        from .settings import GlobalSettings
+
+        return GlobalSettings
+    if name == "Storage":
+        from .storage import Storage
+
+        return Storage
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class Operation(Enum):
@@ -55,8 +75,82 @@ class Operation(Enum):
     help="Disables confirmation prompts. Enabled by default",
     default=True,
 )
+@click.option(
+    "--output",
+    type=click.Choice([str(output) for output in OutputFormat]),
+    help="Output format, ndjson streams one JSON event per line. Defaults to rich",
+    default=str(OutputFormat.RICH),
+)
+@click.option(
+    "--io-bandwidth",
+    help="Maximum bytes per second read or written by hashing and transfers, e.g. 50MB. Unlimited by default",
+    required=False,
+)
+@click.option(
+    "--io-operations",
+    type=int,
+    help="Maximum I/O operations per second of hashing and transfers. Unlimited by default",
+    required=False,
+)
+@click.option(
+    "--io-order",
+    type=click.Choice([str(io_order) for io_order in IOOrder]),
+    help="Order of hashing and transfer reads: walk, physical disk layout, or physical only on spinning disks (auto). Defaults to walk",
+    default=str(IOOrder.WALK),
+)
+@click.option(
+    "--device-workers",
+    type=int,
+    help="Files hashed or transferred at the same time on each disk. Defaults to 1 on spinning disks and 4 on the rest",
+    required=False,
+)
+@click.option(
+    "--metadata-workers",
+    type=int,
+    help="Processes reading file types and creation dates. Defaults to the number of CPUs",
+    required=False,
+)
+@click.option(
+    "--exclude",
+    help="Comma separated gitignore-style patterns of directories and files to skip, e.g. '*.tmp,Backups/'. A leading ! includes them back",
+    required=False,
+)
+@click.option(
+    "--daemon/--no-daemon",
+    "use_daemon",
+    help="Sends inspect and single file copy/move requests to a running `serve` daemon. Enabled by default",
+    default=True,
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Prints time, calls and bytes read and written by each stage. Disabled by default",
+    default=False,
+)
+@click.option(
+    "--profile-report",
+    type=click.Path(dir_okay=False, writable=True, path_type=Path),
+    help="Writes the profile as JSON to the given file, implies --profile",
+    required=False,
+)
 @click.pass_context
-def cli(ctx, verbose, interactive, format_pattern, unknown_format_pattern):
+def cli(
+    ctx,
+    verbose,
+    interactive,
+    format_pattern,
+    unknown_format_pattern,
+    output,
+    io_bandwidth,
+    io_operations,
+    io_order,
+    device_workers,
+    metadata_workers,
+    exclude,
+    use_daemon,
+    profile,
+    profile_report,
+):
     """
     Command line interface.
 
@@ -65,30 +159,145 @@ def cli(ctx, verbose, interactive, format_pattern, unknown_format_pattern):
     file arguments accept file names and a special value "-" to indicate stdin or stdout
     """
     if not ctx.obj:
-        global_settings = GlobalSettings(format_pattern=format_pattern, unknown_format_pattern=unknown_format_pattern)
+        from .context import Context
+        from .settings import GlobalSettings
+        from .storage import Storage
+
+        global_settings = GlobalSettings(
+            format_pattern=format_pattern,
+            unknown_format_pattern=unknown_format_pattern,
+            io_bandwidth=io_bandwidth,
+            io_operations=io_operations,
+            io_order=io_order,
+            device_workers=device_workers,
+            metadata_workers=metadata_workers,
+            exclude=exclude,
+        )
         ctx.obj = Context(
             global_settings=global_settings,
             storage=Storage(path=global_settings.storage_location),
             workdir=Path.cwd(),
             verbose=verbose,
             interactive=interactive,
+            output=OutputFormat(output),
+            use_daemon=use_daemon,
         )
         if verbose:
             console.print(ctx.obj)
 
+    # machine readable output skips any rich rendering
+    console.quiet = ctx.obj.output == OutputFormat.NDJSON
+    if ctx.obj.output == OutputFormat.NDJSON and ctx.obj.interactive:
+        raise click.UsageError("--output ndjson requires --no-interactive")
+
+    set_io_budget(IOBudget.from_settings(ctx.obj.global_settings))
+    set_io_order(ctx.obj.global_settings.io_order)
+    set_device_queues(
+        DeviceQueues(workers_per_device=ctx.obj.global_settings.device_workers)
+    )
+    set_metadata_reader(
+        MetadataReader(workers=ctx.obj.global_settings.metadata_workers)
+    )
+    set_walk_rules(WalkRules().extend(parse_patterns(ctx.obj.global_settings.exclude)))
+
+    if profile or profile_report:
+        profiler.reset()
+        profiler.enable()
+        ctx.call_on_close(
+            lambda: report_profile(ctx.obj, report_path=profile_report)
+        )
+
+
+def report_profile(ctx: Context, report_path: Optional[Path] = None):
+    from .console.output import print_profile
+
+    profiler.disable()
+    if report_path:
+        profiler.save_report(report_path)
+    events = get_event_stream(ctx)
+    if events:
+        events.emit("profile", **profiler.report())
+    else:
+        print_profile(profiler.report())
+
+
+def get_event_stream(ctx: Context) -> Optional[EventStream]:
+    if ctx.output == OutputFormat.NDJSON:
+        return EventStream()
+    return None
+
+
+def get_daemon_client(ctx: Context):
+    """
+    Client of the running `serve` daemon, if any
+    """
+    if not ctx.use_daemon:
+        return None
+    from .daemon import DaemonClient
+
+    client = DaemonClient(ctx.global_settings.socket_path)
+    if client.is_running():
+        return client
+    return None
+
+
+@cli.command()
+@click.pass_obj
+def serve(ctx: Context):
+    """
+    Keeps catalogues loaded and answers requests from other invocations over a unix socket.
+    """
+    from .daemon import DaemonError, serve as serve_daemon
+
+    socket_path = ctx.global_settings.socket_path
+    console.info(f"Listening on {socket_path}, press Ctrl+C to stop.")
+    events = get_event_stream(ctx)
+    if events:
+        events.emit("serving", socket_path=socket_path)
+    # requests are handled in the background, progress spinners would clash
+    console.quiet = True
+    try:
+        serve_daemon(ctx, socket_path)
+    except DaemonError as exception:
+        raise click.ClickException(str(exception))
+    except KeyboardInterrupt:
+        pass
+
 
 @cli.command()
 @click.argument("src")
 @click.option(
     "--media-only/--all", help="Filter by media files. Enabled by default", default=True
 )
+@click.option(
+    "--rescan",
+    is_flag=True,
+    help="Checks every file of a catalogue instead of using its stats",
+)
 @click.pass_obj
-def inspect(ctx: Context, src, media_only):
+def inspect(ctx: Context, src, media_only, rescan):
     """
     Inspects a path or a catalogue
     """
+    from .console.output import print_duplicate_files, print_media_summary, summarise_files
+
+    client = not rescan and ctx.storage.catalogue_exists(src) and get_daemon_client(ctx)
+    if client:
+        return inspect_with_daemon(ctx, client, src, media_only)
+
     # TODO: allow single file
-    directory = ctx.storage.load_catalogue(src, force_reload=True)
+    directory = catalogue = ctx.storage.load_catalogue(src, force_reload=rescan)
+    if catalogue and not rescan:
+        # kept up to date as files change, no need to look at them
+        summary = catalogue.summarise(media_only=media_only)
+        if summary:
+            return print_catalogue_summary(ctx, catalogue, *summary)
+    if not catalogue and "/" in src:
+        # "<catalogue>/<sub path>" only loads the shard holding that path
+        catalogue_name, _, sub_path = src.partition("/")
+        catalogue = ctx.storage.load_catalogue(catalogue_name, force_reload=True)
+        if catalogue:
+            directory = catalogue.sub_directory(catalogue.path.joinpath(sub_path))
     if not directory:
         src_path = None
         with suppress(FileNotFoundError):
@@ -99,18 +308,42 @@ def inspect(ctx: Context, src, media_only):
             )
         directory = Directory.from_path(src_path)
 
+    # classified up front on worker processes, the summary needs the type of every file
+    read_metadata(directory.files, "Classifying files", creation_dates=directory is catalogue)
     duplicated_files = directory.detect_duplicates(media_only=media_only)
+    months = None
+    if directory is catalogue:
+        # completes the stats, next inspections use them
+        summary = catalogue.summarise(media_only=media_only)
+        if summary:
+            media_types, months = summary
+    events = get_event_stream(ctx)
     with console.status(
         "[green]Preparing summary...",
     ):
         name = directory.path
-        if isinstance(directory, Catalogue):
-            name = f"{directory.name} : {directory.path}"
+        if catalogue:
+            name = f"{catalogue.name} : {directory.path}"
 
         files = directory.files
         if media_only:
             files = [file for file in files if file.is_media_type()]
-        print_table_summary(name=name, files=files, duplicated_files=duplicated_files)
+        if months is None:
+            media_types = summarise_files(duplicated_files=duplicated_files, files=files)
+        if events:
+            events.duplicates(duplicated_files)
+            summary_fields = {"months": months} if months is not None else {}
+            events.emit(
+                "summary",
+                catalogue=catalogue.name if catalogue else None,
+                path=directory.path,
+                files=len(files),
+                media_types=media_types,
+                **summary_fields,
+            )
+            duplicated_files = []
+        else:
+            print_media_summary(media_types, name=name)
 
         if duplicated_files:
             duplicated_list_of_files_sorted_by_name_length = list(
@@ -121,8 +354,393 @@ def inspect(ctx: Context, src, media_only):
                 duplicated_files=duplicated_list_of_files_sorted_by_name_length, from_path=directory.path
             )
 
-    if isinstance(directory, Catalogue):
-        ctx.storage.save_catalogue(directory)
+    if catalogue:
+        ctx.storage.save_catalogue(catalogue)
+
+
+def print_catalogue_summary(ctx: Context, catalogue, media_types, months):
+    from .console.output import print_media_summary
+
+    events = get_event_stream(ctx)
+    if events:
+        events.emit(
+            "summary",
+            catalogue=catalogue.name,
+            path=catalogue.path,
+            files=sum(media["files"] for media in media_types.values()),
+            media_types=media_types,
+            months=months,
+        )
+        return
+
+    print_media_summary(media_types, name=f"{catalogue.name} : {catalogue.path}")
+    if any(media["duplicates"] for media in media_types.values()):
+        console.print("Use --rescan to list the duplicated files")
+
+
+def inspect_with_daemon(ctx: Context, client, name, media_only):
+    from .console.output import print_duplicate_files, print_media_summary
+
+    result = client.request("inspect", name=name, media_only=media_only)
+    events = get_event_stream(ctx)
+    if events:
+        for duplicates in result["duplicates"]:
+            events.emit("duplicates", **duplicates)
+        events.emit(
+            "summary",
+            catalogue=result["catalogue"],
+            path=result["path"],
+            files=result["files"],
+            media_types=result["media_types"],
+        )
+        return
+
+    print_media_summary(
+        result["media_types"], name=f"{result['catalogue']} : {result['path']}"
+    )
+    if result["duplicates"]:
+        print_duplicate_files(
+            duplicated_files=[
+                sorted(
+                    (File(path, size=duplicates["size"]) for path in duplicates["paths"]),
+                    key=lambda file: (len(file.path.name), len(str(file.path))),
+                )
+                for duplicates in result["duplicates"]
+            ],
+            from_path=Path(result["path"]),
+        )
+
+
+@cli.command()
+@click.argument("src")
+@click.option(
+    "--media-only/--all", help="Filter by media files. Enabled by default", default=True
+)
+@click.pass_obj
+def locate(ctx: Context, src, media_only):
+    """
+    Finds which files of a path are already present in any catalogue.
+    """
+    from .console.output import print_located_files
+
+    src_data = get_from_input(ctx, src)
+    if isinstance(src_data, File):
+        files = [src_data]
+        from_path = src_data.path.parent
+    else:
+        files = src_data.files
+        from_path = src_data.path
+    if media_only:
+        read_metadata(files, "Classifying files", creation_dates=False)
+        files = [file for file in files if file.is_media_type()]
+
+    ctx.storage.update_index()
+    index = ctx.storage.index
+    events = get_event_stream(ctx)
+    with console.progress("Looking up files") as status:
+        status.tracker.start_stage("lookup", total=len(files))
+        located_files = []
+        for file in files:
+            status.tracker.advance()
+            entries = index.lookup(file)
+            if entries:
+                located_files.append((file, entries))
+            if events:
+                events.file(
+                    "located" if entries else "not_located",
+                    file,
+                    catalogued=[
+                        {"catalogue": entry.catalogue, "path": entry.path}
+                        for entry in entries
+                    ],
+                )
+
+    if events:
+        events.emit("summary", files=len(files), located=len(located_files))
+        return
+    console.info(f"{len(located_files)} of {len(files)} files are already catalogued.")
+    if located_files:
+        print_located_files(located_files, from_path=from_path)
+
+
+def parse_size_option(ctx, param, value):
+    from .filesystem.utils import parse_size
+
+    if value is None:
+        return None
+    try:
+        return parse_size(value)
+    except ValueError as exception:
+        raise click.BadParameter(str(exception))
+
+
+QUERY_DATE_FORMATS = ["%Y-%m-%d", "%Y-%m", "%Y"]
+
+
+@cli.command()
+@click.argument("name", required=False)
+@click.option("--type", "media_type", help="Media type, e.g. image or video")
+@click.option(
+    "--extension", "extensions", multiple=True, help="File extension, can be repeated"
+)
+@click.option(
+    "--min-size", callback=parse_size_option, help="Minimum size, e.g. 1GB"
+)
+@click.option(
+    "--max-size", callback=parse_size_option, help="Maximum size, e.g. 500MB"
+)
+@click.option(
+    "--since",
+    type=click.DateTime(QUERY_DATE_FORMATS),
+    help="Created on or after this date (YYYY, YYYY-MM or YYYY-MM-DD)",
+)
+@click.option(
+    "--before",
+    type=click.DateTime(QUERY_DATE_FORMATS),
+    help="Created before this date (YYYY, YYYY-MM or YYYY-MM-DD)",
+)
+@click.option("--limit", type=click.IntRange(min=1), help="Maximum number of results")
+@click.pass_obj
+def query(
+    ctx: Context,
+    name,
+    media_type,
+    extensions,
+    min_size,
+    max_size,
+    since,
+    before,
+    limit,
+):
+    """
+    Lists catalogued files by type, extension, size and creation date, all catalogues by default.
+    """
+    if name and not ctx.storage.catalogue_exists(name):
+        raise click.BadParameter(f'Catalogue "{name}" not found')
+
+    ctx.storage.update_index()
+    # only catalogues indexed before their metadata was known get read, once
+    for catalogue_name in [name] if name else ctx.storage.list_catalogue_names():
+        ctx.storage.read_missing_metadata(catalogue_name)
+
+    results = ctx.storage.index.query(
+        catalogue=name,
+        media_type=media_type,
+        extensions=extensions,
+        min_size=min_size,
+        max_size=max_size,
+        since=since,
+        before=before,
+        limit=limit,
+    )
+    events = get_event_stream(ctx)
+    for result in results:
+        if events:
+            events.emit(
+                "file",
+                catalogue=result.catalogue,
+                path=result.path,
+                size=result.size,
+                mimetype=result.mimetype,
+                creation_date=result.creation_date,
+            )
+        else:
+            click.echo(str(result.path))
+    if events:
+        events.emit("summary", files=len(results))
+
+
+@cli.command()
+@click.argument("src")
+@click.argument("dst", required=False)
+@click.option(
+    "--distance",
+    type=click.IntRange(0, 64),
+    default=DEFAULT_MAX_DISTANCE,
+    show_default=True,
+    help="Maximum number of different bits (out of 64) between similar images",
+)
+@click.pass_obj
+def find_similar(ctx: Context, src, dst, distance):
+    """
+    Finds images which look alike (resized, re-encoded...) in a path or catalogue, or the ones of SRC in DST.
+    """
+    from .console.output import print_similar_files
+
+    src_data = get_from_input(ctx, src, force_reload=False)
+    dst_data = get_from_input(ctx, dst, force_reload=False)
+    if dst_data and isinstance(dst_data, File):
+        raise click.BadParameter(
+            f'Error "{dst}" is neither a catalogue or an existing directory'
+        )
+    src_images = [
+        file
+        for file in ([src_data] if isinstance(src_data, File) else src_data.files)
+        if file.is_image()
+    ]
+    dst_images = [file for file in dst_data.files if file.is_image()] if dst_data else []
+    compute_perceptual_hashes(src_images + dst_images)
+
+    from .filesystem.similarity import BKTree, group_similar
+
+    if dst_data:
+        tree = BKTree()
+        for file in dst_images:
+            if file.phash is not None:
+                tree.add(file.phash, file)
+        similar_files = []
+        for file in src_images:
+            if file.phash is None:
+                continue
+            matches = [
+                match
+                for _, match in tree.search(file.phash, distance)
+                if match.path != file.path
+            ]
+            if matches:
+                similar_files.append([file, *matches])
+    else:
+        similar_files = group_similar(
+            ((file.phash, file) for file in src_images if file.phash is not None),
+            max_distance=distance,
+        )
+
+    events = get_event_stream(ctx)
+    if events:
+        for group in similar_files:
+            events.emit("similar", paths=[file.path for file in group])
+        events.emit("summary", images=len(src_images), similar=len(similar_files))
+    else:
+        console.info(
+            f"Found {len(similar_files)} groups of similar images out of {len(src_images)} images."
+        )
+        if similar_files:
+            print_similar_files(similar_files, from_path=ctx.workdir)
+
+    # perceptual hashes are kept for next searches
+    for data in (src_data, dst_data):
+        if isinstance(data, Catalogue):
+            ctx.storage.save_catalogue(data)
+
+
+def compute_perceptual_hashes(images):
+    """
+    Decodes the images without a perceptual hash yet, in parallel across devices
+    """
+    from .filesystem.similarity import perceptual_hash
+
+    images = [file for file in images if file._phash is None]
+    with console.progress("Hashing images") as status:
+        status.tracker.start_stage(
+            "perceptual hash",
+            total=len(images),
+            total_bytes=sum(file.size for file in images),
+        )
+        for file, phash in get_device_queues().map_unordered(
+            lambda file: perceptual_hash(file.path), sort_for_reading(images)
+        ):
+            file.phash = phash
+            status.tracker.advance(size=file.size)
+
+
+@cli.command()
+@click.argument("name")
+@click.option(
+    "--workers", type=int, default=4, show_default=True, help="Files hashed in parallel"
+)
+@click.option(
+    "--bandwidth",
+    help="Maximum bytes read per second, e.g. 50MB. Unlimited by default",
+    required=False,
+)
+@click.option(
+    "--restart",
+    is_flag=True,
+    help="Starts over instead of resuming an interrupted verification",
+)
+@click.pass_obj
+def verify(ctx: Context, name, workers, bandwidth, restart):
+    """
+    Rehashes the files of a catalogue and reports the ones which changed or are missing.
+    """
+    from .console.output import print_verification
+
+    from .filesystem.throttle import RateLimiter
+    from .filesystem.utils import parse_size
+    from .verify import VerificationState, VerifyStatus, verify_records
+
+    if not ctx.storage.catalogue_exists(name):
+        raise click.BadParameter(f'Catalogue "{name}" not found')
+    rate_limiter = None
+    if bandwidth:
+        try:
+            rate_limiter = RateLimiter(parse_size(bandwidth))
+        except ValueError as exception:
+            raise click.BadParameter(str(exception))
+
+    state = VerificationState.load(ctx.storage.verification_state_path(name))
+    if restart:
+        state = VerificationState(state.path)
+    elif state.results:
+        console.info(
+            f"Resuming verification started at {state.started}, "
+            f"{len(state.results)} files were already verified."
+        )
+
+    total = total_bytes = 0
+    for record in ctx.storage.stored_file_records(name):
+        if not state.is_verified(record["path"]):
+            total += 1
+            total_bytes += record["size"]
+
+    events = get_event_stream(ctx)
+    with console.progress(f"Verifying {name}") as status:
+        status.tracker.start_stage("verify", total=total, total_bytes=total_bytes)
+
+        def on_result(record, result):
+            status.tracker.advance(size=record["size"])
+            if events and result in (VerifyStatus.MISMATCH, VerifyStatus.MISSING):
+                events.emit(str(result), path=record["path"], size=record["size"])
+
+        try:
+            verify_records(
+                ctx.storage.stored_file_records(name),
+                state,
+                workers=workers,
+                rate_limiter=rate_limiter,
+                on_result=on_result,
+            )
+        except KeyboardInterrupt:
+            console.warning("Verification interrupted, run it again to resume.")
+            raise click.exceptions.Exit(130)
+
+    counts = {
+        str(result): len(state.paths_with(result)) for result in VerifyStatus
+    }
+    problems = state.paths_with(VerifyStatus.MISMATCH) + state.paths_with(
+        VerifyStatus.MISSING
+    )
+    if state.hashes:
+        store_verified_hashes(ctx, name, state.hashes)
+    state.delete()
+    if events:
+        events.emit("summary", catalogue=name, started=state.started, **counts)
+    else:
+        print_verification(counts, state)
+    if problems:
+        raise click.exceptions.Exit(1)
+
+
+def store_verified_hashes(ctx: Context, name, hashes):
+    """
+    Stores the hashes computed for files saved without one, so next verifications check them
+    """
+    catalogue = ctx.storage.load_catalogue(name, force_reload=False)
+    for path, file_hash in hashes.items():
+        file = catalogue.get_file(Path(path))
+        if file is not None and file._hash is None:
+            file.hash = file_hash
+    ctx.storage.save_catalogue(catalogue)
 
 
 @cli.command()
@@ -141,10 +759,15 @@ def delete_catalogue(ctx: Context, name):
         f'Are you sure to delete the catalogue "{name}" pointing to "{existing_catalogue.path}"?'
         f"\nNote: No actual files will be affected."
     )
+    from rich.prompt import Confirm
+
     if ctx.interactive and not Confirm.ask(f"Do you want to proceed?"):
         return
 
     ctx.storage.delete_catalogue(name)
+    events = get_event_stream(ctx)
+    if events:
+        events.emit("catalogue_deleted", name=name, path=existing_catalogue.path)
 
 
 @cli.command()
@@ -152,11 +775,14 @@ def delete_catalogue(ctx: Context, name):
 @click.argument("src", required=False)
 @click.option("--format-pattern", help='Pattern template. e.g. %Y/%m/{file}', required=False)
 @click.option("--unknown-format-pattern", help='Pattern template fallback when date cannot get extracted', required=False)
+@click.option("--exclude", help="Comma separated gitignore-style patterns skipped in this catalogue, e.g. 'Backups/,*.xmp'", required=False)
 @click.pass_obj
-def create_catalogue(ctx: Context, name, src, format_pattern, unknown_format_pattern):
+def create_catalogue(ctx: Context, name, src, format_pattern, unknown_format_pattern, exclude):
     """
     Creates a new catalogue.
     """
+    from .console.output import print_table_summary, summarise_files
+
     src_path = None
     if src:
         with suppress(FileNotFoundError):
@@ -184,18 +810,37 @@ def create_catalogue(ctx: Context, name, src, format_pattern, unknown_format_pat
         format_pattern=format_pattern,
         unknown_format_pattern=unknown_format_pattern,
         path=catalogue_path,
+        exclude=parse_patterns(exclude),
     )
     new_catalogue.explore()
 
+    events = get_event_stream(ctx)
     files = new_catalogue.files
     if files:
         duplicated_files = new_catalogue.detect_duplicates()
         with console.status(
             "[green]Preparing summary...",
         ):
-            print_table_summary(
-                name=new_catalogue.name, files=files, duplicated_files=duplicated_files
-            )
+            if events:
+                events.emit(
+                    "summary",
+                    files=len(files),
+                    media_types=summarise_files(
+                        duplicated_files=duplicated_files, files=files
+                    ),
+                )
+            else:
+                print_table_summary(
+                    name=new_catalogue.name, files=files, duplicated_files=duplicated_files
+                )
+    if events:
+        events.emit(
+            "catalogue_created",
+            name=name,
+            path=catalogue_path,
+            format_pattern=new_catalogue.format_pattern,
+            unknown_format_pattern=new_catalogue.unknown_format_pattern,
+        )
 
     console.print(
         f"Catalogue name: [bold purple]{name}[/]\n"
@@ -257,6 +902,134 @@ def delete_duplicates(ctx: Context, src, dst, dry_run):
     return operate(ctx, src, dst, operation_mode, dry_run)
 
 
+@cli.command()
+@click.argument("src")
+@click.argument("dst")
+@click.option("--copy", "copy_files", is_flag=True, help="Copies files instead of moving them")
+@click.option(
+    "--delay",
+    type=float,
+    default=2.0,
+    show_default=True,
+    help="Seconds a file has to stay unmodified before being processed",
+)
+@click.option(
+    "--batch-size",
+    type=int,
+    default=100,
+    show_default=True,
+    help="Maximum number of files processed at once",
+)
+@click.option("--dry-run", is_flag=True)
+@click.pass_obj
+def watch(ctx: Context, src, dst, copy_files, delay, batch_size, dry_run):
+    """
+    Watches a directory and moves new files into a catalogue as they arrive (Linux only).
+    """
+    src_path = None
+    with suppress(FileNotFoundError):
+        src_path = Path(src).expanduser().resolve(strict=True)
+    if not src_path or not src_path.is_dir():
+        raise click.BadParameter(f'Error "{src}" is not an existing directory')
+
+    dst_data = get_from_input(ctx, dst, force_reload=False)
+    if not dst_data or isinstance(dst_data, File):
+        raise click.BadParameter(
+            f'Error "{dst}" is neither a catalogue or an existing directory'
+        )
+    if dst_data.path.is_relative_to(src_path) or src_path.is_relative_to(dst_data.path):
+        raise click.BadParameter(f'Error "{src}" and "{dst}" cannot be nested')
+    format_pattern = ctx.global_settings.format_pattern
+    if isinstance(dst_data, Catalogue):
+        format_pattern = format_pattern or dst_data.format_pattern
+    if not format_pattern:
+        raise click.BadParameter('Error there is no format pattern specified')
+
+    operation_mode = Operation.COPY if copy_files else Operation.MOVE
+    try:
+        watch_and_ingest(
+            ctx,
+            src_path,
+            dst_data,
+            operation_mode,
+            delay=delay,
+            batch_size=batch_size,
+            dry_run=dry_run,
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+def watch_and_ingest(
+    ctx, src_path, dst_data, operation_mode, delay, batch_size, dry_run, stop=None
+):
+    """
+    Processes the batches given by `watch_files` until interrupted or `stop` gets set.
+    The destination stays loaded, catalogues get saved after each batch.
+    """
+    from .filesystem.watch import watch_files
+
+    events = get_event_stream(ctx)
+    if events:
+        events.emit("watching", src=src_path, dst=dst_data.path)
+    else:
+        console.info(f"Watching {src_path}, press Ctrl+C to stop.")
+
+    try:
+        batches = watch_files(src_path, delay=delay, batch_size=batch_size, stop=stop)
+        for paths in batches:
+            try:
+                tree, skipped_tree = ingest_files(
+                    ctx, src_path, dst_data, paths, operation_mode, dry_run, events=events
+                )
+            except TransferError:
+                # reported already, the next batches still get ingested
+                tree = skipped_tree = None
+            if isinstance(dst_data, Catalogue) and not dry_run:
+                ctx.storage.save_catalogue(dst_data)
+            if tree is not None and not events:
+                print_trees(
+                    ctx, Directory(path=src_path), dst_data, operation_mode, tree, skipped_tree
+                )
+    except OSError as exception:
+        raise click.ClickException(f"Cannot watch {src_path}: {exception}")
+
+
+def ingest_files(ctx, src_path, dst_data, paths, operation_mode, dry_run, events=None):
+    """
+    Copies or moves a batch of new files, leaving out non media files and duplicates
+    """
+    files = []
+    for path in paths:
+        try:
+            if path.is_file():
+                files.append(File(path))
+        except FileNotFoundError:
+            continue  # gone before being processed
+    batch = Directory(path=src_path, files=files)
+    _, _, files_to_operate = extract_files(batch)
+    duplicate_files_across_directories = {
+        file
+        for file_list in dst_data.detect_duplicates_with(files_to_operate)
+        for file in file_list
+    }
+    files_to_process = [
+        file for file in files_to_operate if file not in duplicate_files_across_directories
+    ]
+    if events:
+        events.emit("detected", files=len(files_to_process), dry_run=dry_run)
+    return process_files(
+        ctx,
+        batch,
+        dst_data,
+        files_to_process,
+        operation_mode,
+        datetime.now(timezone.utc),
+        dry_run,
+        events=events,
+    )
+
+
 def filter_list_of_duplicated_files(
     duplicated_list_of_files_sorted_by_name_length, files_to_process
 ):
@@ -285,6 +1058,7 @@ def extract_files(src_data):
     if isinstance(src_data, File):
         files_to_operate = [src_data]
     else:  # elif isinstance(src_data, (Catalogue, Directory)):
+        read_metadata(src_data.files, "Classifying files", creation_dates=False)
         duplicated_list_of_files = src_data.detect_duplicates()
 
         if duplicated_list_of_files:
@@ -315,14 +1089,14 @@ def extract_files(src_data):
     )
 
 
-def get_from_input(ctx, value):
+def get_from_input(ctx, value, force_reload=True):
     """
     Catalogue > Directory > File > None
     """
     if not value:
         return None
 
-    catalogue = ctx.storage.load_catalogue(value)
+    catalogue = ctx.storage.load_catalogue(value, force_reload=force_reload)
     if catalogue:
         return catalogue
 
@@ -335,19 +1109,46 @@ def get_from_input(ctx, value):
 
     if path.is_dir():
         return Directory.from_path(path)
+
+    from .filesystem.archive import Archive, is_archive
+
+    if is_archive(path):
+        return Archive.from_path(path)
     return File(path)
 
 
+def is_archive_data(data):
+    from .filesystem.archive import Archive
+
+    return isinstance(data, Archive)
+
+
 def operate(ctx, src, dst, operation_mode, dry_run=False):
+    from .console.output import print_duplicate_files, print_hardlinks
+
     start_dt = datetime.now(timezone.utc)
 
+    # single file imports are what the daemon speeds up, prompts need the local flow
+    if (
+        operation_mode in (Operation.COPY, Operation.MOVE)
+        and not ctx.interactive
+        and dst
+        and ctx.storage.catalogue_exists(dst)
+        and Path(src).expanduser().is_file()
+    ):
+        client = get_daemon_client(ctx)
+        if client:
+            return import_with_daemon(ctx, client, src, dst, operation_mode, dry_run)
+
     src_data = get_from_input(ctx, src)
     if not src_data:
         raise click.BadParameter(
             f'Error "{src}" is neither a catalogue or a valid path'
         )
 
-    dst_data = get_from_input(ctx, dst)
+    # destination catalogues are trusted unless their number of files changed,
+    # which allows discarding new files with their membership filter
+    dst_data = get_from_input(ctx, dst, force_reload=False)
     if dst_data and isinstance(dst_data, File):
         raise click.BadParameter(
             f'Error "{dst}" is neither a catalogue or an existing directory'
@@ -368,6 +1169,11 @@ def operate(ctx, src, dst, operation_mode, dry_run=False):
                 'Error there is no format pattern specified'
             )
 
+    if operation_mode != Operation.COPY and is_archive_data(src_data):
+        raise click.BadParameter(
+            f'Error "{src}" is an archive, files can only be copied out of it'
+        )
+
     if isinstance(src_data, File) and not dst_data:
         raise click.BadParameter(
             f'Error "{src}" is a file but no valid destination was provided'
@@ -381,13 +1187,13 @@ def operate(ctx, src, dst, operation_mode, dry_run=False):
             duplicated_discarded_files,
             files_to_operate,
         ) = extract_files(src_data)
-        
+
+    events = get_event_stream(ctx)
     if operation_mode == Operation.DELETE:
         if dst_data:
+            duplicated_files = dst_data.detect_duplicates_with(files_to_operate)
             duplicate_files_across_directories = [
-                file
-                for file_list in dst_data.detect_duplicates_with(files_to_operate)
-                for file in file_list
+                file for file_list in duplicated_files for file in file_list
             ]
             # delete only dst files (which are reported as duplicated)
             files_to_process = list(
@@ -397,6 +1203,7 @@ def operate(ctx, src, dst, operation_mode, dry_run=False):
                 )
             )
         else:  # files to delete are src duplicates
+            duplicated_files = duplicated_list_of_files_sorted_by_name_length
             files_to_process = [
                 file for file in duplicated_discarded_files if file.is_media_type()
             ]
@@ -405,7 +1212,9 @@ def operate(ctx, src, dst, operation_mode, dry_run=False):
                 duplicated_list_of_files_sorted_by_name_length,
                 files_to_process=files_to_process,
             )
-            if duplicated_list_of_different_filenames:
+            if duplicated_list_of_different_filenames and events:
+                events.duplicates(duplicated_list_of_different_filenames, kept="first")
+            elif duplicated_list_of_different_filenames:
                 console.warning(
                     "I will keep the shortest name for each of the following groups:"
                 )
@@ -413,6 +1222,18 @@ def operate(ctx, src, dst, operation_mode, dry_run=False):
                     duplicated_files=duplicated_list_of_different_filenames
                 )
 
+        # hard links are not copies, deleting them frees no space
+        hardlinks = hardlinked_files(duplicated_files, files_to_process)
+        if hardlinks and events:
+            for file, linked_file in hardlinks:
+                events.emit("hardlink", path=file.path, linked_to=linked_file.path)
+        elif hardlinks:
+            console.warning(
+                f"{len(hardlinks)} of the duplicates are hard links of a file which is kept, "
+                "deleting them frees no space:"
+            )
+            print_hardlinks(hardlinks)
+
     elif operation_mode == Operation.SORT:
         files_to_process = files_to_operate
         dst_data = src_data
@@ -432,7 +1253,11 @@ def operate(ctx, src, dst, operation_mode, dry_run=False):
                 files_to_process=files_to_process,
             )
         )
-        if duplicated_list_of_different_filenames_to_import:
+        if duplicated_list_of_different_filenames_to_import and events:
+            events.duplicates(
+                duplicated_list_of_different_filenames_to_import, kept="first"
+            )
+        elif duplicated_list_of_different_filenames_to_import:
             console.warning(
                 "The files you attempt to import contain duplicates with different names.\n"
                 "I will use the shortest name for each of the following groups:"
@@ -442,8 +1267,12 @@ def operate(ctx, src, dst, operation_mode, dry_run=False):
             )
 
     console.info(f"Detected {len(files_to_process)} files.")
+    if events:
+        events.emit("detected", files=len(files_to_process), dry_run=dry_run)
     if dry_run:
         console.warning(f"Running in dry-run, so no changes will be effective.")
+    from rich.prompt import Confirm
+
     if (
         files_to_process
         and ctx.interactive
@@ -452,10 +1281,84 @@ def operate(ctx, src, dst, operation_mode, dry_run=False):
         return
 
     # actual processing
-    tree, skipped_tree = process_files(
-        ctx, src_data, dst_data, files_to_process, operation_mode, start_dt, dry_run
-    )
+    try:
+        tree, skipped_tree = process_files(
+            ctx,
+            src_data,
+            dst_data,
+            files_to_process,
+            operation_mode,
+            start_dt,
+            dry_run,
+            events=events,
+        )
+    finally:
+        # files already transferred are recorded even when others failed
+        save_catalogues(ctx, src_data, dst_data, dry_run)
+
+    if events:
+        events.emit(
+            "summary",
+            operation=operation_mode,
+            processed=events.counts[str(operation_mode)],
+            skipped=events.counts["skipped"],
+            dry_run=dry_run,
+        )
+    else:
+        print_trees(ctx, src_data, dst_data, operation_mode, tree, skipped_tree)
+
+
+def save_catalogues(ctx, src_data, dst_data, dry_run):
+    if dry_run:
+        return
+    if isinstance(src_data, Catalogue):
+        ctx.storage.save_catalogue(src_data)
+    if isinstance(dst_data, Catalogue) and dst_data is not src_data:
+        ctx.storage.save_catalogue(dst_data)
+
+
+def import_with_daemon(ctx, client, src, dst, operation_mode, dry_run):
+    from .daemon import DaemonError
 
+    try:
+        daemon_events = client.request(
+            "import",
+            name=dst,
+            path=Path(src).expanduser().resolve(),
+            operation=str(operation_mode),
+            dry_run=dry_run,
+            format_pattern=ctx.global_settings.format_pattern,
+            unknown_format_pattern=ctx.global_settings.unknown_format_pattern,
+        )
+    except DaemonError as exception:
+        raise click.BadParameter(str(exception))
+
+    events = get_event_stream(ctx)
+    for daemon_event in daemon_events:
+        name = daemon_event.pop("event")
+        if events:
+            events.emit(name, **daemon_event)
+        elif name == "detected":
+            console.info(f"Detected {daemon_event['files']} files.")
+            if dry_run:
+                console.warning(f"Running in dry-run, so no changes will be effective.")
+        elif name == "skipped":
+            console.print(f":warning: {daemon_event['path']} has not being processed")
+        elif name == str(operation_mode):
+            console.print(
+                f"{operation_mode.value.title()} {daemon_event['src']} -> {daemon_event['dst']}"
+            )
+    if events:
+        events.emit(
+            "summary",
+            operation=operation_mode,
+            processed=events.counts[str(operation_mode)],
+            skipped=events.counts["skipped"],
+            dry_run=dry_run,
+        )
+
+
+def print_trees(ctx, src_data, dst_data, operation_mode, tree, skipped_tree):
     if dst_data:
         tree_starting_path = dst_data.path
     else:
@@ -464,13 +1367,19 @@ def operate(ctx, src, dst, operation_mode, dry_run=False):
     guide_style = "bold bright_blue"
     if operation_mode == Operation.DELETE:
         guide_style = "bold green"
-    rendered_tree = tree.generate_tree(tree_starting_path, guide_style=guide_style)
+    # verbose mode lists every file, otherwise big directories are summarised
+    collapse_threshold = None if ctx.verbose else COLLAPSE_THRESHOLD
+    rendered_tree = tree.generate_tree(
+        tree_starting_path, guide_style=guide_style, collapse_threshold=collapse_threshold
+    )
     if rendered_tree:
         console.print(f"\n{operation_mode.value.title()} {tree.file_count} files:")
         console.print(rendered_tree)
 
     rendered_skipped_tree = skipped_tree.generate_tree(
-        src_data.path, guide_style="bold bright_black"
+        src_data.path,
+        guide_style="bold bright_black",
+        collapse_threshold=collapse_threshold,
     )
     if rendered_skipped_tree:
         console.print(
@@ -478,39 +1387,104 @@ def operate(ctx, src, dst, operation_mode, dry_run=False):
         )
         console.print(rendered_skipped_tree)
 
-    # save catalogues
-    if isinstance(src_data, Catalogue) and not dry_run:
-        ctx.storage.save_catalogue(src_data)
-    if isinstance(dst_data, Catalogue) and not dry_run:
-        ctx.storage.save_catalogue(dst_data)
+
+# transfers in flight at once, the device queues bound how many of them run
+TRANSFER_WINDOW = 32
+
+
+class TransferError(click.ClickException):
+    """
+    Raised once every transfer completed, when some of them failed. Those failures were reported
+    already, the rest of the files got transferred.
+    """
+
+    def __init__(self, failures):
+        self.failures = failures
+        file, exception = failures[0]
+        super().__init__(
+            f"{len(failures)} files could not be transferred, e.g. {file.path}: {exception}"
+        )
 
 
 def process_files(
-    ctx, src_data, dst_data, files_to_process, operation_mode, start_dt, dry_run
+    ctx,
+    src_data,
+    dst_data,
+    files_to_process,
+    operation_mode,
+    start_dt,
+    dry_run,
+    events: Optional[EventStream] = None,
 ):
+    """
+    Returns the trees of processed and skipped files, those stay empty when events are streamed instead
+    """
     path_format = ctx.global_settings.format_pattern
     unknown_format_pattern = ctx.global_settings.unknown_format_pattern
     if isinstance(dst_data, Catalogue):
         path_format = path_format or dst_data.format_pattern
         unknown_format_pattern = unknown_format_pattern or dst_data.unknown_format_pattern
-    if operation_mode.SORT and isinstance(src_data, Catalogue):
+    if operation_mode == Operation.SORT and isinstance(src_data, Catalogue):
         path_format = path_format or src_data.format_pattern
         unknown_format_pattern = unknown_format_pattern or src_data.unknown_format_pattern
         
 
     tree = DirectoryTree()
     skipped_tree = DirectoryTree()
-
-    with console.status(
-        f"[green]Processing files...",
-    ) as status:
+    if operation_mode != Operation.DELETE:
+        # destinations need the type and, for dated patterns, the creation date of every file
+        read_metadata(
+            files_to_process,
+            "Reading creation dates",
+            creation_dates=bool(path_format and "%" in path_format),
+        )
+    files_to_process = sort_for_reading(files_to_process)
+    device_queues = get_device_queues()
+    # transfers run on the queue of their devices and complete in order
+    in_flight = deque()
+    # destinations of transfers in flight, not in the destination directory yet
+    reserved_paths = set()
+    # (file, exception) of the transfers which failed, the others carry on
+    failures = []
+
+    with console.progress("Processing files") as status:
+
+        def report(processed_file, old_path):
+            if events:
+                events.emit(
+                    str(operation_mode),
+                    src=old_path,
+                    dst=processed_file.path,
+                    size=processed_file.size,
+                    dry_run=dry_run,
+                )
+            else:
+                tree.add_imported_file(processed_file, old_path=old_path)
+            status.tracker.advance(size=processed_file.size)
+
+        def complete_oldest_transfer():
+            future, file, old_path, dst_file_path = in_flight.popleft()
+            try:
+                processed_file = future.result()
+            except Exception as exception:
+                failures.append((file, exception))
+                if events:
+                    events.file("failed", file, dst=dst_file_path, reason=str(exception))
+                status.tracker.advance(size=file.size)
+                return
+            finally:
+                reserved_paths.discard(dst_file_path)
+            complete_transfer(file, processed_file, dst_file_path, operation_mode, dst_data)
+            report(processed_file, old_path)
+
+        status.tracker.start_stage(
+            "transfer",
+            total=len(files_to_process),
+            total_bytes=sum(file.size for file in files_to_process),
+        )
+        planned_files = []
         for file in files_to_process:
-            status.update(
-                status=f"[green]Processing file {tree.file_count} of {len(files_to_process)}"
-            )
             dst_file_path = None
-            old_path = file.path
-
             if operation_mode != Operation.DELETE:
                 new_filename = generate_filename(
                     file,
@@ -520,23 +1494,134 @@ def process_files(
                     import_dt=start_dt,
                 )
                 if not new_filename:
-                    skipped_tree.add_imported_file(file, old_path=file.path)
+                    if events:
+                        events.file("skipped", file, reason="unknown creation date")
+                    else:
+                        skipped_tree.add_imported_file(file, old_path=file.path)
+                    status.tracker.advance(size=file.size)
                     continue
 
                 dst_file_path = dst_data.path.joinpath(new_filename)
+            planned_files.append((file, dst_file_path))
 
-            processed_file = process_file(
-                file,
-                dst_file_path,
-                operation=operation_mode,
-                dst_directory=dst_data,
-                dry_run=dry_run,
+        if dry_run or operation_mode == Operation.DELETE:
+            for file, dst_file_path in planned_files:
+                old_path = file.path
+                processed_file = process_file(
+                    file,
+                    dst_file_path,
+                    operation=operation_mode,
+                    dst_directory=dst_data,
+                    dry_run=dry_run,
+                )
+                report(processed_file, old_path)
+            return tree, skipped_tree
+
+        # directories get created once, only for the files which do get transferred
+        transfers = []
+        for file, dst_file_path in planned_files:
+            dst_file_path = resolve_destination(
+                file, dst_file_path, operation_mode, dst_data, reserved_paths
             )
-
-            tree.add_imported_file(processed_file, old_path=old_path)
+            if dst_file_path is None:
+                report(file, file.path)
+                continue
+            reserved_paths.add(dst_file_path)
+            transfers.append((file, dst_file_path))
+        create_directories(dst_file_path.parent for _, dst_file_path in transfers)
+
+        if is_archive_data(src_data):
+            # members get extracted in a single pass through the archive instead of on the device queues
+            extract_from_archive(src_data, transfers, dst_data, complete=report)
+            return tree, skipped_tree
+        renamer = Renamer()
+        try:
+            for file, dst_file_path in transfers:
+                if len(in_flight) >= TRANSFER_WINDOW:
+                    complete_oldest_transfer()
+                future = device_queues.submit(
+                    transfer_file,
+                    file,
+                    dst_file_path,
+                    operation_mode,
+                    renamer,
+                    read_from=file.path,
+                    write_to=dst_file_path,
+                )
+                in_flight.append((future, file, file.path, dst_file_path))
+
+            while in_flight:
+                complete_oldest_transfer()
+        finally:
+            # files already moved must end up in the catalogue even if another transfer failed
+            while in_flight:
+                future, file, old_path, dst_file_path = in_flight.popleft()
+                if future.cancel():
+                    continue
+                with suppress(Exception):
+                    complete_transfer(
+                        file, future.result(), dst_file_path, operation_mode, dst_data
+                    )
+    if failures:
+        if not events:
+            console.warning(
+                f"{len(failures)} files could not be transferred:\n"
+                + "\n".join(f"{file.path}: {exception}" for file, exception in failures)
+            )
+        raise TransferError(failures)
     return tree, skipped_tree
 
 
+def extract_from_archive(archive, transfers, dst_directory, complete):
+    """
+    Copies `(member, destination)` pairs out of the archive in archive order, each extracted file
+    gets added to the destination and passed to `complete` as soon as it is written
+    """
+    for member, extracted_file in archive.extract(transfers):
+        complete_transfer(member, extracted_file, extracted_file.path, Operation.COPY, dst_directory)
+        complete(extracted_file, member.path)
+
+
+def resolve_destination(file, dst_file_path, operation, dst_directory, reserved_paths=()):
+    """
+    Returns where the file should be transferred to, None when it should stay where it is
+    """
+    path_available = (
+        dst_directory.is_path_available(dst_file_path)
+        and dst_file_path not in reserved_paths
+    )
+    if not path_available:
+        if operation == Operation.SORT:
+            # TODO: check if it is same file, for now just avoid moving it
+            return None
+        logging.debug(f"Path {dst_file_path} not available, renaming file")
+        dst_file_path = dst_directory.find_new_path(
+            dst_file_path, reserved_paths=reserved_paths
+        )
+    logging.debug(f"{file.path} -> {dst_file_path}")
+    return dst_file_path
+
+
+def transfer_file(file, dst_file_path, operation, renamer: Renamer):
+    """
+    Copies or moves the file contents, runs on the device queues so it leaves the catalogues untouched.
+    The destination directory must exist already.
+    """
+    if operation == Operation.COPY:
+        return file.clone_file(dst_file_path)
+    renamer.move(file.path, dst_file_path, src_device=file.inode[0] if file.inode else None)
+    return file
+
+
+def complete_transfer(file, processed_file, dst_file_path, operation, dst_directory):
+    if operation == Operation.COPY:
+        dst_directory.add_file(processed_file)
+        return
+    file.path = dst_file_path
+    if operation == Operation.MOVE:
+        dst_directory.add_file(file)
+
+
 def process_file(file, dst_file_path, operation, dst_directory, dry_run):
     logging.debug(f"{file.path} -> {dst_file_path}")
 
@@ -547,7 +1632,7 @@ def process_file(file, dst_file_path, operation, dst_directory, dry_run):
 
     path_available = dst_directory.is_path_available(dst_file_path)
     if not path_available:
-        if operation.SORT:
+        if operation == Operation.SORT:
             # TODO: check if it is same file, for now just avoid moving it
             return file
         logging.debug(f"Path {dst_file_path} not available, renaming file")
@@ -0,0 +1,54 @@
+import json
+import sys
+from collections import Counter
+from enum import Enum
+
+
+class OutputFormat(Enum):
+    RICH = "rich"
+    NDJSON = "ndjson"
+
+    def __str__(self):
+        return self.value
+
+
+class EventStream:
+    """
+    Writes one JSON document per line as events happen, meant to be consumed by other programs
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self.counts = Counter()
+
+    def emit(self, event: str, **fields):
+        self.counts[event] += 1
+        stream = self.stream or sys.stdout
+        stream.write(json.dumps({"event": event, **fields}, default=str) + "\n")
+        stream.flush()
+
+    def file(self, event: str, file, **fields):
+        self.emit(event, path=file.path, size=file.size, **fields)
+
+    def duplicates(self, duplicated_files, **fields):
+        for duplicated_list in duplicated_files:
+            self.emit(
+                "duplicates",
+                size=duplicated_list[0].size,
+                paths=[file.path for file in duplicated_list],
+                **fields,
+            )
+
+
+class EventCollector(EventStream):
+    """
+    Keeps the events in memory instead of writing them, e.g. to send them back to a client
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def emit(self, event: str, **fields):
+        self.counts[event] += 1
+        self.events.append(json.loads(json.dumps({"event": event, **fields}, default=str)))
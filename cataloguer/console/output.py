@@ -3,7 +3,6 @@ from pathlib import Path
 
 from rich import box
 from rich.columns import Columns
-from rich.markdown import Markdown
 from rich.panel import Panel
 from rich.table import Table
 from rich.text import Text
@@ -33,14 +32,38 @@ def print_processing(src_path: Path, dst_path: Path, imported_files, skipped_fil
     console.print(table)
 
 
-def print_table_summary(duplicated_files, files, name):
-    files_by_media = Counter((file.get_media_type() for file in files))
+def summarise_files(duplicated_files, files):
+    """
+    Returns count, size and duplicates by media type
+    """
+    files_by_media = Counter()
     files_size_by_media = defaultdict(int)
     for file in files:
-        files_size_by_media[file.get_media_type()] += file.size
+        media_type = file.get_media_type()
+        files_by_media[media_type] += 1
+        files_size_by_media[media_type] += file.size
     duplicated_files_by_media = Counter(
         (file.get_media_type() for sublist in duplicated_files for file in sublist[:1])
     )
+    return {
+        media_type: {
+            "files": count,
+            "size": files_size_by_media[media_type],
+            "duplicates": duplicated_files_by_media.get(media_type, 0),
+        }
+        for media_type, count in files_by_media.items()
+    }
+
+
+def print_table_summary(duplicated_files, files, name):
+    summary = summarise_files(duplicated_files=duplicated_files, files=files)
+    print_media_summary(summary, name)
+
+
+def print_media_summary(summary, name):
+    """
+    Prints the result of `summarise_files`
+    """
     table = Table(
         show_header=True,
         show_footer=True,
@@ -55,37 +78,47 @@ def print_table_summary(duplicated_files, files, name):
     )
     table.add_column(
         "Size",
-        approximate_size(sum(files_size_by_media.values())),
+        approximate_size(sum(media["size"] for media in summary.values())),
         justify="right",
         style="white",
         no_wrap=True,
     )
     table.add_column(
-        "Files", str(len(files)), justify="right", style="white", no_wrap=True
+        "Files",
+        str(sum(media["files"] for media in summary.values())),
+        justify="right",
+        style="white",
+        no_wrap=True,
     )
     table.add_column(
         "Duplicates",
-        Text.from_markup(str(sum(duplicated_files_by_media.values())), style="red"),
+        Text.from_markup(
+            str(sum(media["duplicates"] for media in summary.values())), style="red"
+        ),
         no_wrap=True,
         justify="right",
         style="red",
     )
-    for file_type, count in files_by_media.items():
+    for file_type, media in summary.items():
         prefix = "[dim]"
         if file_type in ("image", "video"):
             prefix = ""
         table.add_row(
             prefix + file_type,
-            prefix + approximate_size(files_size_by_media[file_type]),
-            prefix + str(count),
-            prefix + str(duplicated_files_by_media.get(file_type, 0)),
+            prefix + approximate_size(media["size"]),
+            prefix + str(media["files"]),
+            prefix + str(media["duplicates"]),
         )
     # centered_table = Align.center(table)
+    from rich.markdown import Markdown  # pulls in pygments, only needed here
+
     console.print(Markdown(f"# {name}"))
     console.print(table)
 
 
 def print_duplicate_files(duplicated_files, from_path=None):
+    from rich.markdown import Markdown
+
     console.print(Markdown("## Duplicates"))
     panels = []
     for duplicated_list in sorted(
@@ -115,3 +148,124 @@ def print_duplicate_files(duplicated_files, from_path=None):
             )
         )
     console.print(Columns(panels))
+
+
+def print_similar_files(similar_files, from_path=None):
+    from rich.markdown import Markdown
+
+    console.print(Markdown("## Similar images"))
+    panels = []
+    for group in similar_files:
+        paths = [file.path for file in group]
+        if from_path:
+            paths = [
+                path.relative_to(from_path) if path.is_relative_to(from_path) else path
+                for path in paths
+            ]
+        panels.append(
+            Panel(
+                "\n".join(str(path) for path in paths),
+                border_style="bright_black",
+                expand=True,
+                title=f"{len(group)} images",
+            )
+        )
+    console.print(Columns(panels))
+
+
+def print_located_files(located_files, from_path=None):
+    table = Table(
+        show_header=True,
+        header_style="bold",
+        box=box.SIMPLE,
+    )
+    table.border_style = "bright_black"
+    table.add_column("File", style="white")
+    table.add_column("Catalogue", style="purple")
+    table.add_column("Catalogued Path", style="white")
+
+    for file, entries in located_files:
+        path = file.path.relative_to(from_path) if from_path else file.path
+        for entry in entries:
+            table.add_row(str(path), entry.catalogue, str(entry.path))
+    console.print(table)
+
+
+def print_hardlinks(hardlinks, from_path=None):
+    table = Table(
+        show_header=True,
+        header_style="bold",
+        box=box.SIMPLE,
+    )
+    table.border_style = "bright_black"
+    table.add_column("Hard Link", style="white")
+    table.add_column("Linked To", style="white")
+
+    for file, linked_file in hardlinks:
+        paths = [file.path, linked_file.path]
+        if from_path:
+            paths = [path.relative_to(from_path) for path in paths]
+        table.add_row(*(str(path) for path in paths))
+    console.print(table)
+
+
+def print_profile(report):
+    table = Table(
+        show_header=True,
+        show_footer=True,
+        header_style="bold",
+        box=box.SIMPLE,
+        title="Profile",
+        caption="Stages can nest, e.g. loading a catalogue may walk its directory",
+    )
+    table.border_style = "bright_black"
+    stages = report["stages"]
+    table.add_column("Stage", Text.from_markup("[b]Total"), style="white")
+    table.add_column(
+        "Wall Time", f"{report['wall_time']:.3f}s", justify="right", no_wrap=True
+    )
+    table.add_column("Calls", justify="right", no_wrap=True)
+    table.add_column("Read", justify="right", no_wrap=True)
+    table.add_column("Written", justify="right", no_wrap=True)
+    table.add_column("Read/s", justify="right", no_wrap=True, style="cyan")
+    for name, stats in sorted(
+        stages.items(), key=lambda item: item[1]["wall_time"], reverse=True
+    ):
+        wall_time = stats["wall_time"]
+        throughput = ""
+        if stats["bytes_read"] and wall_time:
+            throughput = f"{approximate_size(stats['bytes_read'] / wall_time)}/s"
+        table.add_row(
+            name,
+            f"{wall_time:.3f}s",
+            str(stats["calls"]),
+            approximate_size(stats["bytes_read"]),
+            approximate_size(stats["bytes_written"]),
+            throughput,
+        )
+    console.print(table)
+
+
+def print_verification(counts, state):
+    console.print(Text(f"Verification started at {state.started}", style="dim"))
+    table = Table(
+        show_header=True,
+        header_style="bold",
+        box=box.SIMPLE,
+    )
+    table.border_style = "bright_black"
+    table.add_column("Result", style="white")
+    table.add_column("Files", justify="right", no_wrap=True)
+    styles = {"mismatch": "red", "missing": "red", "hashed": "dim"}
+    for result, count in counts.items():
+        style = styles.get(result, "") if count else ""
+        prefix = f"[{style}]" if style else ""
+        table.add_row(prefix + result, prefix + str(count))
+    console.print(table)
+
+    for result in ("mismatch", "missing"):
+        paths = [path for path, value in state.results.items() if value == result]
+        if paths:
+            console.print(Text(f"{result.title()} files:", style="bold red"))
+            for path in sorted(paths):
+                console.print(f"  {path}", markup=False)
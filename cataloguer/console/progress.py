@@ -0,0 +1,87 @@
+import time
+from datetime import timedelta
+from typing import List, Optional
+
+from ..filesystem.utils import approximate_size
+
+
+class Stage:
+    __slots__ = ("name", "total", "total_bytes", "completed", "completed_bytes", "start", "end")
+
+    def __init__(self, name: str, total: Optional[int] = None, total_bytes: Optional[int] = None):
+        self.name = name
+        self.total = total
+        self.total_bytes = total_bytes
+        self.completed = 0
+        self.completed_bytes = 0
+        self.start = time.monotonic()
+        self.end = None
+
+    @property
+    def elapsed(self):
+        return (self.end or time.monotonic()) - self.start
+
+    @property
+    def eta(self) -> Optional[float]:
+        elapsed = self.elapsed
+        if self.total_bytes and self.completed_bytes:
+            return (self.total_bytes - self.completed_bytes) * elapsed / self.completed_bytes
+        if self.total and self.completed:
+            return (self.total - self.completed) * elapsed / self.completed
+        return None
+
+
+class ProgressTracker:
+    """
+    Counters updated by the work loops and rendered by the status refresh thread,
+    so the per file cost is just increasing a couple of integers.
+    """
+
+    def __init__(self, title: str):
+        self.title = title
+        self.stages: List[Stage] = []
+
+    @property
+    def current(self) -> Optional[Stage]:
+        return self.stages[-1] if self.stages else None
+
+    def start_stage(self, name: str, total: Optional[int] = None, total_bytes: Optional[int] = None):
+        if self.current and self.current.end is None:
+            self.current.end = time.monotonic()
+        self.stages.append(Stage(name=name, total=total, total_bytes=total_bytes))
+
+    def advance(self, files=1, size=0):
+        stage = self.stages[-1]
+        stage.completed += files
+        stage.completed_bytes += size
+
+    def __rich__(self):
+        from rich.text import Text
+
+        text = Text()
+        for stage in self.stages[:-1]:
+            text.append(
+                f"{stage.name}: {stage.completed:,} files "
+                f"{approximate_size(stage.completed_bytes)} in {stage.elapsed:.1f}s\n",
+                style="dim",
+            )
+        text.append(self.title, style="green")
+        stage = self.current
+        if stage is None:
+            return text
+
+        elapsed = stage.elapsed or 1e-9
+        text.append(f" {stage.name}: ")
+        if stage.total is not None:
+            text.append(f"{stage.completed:,}/{stage.total:,} files")
+        else:
+            text.append(f"{stage.completed:,} files")
+        text.append(f" · {stage.completed / elapsed:,.1f} files/s", style="cyan")
+        if stage.completed_bytes:
+            text.append(
+                f" · {approximate_size(stage.completed_bytes / elapsed)}/s", style="cyan"
+            )
+        eta = stage.eta
+        if eta is not None:
+            text.append(f" · ETA {timedelta(seconds=round(eta))}", style="yellow")
+        return text
@@ -1,42 +1,37 @@
 from pathlib import Path
-from typing import List, Set
+from typing import Dict, Optional
 
-from pydantic import BaseModel
-from rich.markup import escape
-from rich.tree import Tree
-
-from ..filesystem.file import File
 from ..filesystem.utils import approximate_size
 
+COLLAPSE_THRESHOLD = 100
+
+
+class FileInfo:
+    __slots__ = ("file", "old_path")
 
-class FileInfo(BaseModel):
-    file: File
-    old_path: Path
+    def __init__(self, file, old_path: Path):
+        self.file = file
+        self.old_path = old_path
 
     @property
     def path(self):
         return self.file.path or self.old_path
 
-    def __hash__(self):
-        return self.path.__hash__()
-
-    def __eq__(self, other):
-        return self.path == other.path
-
-    class Config:
-        arbitrary_types_allowed = True
-
 
-class DirectoryInfo(BaseModel):
-    path: Path
-    files: Set[FileInfo]
-    sub_directories: Set["DirectoryInfo"]
+class DirectoryInfo:
+    """
+    Tree node, file counts and sizes include sub directories
+    """
 
-    def __hash__(self):
-        return self.path.__hash__()
+    __slots__ = ("path", "parent", "files", "sub_directories", "file_count", "size")
 
-    def __eq__(self, other):
-        return self.path == other.path
+    def __init__(self, path: Path, parent: Optional["DirectoryInfo"] = None):
+        self.path = path
+        self.parent = parent
+        self.files: Dict[Path, FileInfo] = {}
+        self.sub_directories: Dict[Path, "DirectoryInfo"] = {}
+        self.file_count = 0
+        self.size = 0
 
 
 class DirectoryTree:
@@ -46,32 +41,44 @@ class DirectoryTree:
     def __init__(self):
         self.tree = {}
 
-    def add_imported_file(self, file, old_path):
-        parent_directory_info = None
+    def _get_directory_info(self, path: Path) -> DirectoryInfo:
+        directory_info = self.tree.get(path)
+        if directory_info is None:
+            parent = None
+            if path.parent != path:
+                parent = self._get_directory_info(path.parent)
+            directory_info = self.tree[path] = DirectoryInfo(path=path, parent=parent)
+            if parent is not None:
+                parent.sub_directories[path] = directory_info
+        return directory_info
 
+    def add_imported_file(self, file, old_path):
         if file.path is None:
             path = old_path  # file was deleted
         else:
             path = file.path
 
-        for directory_path in _get_parents(path.parent):
-            directory_info = self.tree.setdefault(
-                directory_path,
-                DirectoryInfo(path=directory_path, files=[], sub_directories=[]),
-            )
-            if parent_directory_info:
-                parent_directory_info.sub_directories.add(directory_info)
-            parent_directory_info = directory_info
+        directory_info = self._get_directory_info(path.parent)
+        if path in directory_info.files:
+            return
+        directory_info.files[path] = FileInfo(file=file, old_path=old_path)
 
         self.file_count += 1
-        directory_info.files.add(
-            FileInfo(
-                file=file,
-                old_path=old_path,
-            )
-        )
+        while directory_info is not None:
+            directory_info.file_count += 1
+            directory_info.size += file.size
+            directory_info = directory_info.parent
+
+    def generate_tree(
+        self, dst_path, guide_style="bold bright_blue", collapse_threshold=None
+    ):
+        """
+        Renders the files under `dst_path`.
+        With a `collapse_threshold`, directories holding more files than it get summarised.
+        """
+        from rich.markup import escape
+        from rich.tree import Tree
 
-    def generate_tree(self, dst_path, guide_style="bold bright_blue"):
         directory_info = self.tree.get(dst_path)
         if not directory_info:
             return None
@@ -79,12 +86,25 @@ class DirectoryTree:
             f":open_file_folder: [link file://{directory_info.path}]{escape(directory_info.path.name)}",
             guide_style=guide_style,
         )
-        _expand_tree(tree=tree, directory_info=directory_info)
+        _expand_tree(
+            tree=tree,
+            directory_info=directory_info,
+            collapse_threshold=collapse_threshold,
+        )
         return tree
 
 
-def _expand_tree(tree, directory_info: DirectoryInfo):
-    for file_info in directory_info.files:
+def _expand_tree(tree, directory_info: DirectoryInfo, collapse_threshold=None):
+    from rich.markup import escape
+
+    file_infos = list(directory_info.files.values())
+    if collapse_threshold is not None and len(file_infos) > collapse_threshold:
+        hidden_file_infos = file_infos[collapse_threshold:]
+        file_infos = file_infos[:collapse_threshold]
+    else:
+        hidden_file_infos = []
+
+    for file_info in file_infos:
         if file_info.file.path is None:
             tree.add(
                 f"{file_info.old_path.name} [b green]{approximate_size(file_info.file.size)}"
@@ -97,20 +117,28 @@ def _expand_tree(tree, directory_info: DirectoryInfo):
             tree.add(
                 f"{file_info.file.path.name} [b bright_yellow]{approximate_size(file_info.file.size)}"
             )
+    if hidden_file_infos:
+        tree.add(
+            f"[dim]... {len(hidden_file_infos)} more files "
+            f"[b]{approximate_size(sum(file_info.file.size for file_info in hidden_file_infos))}"
+        )
 
     for sub_directory_info in sorted(
-        directory_info.sub_directories, key=lambda directory: directory.path
+        directory_info.sub_directories.values(), key=lambda directory: directory.path
     ):
-        branch = tree.add(
-            f":open_file_folder: [b bold][link file://{sub_directory_info.path}]{escape(sub_directory_info.path.name)}[/]"
+        label = f":open_file_folder: [b bold][link file://{sub_directory_info.path}]{escape(sub_directory_info.path.name)}[/]"
+        if (
+            collapse_threshold is not None
+            and sub_directory_info.file_count > collapse_threshold
+        ):
+            tree.add(
+                f"{label} [dim]{sub_directory_info.file_count} files[/] "
+                f"[b]{approximate_size(sub_directory_info.size)}"
+            )
+            continue
+        branch = tree.add(label)
+        _expand_tree(
+            tree=branch,
+            directory_info=sub_directory_info,
+            collapse_threshold=collapse_threshold,
         )
-        _expand_tree(tree=branch, directory_info=sub_directory_info)
-
-
-def _get_parents(path: Path) -> List[Path]:
-    directories = []
-    while path != Path("/"):
-        directories.append(path)
-        path = path.parent
-    directories.reverse()
-    return directories
@@ -0,0 +1,17 @@
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from .console.events import OutputFormat
+from .settings import GlobalSettings
+from .storage import Storage
+
+
+class Context(BaseModel):
+    global_settings: GlobalSettings
+    storage: Storage
+    workdir: Path
+    verbose: bool
+    interactive: bool
+    output: OutputFormat = OutputFormat.RICH
+    use_daemon: bool = True
@@ -0,0 +1,276 @@
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict
+
+from .console.events import EventCollector
+
+logger = logging.getLogger(__name__)
+
+# seconds a ping waits for, a daemon which does not answer by then is not used
+PING_TIMEOUT = 1.0
+# answered right away, even while another request is being handled
+UNLOCKED_COMMANDS = ("ping",)
+
+
+class DaemonError(Exception):
+    pass
+
+
+class DaemonClient:
+    """
+    Sends requests to a running `cataloguer serve`, one JSON document per line each way
+    """
+
+    def __init__(self, socket_path: Path, timeout=None):
+        self.socket_path = Path(socket_path)
+        self.timeout = timeout
+
+    def is_running(self):
+        if not self.socket_path.exists():
+            return False
+        try:
+            # a connection of its own, so a long request in flight does not keep it waiting
+            self._request("ping", {}, timeout=PING_TIMEOUT)
+        except (OSError, DaemonError):
+            return False
+        return True
+
+    def request(self, command: str, **arguments):
+        return self._request(command, arguments, timeout=self.timeout)
+
+    def _request(self, command: str, arguments, timeout):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.settimeout(timeout)
+            connection.connect(str(self.socket_path))
+            with connection.makefile("rw") as stream:
+                stream.write(
+                    json.dumps({"command": command, "arguments": arguments}, default=str)
+                    + "\n"
+                )
+                stream.flush()
+                line = stream.readline()
+        if not line:
+            raise DaemonError("Daemon closed the connection")
+        response = json.loads(line)
+        if not response["ok"]:
+            raise DaemonError(response["error"])
+        return response["result"]
+
+
+class CatalogueDaemon:
+    """
+    Keeps catalogues, with their hashes and membership filters, loaded between requests.
+    Requests are handled one at a time, pings are answered meanwhile. A catalogue saved by another
+    process since it was loaded (e.g. a `copy` run with `--no-daemon`) gets loaded again.
+    """
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.catalogues: Dict[str, object] = {}
+        # `Storage.catalogue_version` of each catalogue when it was loaded or last saved here
+        self._versions: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.server = None
+
+    def get_catalogue(self, name):
+        version = self.ctx.storage.catalogue_version(name)
+        if version is None:
+            self.forget_catalogue(name)
+            raise DaemonError(f'Catalogue "{name}" not found')
+        catalogue = self.catalogues.get(name)
+        if catalogue is None or self._versions.get(name) != version:
+            catalogue = self.ctx.storage.load_catalogue(name, force_reload=False)
+            if not catalogue:
+                raise DaemonError(f'Catalogue "{name}" not found')
+            self.catalogues[name] = catalogue
+            self._versions[name] = version
+        return catalogue
+
+    def forget_catalogue(self, name):
+        self.catalogues.pop(name, None)
+        self._versions.pop(name, None)
+
+    def save_catalogue(self, catalogue):
+        self.ctx.storage.save_catalogue(catalogue)
+        self._versions[catalogue.name] = self.ctx.storage.catalogue_version(catalogue.name)
+
+    def save_if_modified(self, catalogue, duplicates):
+        """
+        Saves what a read only request found out (hashes and duplicates), if anything
+        """
+        if catalogue.is_modified or catalogue.stats.duplicates != duplicates:
+            self.save_catalogue(catalogue)
+
+    def handle(self, command, arguments):
+        handler = getattr(self, f"op_{command}", None)
+        if handler is None:
+            raise DaemonError(f'Unknown command "{command}"')
+        if command in UNLOCKED_COMMANDS:
+            return handler(**arguments)
+        with self._lock:
+            return handler(**arguments)
+
+    def op_ping(self):
+        # a copy, requests might be loading catalogues meanwhile
+        return {"pid": os.getpid(), "catalogues": sorted(self.catalogues.copy())}
+
+    def op_reload(self, name=None):
+        """
+        Forgets loaded catalogues, they get loaded again on the next request
+        """
+        if name:
+            self.forget_catalogue(name)
+        else:
+            self.catalogues = {}
+            self._versions = {}
+        return self.op_ping()
+
+    def op_shutdown(self):
+        # shutdown waits for the serving loop, which is busy handling this request
+        threading.Thread(target=self.server.shutdown, daemon=True).start()
+        return {"pid": os.getpid()}
+
+    def op_duplicates(self, name, media_only=True):
+        catalogue = self.get_catalogue(name)
+        duplicates = catalogue.stats.duplicates
+        duplicated_files = catalogue.detect_duplicates(media_only=media_only)
+        self.save_if_modified(catalogue, duplicates)
+        return [
+            {"size": duplicated_list[0].size, "paths": [str(file.path) for file in duplicated_list]}
+            for duplicated_list in duplicated_files
+        ]
+
+    def op_inspect(self, name, media_only=True):
+        from .console.output import summarise_files
+
+        catalogue = self.get_catalogue(name)
+        duplicates = catalogue.stats.duplicates
+        duplicated_files = catalogue.detect_duplicates(media_only=media_only)
+        files = catalogue.files
+        if media_only:
+            files = [file for file in files if file.is_media_type()]
+        summary = summarise_files(duplicated_files=duplicated_files, files=files)
+        self.save_if_modified(catalogue, duplicates)
+        return {
+            "catalogue": catalogue.name,
+            "path": str(catalogue.path),
+            "files": len(files),
+            "media_types": summary,
+            "duplicates": [
+                {"size": duplicated_list[0].size, "paths": [str(file.path) for file in duplicated_list]}
+                for duplicated_list in duplicated_files
+            ],
+        }
+
+    def op_import(
+        self,
+        name,
+        path,
+        operation="copy",
+        dry_run=False,
+        format_pattern=None,
+        unknown_format_pattern=None,
+    ):
+        """
+        Copies or moves a single file into a catalogue, unless the catalogue already holds it
+        """
+        from .cli import Operation, process_files
+        from .filesystem.file import File
+
+        operation_mode = Operation(operation)
+        if operation_mode not in (Operation.COPY, Operation.MOVE):
+            raise DaemonError(f'Operation "{operation}" cannot import files')
+        catalogue = self.get_catalogue(name)
+        path = Path(path)
+        if not path.is_file():
+            raise DaemonError(f'Error "{path}" is not an existing file')
+        file = File(path)
+
+        events = EventCollector()
+        if not file.is_media_type():
+            events.emit("detected", files=0, dry_run=dry_run)
+            return events.events
+
+        duplicates = catalogue.detect_duplicates_with([file])
+        if duplicates:
+            events.emit(
+                "duplicates",
+                size=file.size,
+                paths=[str(duplicate.path) for duplicate in duplicates[0]],
+            )
+            events.emit("detected", files=0, dry_run=dry_run)
+            return events.events
+
+        events.emit("detected", files=1, dry_run=dry_run)
+        settings = self.ctx.global_settings.copy(
+            update={
+                "format_pattern": format_pattern or self.ctx.global_settings.format_pattern,
+                "unknown_format_pattern": unknown_format_pattern
+                or self.ctx.global_settings.unknown_format_pattern,
+            }
+        )
+        try:
+            process_files(
+                self.ctx.copy(update={"global_settings": settings}),
+                file,
+                catalogue,
+                [file],
+                operation_mode,
+                datetime.now(timezone.utc),
+                dry_run,
+                events=events,
+            )
+        finally:
+            if not dry_run:
+                self.save_catalogue(catalogue)
+        return events.events
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                result = self.server.catalogue_daemon.handle(
+                    request["command"], request.get("arguments") or {}
+                )
+                response = {"ok": True, "result": result}
+            except Exception as exception:
+                logger.debug("Request failed", exc_info=True)
+                response = {"ok": False, "error": str(exception)}
+            self.wfile.write((json.dumps(response, default=str) + "\n").encode())
+            self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def create_server(ctx, socket_path: Path) -> _UnixServer:
+    """
+    Binds the daemon socket, a stale socket left by a daemon which did not exit cleanly gets replaced
+    """
+    socket_path = Path(socket_path)
+    if socket_path.exists():
+        if DaemonClient(socket_path).is_running():
+            raise DaemonError(f"A daemon is already listening on {socket_path}")
+        socket_path.unlink()
+    server = _UnixServer(str(socket_path), _RequestHandler)
+    server.catalogue_daemon = CatalogueDaemon(ctx)
+    server.catalogue_daemon.server = server
+    return server
+
+
+def serve(ctx, socket_path: Path):
+    server = create_server(ctx, socket_path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        Path(socket_path).unlink(missing_ok=True)
@@ -0,0 +1,92 @@
+import os
+import weakref
+from functools import partial
+
+DEFAULT_MAX_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+_default_executor = None
+
+# asyncio and the thread pool get imported on first use: any caller awaiting these methods
+# already has them loaded, while synchronous code paths (most CLI commands) never pay for them
+
+
+class IOExecutor:
+    """
+    Runs blocking filesystem calls on a managed thread pool so they do not block the event loop.
+
+    `max_workers` bounds the number of threads, `max_concurrency` bounds how many calls
+    can be in flight at the same time (e.g. to avoid flooding slow network storage).
+    """
+
+    def __init__(self, max_workers=None, max_concurrency=None):
+        self.max_workers = max_workers or DEFAULT_MAX_WORKERS
+        self.max_concurrency = max_concurrency or self.max_workers
+        self._executor = None
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _get_semaphore(self, loop):
+        # asyncio primitives are bound to the loop they are first used on
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            import asyncio
+
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def run(self, func, *args, **kwargs):
+        import asyncio
+
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="cataloguer-io"
+            )
+        loop = asyncio.get_running_loop()
+        async with self._get_semaphore(loop):
+            return await loop.run_in_executor(
+                self._executor, partial(func, *args, **kwargs)
+            )
+
+    async def map(self, func, items):
+        """
+        Applies `func` to every item keeping at most `max_concurrency` calls in flight.
+        Results are returned in the same order as the given items.
+        """
+        import asyncio
+
+        items = list(items)
+        results = [None] * len(items)
+        pending = iter(enumerate(items))
+
+        async def worker():
+            for index, item in pending:
+                results[index] = await self.run(func, item)
+
+        await asyncio.gather(
+            *(worker() for _ in range(min(self.max_concurrency, len(items))))
+        )
+        return results
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        import asyncio
+
+        await asyncio.get_running_loop().run_in_executor(None, self.shutdown)
+
+
+def get_executor() -> IOExecutor:
+    """
+    Returns the shared executor used when no explicit one is given
+    """
+    global _default_executor
+    if _default_executor is None:
+        _default_executor = IOExecutor()
+    return _default_executor
@@ -0,0 +1,278 @@
+"""
+Zip and tar archives used as sources, their members get read straight from the archive
+instead of being extracted to scratch space first.
+"""
+import hashlib
+import io
+import logging
+import os
+import tarfile
+import threading
+import zipfile
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import Optional
+
+from ..console.default import console
+from ..profiling import profiler
+from .directory import Directory
+from .file import File, Observable
+from .metadata import get_image_creation_date, get_path_creation_date
+from .throttle import get_io_budget
+from .utils import COPY_CHUNK_SIZE, HASH_CHUNK_SIZE, _chunk_reader
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SUFFIXES = (
+    ".zip",
+    ".tar",
+    ".tar.gz",
+    ".tgz",
+    ".tar.bz2",
+    ".tbz2",
+    ".tar.xz",
+    ".txz",
+)
+# enough for libmagic and for EXIF metadata, which comes at the start of images
+HEAD_SIZE = 256 * 1024
+
+
+def is_archive(path) -> bool:
+    path = Path(path)
+    if not path.name.lower().endswith(ARCHIVE_SUFFIXES) or not path.is_file():
+        return False
+    return zipfile.is_zipfile(path) or tarfile.is_tarfile(path)
+
+
+class _ArchiveReader:
+    """
+    Keeps the archive open, reads are serialised since archive objects are not thread safe
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        if zipfile.is_zipfile(path):
+            self._zip = zipfile.ZipFile(path)
+            self._tar = None
+            # the central directory is read on open, it lists every member
+            self._infos = {info.header_offset: info for info in self._zip.infolist()}
+        else:
+            self._zip = None
+            self._tar = tarfile.open(path)
+            # tar headers are spread through the archive, they get known while reading it
+            self._infos = {}
+
+    def members(self):
+        """
+        Yields `(name, offset, size, modified timestamp, file object)` of every regular file,
+        in archive order. Offsets tell apart members stored more than once under the same name.
+        """
+        if self._zip is not None:
+            for info in self._zip.infolist():
+                if info.is_dir() or not _is_safe_name(info.filename):
+                    continue
+                with self._zip.open(info) as fd:
+                    yield info.filename, info.header_offset, info.file_size, _zip_timestamp(info), fd
+            return
+        # a single pass, compressed tar archives cannot seek backwards cheaply
+        for info in self._tar:
+            self._infos[info.offset] = info
+            if not info.isfile() or not _is_safe_name(info.name):
+                continue
+            with self._tar.extractfile(info) as fd:
+                yield info.name, info.offset, info.size, info.mtime, fd
+
+    def open(self, offset: int):
+        if self._zip is not None:
+            return self._zip.open(self._info(offset))
+        return self._tar.extractfile(self._info(offset))
+
+    def open_many(self, offsets):
+        """
+        Yields `(offset, file object)` of the given members. Tar members come in archive order from
+        a single forward pass, since reaching an earlier member of a compressed archive means
+        decompressing it again from the start.
+        """
+        if self._zip is not None:
+            for offset in sorted(offsets):
+                with self._zip.open(self._info(offset)) as fd:
+                    yield offset, fd
+            return
+        offsets = set(offsets)
+        with tarfile.open(self.path, "r|*") as tar:
+            for info in tar:
+                if not offsets:
+                    break
+                if info.offset not in offsets:
+                    continue
+                offsets.discard(info.offset)
+                with tar.extractfile(info) as fd:
+                    yield info.offset, fd
+
+    def _info(self, offset: int):
+        if offset not in self._infos and self._tar is not None:
+            # the archive was not read through `members`
+            self._infos.update((info.offset, info) for info in self._tar.getmembers())
+        return self._infos[offset]
+
+    def close(self):
+        for archive in (self._zip, self._tar):
+            if archive is not None:
+                archive.close()
+
+
+def _is_safe_name(name: str) -> bool:
+    # members are placed under the archive path, they cannot point outside of it
+    path = PurePosixPath(name)
+    if path.is_absolute() or ".." in path.parts:
+        logger.warning(f"Skipping archive member with an unsafe name: {name}")
+        return False
+    return True
+
+
+def _zip_timestamp(info) -> float:
+    try:
+        return datetime(*info.date_time).timestamp()
+    except ValueError:
+        return 0
+
+
+class ArchiveMember(File):
+    """
+    File inside an archive, with its hashes, type and creation date taken while scanning it.
+    It can only be copied out of the archive.
+    """
+
+    def __init__(
+        self,
+        archive: "Archive",
+        name: str,
+        offset: int,
+        size: int,
+        modified: float,
+        hash: str,
+        short_hash: str,
+        mimetype: str,
+        creation_date: Optional[datetime],
+    ):
+        Observable.__init__(self)
+        self.archive = archive
+        self.name = name
+        self.offset = offset
+        self._path = archive.path.joinpath(name)
+        self.size = size
+        self.modified = modified
+        self.inode = None
+        self._hash = hash
+        self._short_hash = short_hash
+        self._phash = None
+        self._mimetype = mimetype
+        self._creation_date = creation_date or get_path_creation_date(self._path)
+
+    def read_hash(self, first_chunk_only=False):
+        return self._short_hash if first_chunk_only else self._hash
+
+    def clone_file(self, new_path):
+        with self.archive.lock, self.archive.reader.open(self.offset) as src_object:
+            return self.extract_to(src_object, new_path)
+
+    def extract_to(self, src_object, new_path):
+        """
+        Writes the member, read from `src_object`, to `new_path` and returns the extracted file
+        """
+        budget = get_io_budget()
+        with profiler.measure("extract") as measurement:
+            with open(new_path, "wb") as dst_object:
+                for chunk in _chunk_reader(src_object, chunk_size=COPY_CHUNK_SIZE):
+                    if budget:
+                        budget.consume(len(chunk), operations=2)
+                    dst_object.write(chunk)
+                    measurement.bytes_read += len(chunk)
+            measurement.bytes_written = measurement.bytes_read
+        os.utime(new_path, (self.modified, self.modified))
+        return File(
+            path=new_path,
+            size=self.size,
+            hash=self._hash,
+            short_hash=self._short_hash,
+            mimetype=self._mimetype,
+            creation_date=self._creation_date,
+        )
+
+    def move_file(self, new_path):
+        raise OSError(f"{self.path} is inside an archive, it can only be copied")
+
+    def delete(self):
+        raise OSError(f"{self.path} is inside an archive, it can only be copied")
+
+
+def _scan_member(fd):
+    """
+    Reads a member once, returns its hash, short hash and first bytes
+    """
+    budget = get_io_budget()
+    hash_obj = hashlib.sha1()
+    head = bytearray()
+    with profiler.measure("hash") as measurement:
+        for chunk in _chunk_reader(fd, chunk_size=HASH_CHUNK_SIZE):
+            if budget:
+                budget.consume(len(chunk))
+            hash_obj.update(chunk)
+            if len(head) < HEAD_SIZE:
+                head += chunk[: HEAD_SIZE - len(head)]
+            measurement.bytes_read += len(chunk)
+    return hash_obj.hexdigest(), hashlib.sha1(head[:1024]).hexdigest(), bytes(head)
+
+
+class Archive(Directory):
+    """
+    Zip or tar archive read as a directory. Exploring streams every member once to get
+    everything needed to import it, so only the members which get copied are read again.
+    """
+
+    def __init__(self, path: Path, files=None):
+        self.reader = _ArchiveReader(path.resolve())
+        self.lock = self.reader.lock
+        super().__init__(path=path, files=files)
+
+    def explore(self):
+        import magic
+
+        files = []
+        with console.progress(f"Reading {self.path.name}") as status, self.lock:
+            status.tracker.start_stage("explore")
+            for name, offset, size, modified, fd in self.reader.members():
+                file_hash, short_hash, head = _scan_member(fd)
+                mimetype = magic.from_buffer(head, mime=True)
+                creation_date = None
+                if mimetype.startswith("image/"):
+                    creation_date = get_image_creation_date(io.BytesIO(head))
+                files.append(
+                    ArchiveMember(
+                        self,
+                        name=name,
+                        offset=offset,
+                        size=size,
+                        modified=modified,
+                        hash=file_hash,
+                        short_hash=short_hash,
+                        mimetype=mimetype,
+                        creation_date=creation_date,
+                    )
+                )
+                status.tracker.advance(size=size)
+
+        self.files = files
+        return files
+
+    def extract(self, transfers):
+        """
+        Extracts `(member, new path)` pairs in a single pass through the archive, instead of
+        seeking to each member. Yields `(member, extracted file)` in archive order as they get written.
+        """
+        pending = {member.offset: (member, new_path) for member, new_path in transfers}
+        with self.lock:
+            for offset, src_object in self.reader.open_many(list(pending)):
+                member, new_path = pending.pop(offset)
+                yield member, member.extract_to(src_object, new_path)
@@ -0,0 +1,110 @@
+import hashlib
+import math
+import struct
+from pathlib import Path
+
+HEADER = struct.Struct("<4sBQBQ")
+# version 2 adds the capacity after the count
+CAPACITY = struct.Struct("<Q")
+MAGIC = b"CTBF"
+VERSION = 2
+
+
+def size_key(size):
+    return f"{size}"
+
+
+def content_key(size, short_hash):
+    return f"{size}:{short_hash}"
+
+
+def unhashed_key(size):
+    return f"{size}:?"
+
+
+def membership_keys(size, short_hash):
+    """
+    Keys a file is registered with, the size alone allows discarding files without reading them.
+    Files which short hash is not known yet are registered as such instead of reading them.
+    """
+    if short_hash is None:
+        return size_key(size), unhashed_key(size)
+    return size_key(size), content_key(size, short_hash)
+
+
+class BloomFilter:
+    """
+    Compact probabilistic set: membership tests have no false negatives
+    and a false positive rate close to `error_rate` while under `capacity`.
+    """
+
+    def __init__(
+        self, num_bits: int, hash_count: int, bits: bytearray = None, count=0, capacity=None
+    ):
+        self.num_bits = num_bits
+        self.hash_count = hash_count
+        self.bits = bits if bits is not None else bytearray(math.ceil(num_bits / 8))
+        self.count = count
+        # filters saved before keeping it, the number of keys giving the optimal hash count
+        self.capacity = capacity or int(num_bits * math.log(2) / hash_count)
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate=0.01):
+        capacity = max(capacity, 1)
+        num_bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        hash_count = max(1, round(num_bits / capacity * math.log(2)))
+        return cls(num_bits=num_bits, hash_count=hash_count, capacity=capacity)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = struct.unpack("<QQ", digest)
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.num_bits
+
+    @property
+    def is_full(self):
+        """
+        Past its capacity the false positive rate keeps growing, the filter should be rebuilt bigger
+        """
+        return self.count > self.capacity
+
+    def add(self, key: str):
+        added = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        # keys added again (e.g. files loaded from a shard) are not counted twice
+        if added:
+            self.count += 1
+
+    def __contains__(self, key: str):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+    def save(self, path: Path):
+        with open(path, "wb") as fd:
+            fd.write(HEADER.pack(MAGIC, VERSION, self.num_bits, self.hash_count, self.count))
+            fd.write(CAPACITY.pack(self.capacity))
+            fd.write(self.bits)
+
+    @classmethod
+    def load(cls, path: Path):
+        with open(path, "rb") as fd:
+            magic, version, num_bits, hash_count, count = HEADER.unpack(
+                fd.read(HEADER.size)
+            )
+            if magic != MAGIC or version not in (1, VERSION):
+                raise ValueError(f"{path} is not a valid membership filter")
+            capacity = None
+            if version > 1:
+                (capacity,) = CAPACITY.unpack(fd.read(CAPACITY.size))
+            bits = bytearray(fd.read())
+        if len(bits) != math.ceil(num_bits / 8):
+            raise ValueError(f"{path} is truncated")
+        return cls(
+            num_bits=num_bits, hash_count=hash_count, bits=bits, count=count, capacity=capacity
+        )
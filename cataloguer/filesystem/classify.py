@@ -0,0 +1,145 @@
+"""
+Reads the type and creation date of many files on worker processes. libmagic and EXIF parsing
+are CPU bound and mostly hold the GIL, so threads do not make them any faster.
+"""
+import logging
+import os
+from functools import partial
+from typing import Iterable, List, Optional, Tuple
+
+from ..profiling import profiler
+from .file import NOT_READ, File, _read_creation_date, _read_mimetype
+
+logger = logging.getLogger(__name__)
+
+# paths sent to a worker at once, results come back as one small list per batch
+BATCH_SIZE = 256
+# below this, starting the worker processes takes longer than reading the files here
+MIN_FILES = 1024
+
+
+def _read_batch(paths, creation_dates=True) -> List[Tuple]:
+    """
+    Returns `(mimetype, creation date, error)` of each path, the date is only read when asked for
+    """
+    results = []
+    for path in paths:
+        try:
+            mimetype = _read_mimetype(path)
+            creation_date = None
+            if creation_dates:
+                creation_date = _read_creation_date(path, mimetype.split("/")[0])
+            results.append((mimetype, creation_date, None))
+        except OSError as e:
+            results.append((None, None, str(e)))
+    return results
+
+
+class MetadataReader:
+    """
+    Reads file types (and creation dates) on a pool of `workers` processes, in batches of `batch_size` paths.
+    The results are stored on the files by the calling thread, so catalogues get notified from it.
+    Fewer than `min_files` files, or a single worker, are read in the calling process.
+    """
+
+    def __init__(self, workers: Optional[int] = None, batch_size=BATCH_SIZE, min_files=MIN_FILES):
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.min_files = min_files
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # forking a process running other threads (device queues) is not safe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def read(self, files: Iterable[File], creation_dates=True, on_read=None):
+        """
+        Reads the metadata of the files missing it, `on_read(file)` is called once each file is done
+        """
+        files = [
+            file
+            for file in files
+            if file._mimetype is None or (creation_dates and file._creation_date is NOT_READ)
+        ]
+        if self.workers <= 1 or len(files) < self.min_files:
+            self._read_here(files, creation_dates, on_read)
+            return len(files)
+
+        from concurrent.futures.process import BrokenProcessPool
+
+        batches = [
+            files[start : start + self.batch_size]
+            for start in range(0, len(files), self.batch_size)
+        ]
+        read_batches = 0
+        with profiler.measure("metadata"):
+            try:
+                results = self._get_executor().map(
+                    partial(_read_batch, creation_dates=creation_dates),
+                    [[str(file.path) for file in batch] for batch in batches],
+                )
+                for batch, batch_results in zip(batches, results):
+                    for file, (mimetype, creation_date, error) in zip(batch, batch_results):
+                        if error:
+                            logger.warning(f"Cannot read {file.path}: {error}")
+                        else:
+                            file.set_metadata(
+                                mimetype=mimetype,
+                                creation_date=creation_date if creation_dates else NOT_READ,
+                            )
+                        if on_read:
+                            on_read(file)
+                    read_batches += 1
+            except BrokenProcessPool as e:
+                logger.warning(f"Metadata workers stopped ({e}), reading files in this process")
+                self.shutdown(wait=False)
+                remaining_files = [file for batch in batches[read_batches:] for file in batch]
+                self._read_here(remaining_files, creation_dates, on_read)
+        return len(files)
+
+    @staticmethod
+    def _read_here(files, creation_dates, on_read):
+        for file in files:
+            try:
+                file.get_type()
+                if creation_dates:
+                    file.get_creation_date()
+            except OSError as e:
+                logger.warning(f"Cannot read {file.path}: {e}")
+            if on_read:
+                on_read(file)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+_metadata_reader: Optional[MetadataReader] = None
+
+
+def get_metadata_reader() -> MetadataReader:
+    """
+    Returns the shared reader used to classify and date files
+    """
+    global _metadata_reader
+    if _metadata_reader is None:
+        _metadata_reader = MetadataReader()
+    return _metadata_reader
+
+
+def set_metadata_reader(metadata_reader: Optional[MetadataReader]):
+    """
+    Replaces the shared reader, None goes back to the defaults
+    """
+    global _metadata_reader
+    if _metadata_reader is not None and _metadata_reader is not metadata_reader:
+        _metadata_reader.shutdown(wait=False)
+    _metadata_reader = metadata_reader
@@ -0,0 +1,209 @@
+"""
+Work queues grouped by device (`st_dev`), so I/O on one disk overlaps with I/O on the others
+instead of waiting behind it.
+"""
+import errno
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from ..profiling import profiler
+from .layout import is_rotational
+from .throttle import get_io_budget
+from .utils import move_file
+
+# solid state and network storage cope with a few requests in flight, spinning disks do not
+DEFAULT_WORKERS_PER_DEVICE = 4
+ROTATIONAL_WORKERS_PER_DEVICE = 1
+# calls `map_unordered` keeps in flight, enough to feed every device without a future per item
+MAP_WINDOW = 256
+
+
+def device_of(path) -> int:
+    """
+    Device holding `path`, or the one it would be created on when it does not exist yet
+    """
+    path = Path(path)
+    for candidate in (path, *path.parents):
+        try:
+            return os.stat(candidate).st_dev
+        except OSError:
+            continue
+    return 0
+
+
+class DeviceQueues:
+    """
+    Runs blocking calls on one thread pool per device, each with its own concurrency limit.
+
+    Calls read from the device of `read_from`. Those given a `write_to` also take one of the
+    write slots of its device, so a copy keeps reading from one disk while another one writes.
+    `workers_per_device` defaults to one worker on spinning disks and a few on the rest.
+    """
+
+    def __init__(self, workers_per_device: Optional[int] = None):
+        self.workers_per_device = workers_per_device
+        self._pools: Dict[int, object] = {}
+        # device of the files of each directory, looked up once
+        self._devices: Dict[str, int] = {}
+        self._write_slots: Dict[int, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def workers_for(self, device: int) -> int:
+        if self.workers_per_device:
+            return self.workers_per_device
+        if is_rotational(device):
+            return ROTATIONAL_WORKERS_PER_DEVICE
+        return DEFAULT_WORKERS_PER_DEVICE
+
+    def _get_pool(self, device: int):
+        with self._lock:
+            pool = self._pools.get(device)
+            if pool is None:
+                from concurrent.futures import ThreadPoolExecutor
+
+                pool = self._pools[device] = ThreadPoolExecutor(
+                    max_workers=self.workers_for(device),
+                    thread_name_prefix=f"cataloguer-dev{device}",
+                )
+            return pool
+
+    def _get_write_slots(self, device: int):
+        with self._lock:
+            slots = self._write_slots.get(device)
+            if slots is None:
+                slots = self._write_slots[device] = threading.BoundedSemaphore(
+                    self.workers_for(device)
+                )
+            return slots
+
+    def device(self, path) -> int:
+        """
+        Device of a file, cached by its directory
+        """
+        directory = os.path.dirname(path)
+        device = self._devices.get(directory)
+        if device is None:
+            device = self._devices[directory] = device_of(directory)
+        return device
+
+    def submit(self, func: Callable, *args, read_from=None, write_to=None, **kwargs):
+        """
+        Schedules `func(*args, **kwargs)` on the queue of the device of `read_from`, returns its future
+        """
+        pool = self._get_pool(self.device(read_from) if read_from is not None else 0)
+        if write_to is None:
+            return pool.submit(func, *args, **kwargs)
+
+        # read slots are never waited on while holding a write slot, so this cannot deadlock
+        write_slots = self._get_write_slots(self.device(write_to))
+
+        def write():
+            with write_slots:
+                return func(*args, **kwargs)
+
+        return pool.submit(write)
+
+    def map_unordered(
+        self,
+        func: Callable,
+        items: Iterable,
+        path: Callable = lambda item: item.path,
+        window: int = MAP_WINDOW,
+    ) -> Iterator[Tuple[object, object]]:
+        """
+        Applies `func` to every item on the queue of the device of `path(item)`.
+        Yields `(item, result)` as they complete, items on the same device start in the given order.
+        At most `window` items are submitted and not yet yielded at a time.
+        """
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        futures = {}
+
+        def completed():
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield futures.pop(future), future.result()
+
+        try:
+            for item in items:
+                if len(futures) >= window:
+                    yield from completed()
+                futures[self.submit(func, item, read_from=path(item))] = item
+            while futures:
+                yield from completed()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    @property
+    def devices(self):
+        return list(self._pools)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.shutdown(wait=wait)
+
+
+class Renamer:
+    """
+    Moves files with a single `os.rename` when source and destination are on the same device,
+    instead of going through `shutil.move`. Devices are looked up once per directory, and a pair
+    of devices a rename failed between (e.g. bind mounts) goes straight to copying afterwards.
+    """
+
+    def __init__(self):
+        self._devices: Dict[str, int] = {}
+        self._cross_device: Set[Tuple[int, int]] = set()
+
+    def device(self, directory) -> int:
+        directory = str(directory)
+        device = self._devices.get(directory)
+        if device is None:
+            device = self._devices[directory] = device_of(directory)
+        return device
+
+    def move(self, src: Path, dst: Path, src_device: Optional[int] = None):
+        if src_device is None:
+            src_device = self.device(src.parent)
+        devices = (src_device, self.device(dst.parent))
+        if devices[0] == devices[1] and devices not in self._cross_device:
+            budget = get_io_budget()
+            if budget is not None:
+                budget.consume(operations=1)
+            try:
+                with profiler.measure("rename"):
+                    os.rename(src, dst)
+                return
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                self._cross_device.add(devices)
+        with profiler.measure("move"):
+            move_file(src, dst)
+
+
+_device_queues: Optional[DeviceQueues] = None
+
+
+def get_device_queues() -> DeviceQueues:
+    """
+    Returns the shared queues used by hashing and transfers
+    """
+    global _device_queues
+    if _device_queues is None:
+        _device_queues = DeviceQueues()
+    return _device_queues
+
+
+def set_device_queues(device_queues: Optional[DeviceQueues]):
+    """
+    Replaces the shared queues, None goes back to the defaults
+    """
+    global _device_queues
+    if _device_queues is not None and _device_queues is not device_queues:
+        _device_queues.shutdown(wait=False)
+    _device_queues = device_queues
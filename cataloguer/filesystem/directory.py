@@ -6,23 +6,25 @@ from contextlib import suppress
 from datetime import datetime, timezone
 from itertools import chain
 from pathlib import Path
-from typing import List, Dict, Optional
-from rich.progress import (
-    Progress,
-    TextColumn,
-    BarColumn,
-    TaskProgressColumn,
-    MofNCompleteColumn,
-    TimeRemainingColumn,
-    SpinnerColumn,
-    TimeElapsedColumn,
-)
-
-from .file import File
-from .utils import split_extension_from_filename, count_number_of_files
+from functools import partial
+from typing import List, Dict, Optional, Sequence
+from urllib.parse import quote
+
+from .aio import get_executor
+from .bloom import BloomFilter, content_key, membership_keys, size_key, unhashed_key
+from .classify import get_metadata_reader
+from .devices import get_device_queues
+from .file import NOT_READ, File
+from .jsonstream import dump_object, load_object
+from .layout import sort_for_reading
+from .rules import WalkRules, get_walk_rules
+from .stats import CatalogueStats
+from .utils import split_extension_from_filename
 from ..console.default import console
+from ..profiling import profiled, profiler
 
 DATABASE_LOCATION = ".cataloguer_db.json"
+ROOT_SHARD = "."
 
 logger = logging.getLogger(__name__)
 
@@ -32,15 +34,17 @@ class Directory:
     _files: List[File] = None
     _files_by_path: Dict[Path, File] = None
     _files_by_size: Dict[int, File] = None
+    membership_filter: Optional[BloomFilter] = None
 
     @property
     def files(self):
+        self.ensure_loaded()
         return tuple(self._files.copy())
 
     @files.setter
     def files(self, value):
+        self._files = []
         list(map(self.add_file, value))
-        self._files = value
 
     def __init__(self, path: Path, files: Optional[List[File]] = None):
         self.path = path.resolve()
@@ -54,37 +58,56 @@ class Directory:
         directory.explore()
         return directory
 
+    @classmethod
+    async def afrom_path(cls, path: Path, executor=None):
+        directory = cls(path=path)
+        await directory.aexplore(executor=executor)
+        return directory
+
+    @property
+    def rules(self) -> WalkRules:
+        """
+        Rules deciding which directories and files get walked
+        """
+        return get_walk_rules()
+
+    def ensure_loaded(self, paths=None):
+        """
+        Makes sure the files around the given paths (or all of them) are in memory.
+        Directories always hold all their files, subclasses may load them lazily.
+        """
+
     def explore(self):
         files = []
 
-        # with Progress(
-        #     TextColumn(f"[green]Exploring {self.path.name}..."),
-        #     BarColumn(),
-        #     TextColumn("[progress.description]{task.description}"),
-        # ) as progress:
-        #     discovery_task = progress.add_task("Exploring repo", total=None)
-
-        with console.status(
-            f"[green]Exploring {self.path.name}...",
-        ) as status:
-            for dirpath, dirnames, filenames in os.walk(self.path):
-                for filename in filenames:
-                    full_path = os.path.join(dirpath, filename)
-                    try:
-                        # if the target is a symlink (soft one), this will
-                        # dereference it - change the value to the actual target file
-                        file_path = Path(os.path.realpath(full_path))
-                        file_size = os.path.getsize(file_path)
-                    except OSError as e:
-                        # not accessible (permissions, etc) - pass on
-                        logger.warning("Cannot read %s: %s", full_path, e)
-                        continue
-                    files.append(File(path=file_path, size=file_size))
-                    # progress.update(discovery_task, description=f"Found {len(files)} files")
-                status.update(
-                    status=f"[green]Exploring {self.path.name}. Found {len(files)} files"
+        with console.progress(
+            f"Exploring {self.path.name}"
+        ) as status, profiler.measure("walk"):
+            status.tracker.start_stage("explore")
+            for dirpath, dirnames, filenames in self.rules.walk(self.path):
+                directory_files = _collect_files(dirpath, filenames)
+                files.extend(directory_files)
+                status.tracker.advance(
+                    files=len(directory_files),
+                    size=sum(file.size for file in directory_files),
                 )
-            # progress.update(discovery_task, total=len(files), completed=len(files))
+
+        self.files = files
+        return files
+
+    async def aexplore(self, executor=None):
+        """
+        Same as `explore` but walks each top level directory concurrently on the executor
+        """
+        executor = executor or get_executor()
+        rules = self.rules
+        root, dirnames, filenames = await executor.run(_scan_top_level, self.path, rules)
+        files = await executor.run(_collect_files, root, filenames)
+        for sub_directory_files in await executor.map(
+            partial(_walk_files, rules=rules, root=self.path),
+            [os.path.join(root, dirname) for dirname in dirnames],
+        ):
+            files.extend(sub_directory_files)
 
         self.files = files
         return files
@@ -93,25 +116,66 @@ class Directory:
         """
         Observer notification method
         """
+        if field == "short_hash" and new_value is not None and self.membership_filter is not None:
+            self.membership_filter.add(content_key(file.size, new_value))
         if field == "path":
             del self._files_by_path[file.path]
             # if not new_value.is_relative_to(self.path): # New in version 3.9
             if not str(new_value or "").startswith(str(self.path)):
-                file.unsubscribe(self)
-                with suppress(ValueError):
-                    self._files.remove(file)
-                with suppress(ValueError):
-                    self._files_by_size.setdefault(file.size, []).remove(file)
-                    if not self._files_by_size[file.size]:
-                        del self._files_by_size[file.size]
+                self._forget_file(file)
                 return
             self._files_by_path[new_value] = file
 
+    def _forget_file(self, file):
+        file.unsubscribe(self)
+        with suppress(ValueError):
+            self._files.remove(file)
+        with suppress(ValueError):
+            self._files_by_size.setdefault(file.size, []).remove(file)
+            if not self._files_by_size[file.size]:
+                del self._files_by_size[file.size]
+
     def add_file(self, file):
+        self.ensure_loaded([file.path])
+        existing_file = self._files_by_path.pop(file.path, None)
+        if existing_file is not None:
+            # e.g. found when loading the shard of a file which was just created
+            self._forget_file(existing_file)
         file.subscribe(self)
         self._files.append(file)
         self._files_by_path[file.path] = file
         self._files_by_size.setdefault(file.size, []).append(file)
+        if self.membership_filter is not None:
+            for key in membership_keys(file.size, file._short_hash):
+                self.membership_filter.add(key)
+
+    def might_contain(self, file):
+        """
+        Returns False when the file is known to not be present, without looking at the directory files
+        """
+        if self.membership_filter is None:
+            return True
+        if size_key(file.size) not in self.membership_filter:
+            return False
+        if unhashed_key(file.size) in self.membership_filter:
+            # some file of that size was never hashed, only comparing them tells
+            return True
+        return content_key(file.size, file.short_hash) in self.membership_filter
+
+    def build_membership_filter(self, error_rate=0.01, min_capacity=1024):
+        """
+        Builds a filter over all the files, with room for as many files again.
+        Short hashes are not read, files without one are registered by size only.
+        """
+        self.ensure_loaded()
+        membership_filter = BloomFilter.for_capacity(
+            capacity=max(4 * len(self._files), min_capacity), error_rate=error_rate
+        )
+        for file in self._files:
+            for key in membership_keys(file.size, file._short_hash):
+                membership_filter.add(key)
+        self.membership_filter = membership_filter
+        return membership_filter
 
     @staticmethod
     def detect_duplicates_on_files(files_by_size) -> List[List[File]]:
@@ -122,44 +186,72 @@ class Directory:
         )
         file_size_collisions = list(chain(*file_size_collisions))
 
-        # with Progress(
-        #     TextColumn("[progress.description]{task.description}"),
-        #     BarColumn(),
-        #     TaskProgressColumn(),
-        #     MofNCompleteColumn(),
-        #     TimeRemainingColumn(),
-        #     # expand=True,
-        #     # transient=True
-        # ) as progress:
-        #     file_size_collisions = list(chain(*file_size_collisions))
-        #     fast_detection_task = progress.add_task("[green]Quick file inspection", total=len(file_size_collisions))
-        #     slow_detection_task = progress.add_task("[green]Inspecting full files", total=None)
-        with console.status(f"[green]Inspecting files for duplication...") as status:
-            for index, file in enumerate(file_size_collisions, start=1):
-                # progress.update(fast_detection_task, completed=index)
-                short_file_hash = file.short_hash
-                _files_by_short_hash.setdefault(short_file_hash, []).append(file)
+        with console.progress("Inspecting files for duplication") as status:
+            _read_missing_inodes(file_size_collisions)
+            # hard links share their content, only one of them gets read
+            files_to_read = _distinct_contents(file_size_collisions)
+            status.tracker.start_stage(
+                "short hash",
+                total=len(files_to_read),
+                total_bytes=sum(min(file.size, 1024) for file in files_to_read),
+            )
+            # hashes get read in disk order and in parallel across devices,
+            # groups keep the walk order
+            for file, short_file_hash in get_device_queues().map_unordered(
+                _read_short_hash, sort_for_reading(files_to_read)
+            ):
+                file.short_hash = short_file_hash
+                status.tracker.advance(size=min(file.size, 1024))
+            _share_hashes_with_hardlinks(file_size_collisions, "short_hash")
+            for file in file_size_collisions:
+                _files_by_short_hash.setdefault(file.short_hash, []).append(file)
 
             short_file_hash_collisions = filter(
                 lambda items: len(items) > 1, _files_by_short_hash.values()
             )
 
             short_file_hash_collisions = list(chain(*short_file_hash_collisions))
-            # progress.update(slow_detection_task, total=len(short_file_hash_collisions))
-            for index, file in enumerate(short_file_hash_collisions, start=1):
-                # progress.update(slow_detection_task, completed=index)
-                status.update(
-                    status=f"[green]Inspecting file {index} of {len(short_file_hash_collisions)} for duplicates"
-                )
-                file_hash = file.hash
-                _files_by_hash.setdefault(file_hash, []).append(file)
+            files_to_read = _distinct_contents(short_file_hash_collisions)
+            status.tracker.start_stage(
+                "full hash",
+                total=len(files_to_read),
+                total_bytes=sum(file.size for file in files_to_read),
+            )
+            for file, file_hash in get_device_queues().map_unordered(
+                _read_hash, sort_for_reading(files_to_read)
+            ):
+                file.hash = file_hash
+                status.tracker.advance(size=file.size)
+            _share_hashes_with_hardlinks(short_file_hash_collisions, "hash")
+            for file in short_file_hash_collisions:
+                _files_by_hash.setdefault(file.hash, []).append(file)
 
             file_hash_collisions = filter(
                 lambda items: len(items) > 1, _files_by_hash.values()
             )
             return list(file_hash_collisions)
 
+    @staticmethod
+    async def adetect_duplicates_on_files(
+        files_by_size, executor=None
+    ) -> List[List[File]]:
+        executor = executor or get_executor()
+        file_size_collisions = filter(
+            lambda items: len(items) > 1, files_by_size.values()
+        )
+        file_size_collisions = list(chain(*file_size_collisions))
+        await executor.run(_read_missing_inodes, file_size_collisions)
+        await _aprefetch_hashes(executor, file_size_collisions, first_chunk_only=True)
+
+        short_file_hash_collisions = list(
+            chain(*_collisions(file_size_collisions, key=lambda file: file.short_hash))
+        )
+        await _aprefetch_hashes(executor, short_file_hash_collisions)
+
+        return _collisions(short_file_hash_collisions, key=lambda file: file.hash)
+
     def detect_duplicates(self, media_only=True):
+        self.ensure_loaded()
         files_by_size = self._files_by_size
         if media_only:
             files_by_size = {
@@ -169,48 +261,275 @@ class Directory:
             }
         return self.detect_duplicates_on_files(files_by_size=files_by_size)
 
-    def detect_duplicates_with(self, files, media_only=True):
-        def intersect(a, b):
-            return {k: list(chain(a[k], b[k])) for k in a.keys() & b.keys()}
+    def _intersect_by_size(self, files):
+        """
+        Groups the given files with the directory files of the same size
+        """
+        files = [file for file in files if self.might_contain(file)]
+        if files:
+            self.ensure_loaded()
 
-        files_by_size = self._files_by_size
+        given_files_by_size = {}
+        for file in files:
+            if file.size in self._files_by_size:
+                given_files_by_size.setdefault(file.size, []).append(file)
+
+        return {
+            size: list(chain(self._files_by_size[size], given_files))
+            for size, given_files in given_files_by_size.items()
+        }
+
+    def detect_duplicates_with(self, files, media_only=True):
+        intersection_of_files_by_size = self._intersect_by_size(files)
         if media_only:
-            files_by_size = {
+            intersection_of_files_by_size = {
                 size: files
-                for size, files in self._files_by_size.items()
-                if files[
+                for size, files in intersection_of_files_by_size.items()
+                if self._files_by_size[size][
                     0
                 ].is_media_type()  # if one of them is media type, all are since are duplicates
             }
-
-        given_files_by_size = {}
-        for file in files:
-            given_files_by_size.setdefault(file.size, []).append(file)
-
-        intersection_of_files_by_size = intersect(files_by_size, given_files_by_size)
         return self.detect_duplicates_on_files(
             files_by_size=intersection_of_files_by_size
         )
 
+    async def adetect_duplicates(self, media_only=True, executor=None):
+        executor = executor or get_executor()
+        self.ensure_loaded()
+        files_by_size = self._files_by_size
+        if media_only:
+            files_by_size = await _afilter_media_sizes(executor, files_by_size)
+        return await self.adetect_duplicates_on_files(
+            files_by_size=files_by_size, executor=executor
+        )
+
+    async def adetect_duplicates_with(self, files, media_only=True, executor=None):
+        executor = executor or get_executor()
+        intersection_of_files_by_size = self._intersect_by_size(files)
+        if media_only:
+            intersection_of_files_by_size = await _afilter_media_sizes(
+                executor, intersection_of_files_by_size
+            )
+        return await self.adetect_duplicates_on_files(
+            files_by_size=intersection_of_files_by_size, executor=executor
+        )
+
+    def get_file(self, path) -> Optional[File]:
+        self.ensure_loaded([path])
+        return self._files_by_path.get(path)
+
     def is_path_available(self, path):
+        self.ensure_loaded([path])
         return self._files_by_path.get(path) is None
 
-    def find_new_path(self, path):
+    def find_new_path(self, path, reserved_paths=()):
+        """
+        First `<name>_<n>.<extension>` path not taken by a file nor in `reserved_paths`
+        """
+        self.ensure_loaded([path])
         basename, filename_extension = split_extension_from_filename(path.name)
         i = 0
         while True:
             i += 1
             new_filename = f"{basename}_{i}.{filename_extension}"
             new_path = Path(path.parent.joinpath(new_filename))
-            if self._files_by_path.get(new_path) is None:
+            if (
+                self._files_by_path.get(new_path) is None
+                and new_path not in reserved_paths
+            ):
                 return new_path
 
 
+def _read_short_hash(file):
+    # only reads, subscribers get notified from the calling thread
+    if file._short_hash is not None:
+        return file._short_hash
+    return file.read_hash(first_chunk_only=True)
+
+
+def _read_hash(file):
+    if file._hash is not None:
+        return file._hash
+    return file.read_hash()
+
+
+def _read_missing_inodes(files):
+    """
+    Stats the files which inode is not known, e.g. loaded from a catalogue, so hard links get told apart
+    """
+    for file in files:
+        if file.inode is None and file.path is not None:
+            try:
+                stat = os.stat(file.path)
+            except OSError as e:
+                logger.warning("Cannot read %s: %s", file.path, e)
+                continue
+            file.inode = (stat.st_dev, stat.st_ino)
+
+
+def _distinct_contents(files) -> List[File]:
+    """
+    Leaves out hard links of files already in the list, they share their content
+    """
+    inodes = set()
+    distinct_files = []
+    for file in files:
+        if file.inode is not None:
+            if file.inode in inodes:
+                continue
+            inodes.add(file.inode)
+        distinct_files.append(file)
+    return distinct_files
+
+
+def _share_hashes_with_hardlinks(files, attribute):
+    """
+    Gives the `attribute` hash ("hash" or "short_hash") of each inode to its hard links
+    """
+    hashes_by_inode = {
+        file.inode: getattr(file, f"_{attribute}")
+        for file in files
+        if file.inode is not None and getattr(file, f"_{attribute}") is not None
+    }
+    for file in files:
+        if getattr(file, f"_{attribute}") is None and file.inode in hashes_by_inode:
+            setattr(file, attribute, hashes_by_inode[file.inode])
+
+
+def hardlinked_files(duplicated_files, files_to_process) -> List[tuple]:
+    """
+    Returns `(file, linked_file)` pairs of files to process which are hard links of a duplicate
+    left in place, processing them does not free any space
+    """
+    files_to_process = set(files_to_process)
+    pairs = []
+    for duplicated_list in duplicated_files:
+        kept_files = [file for file in duplicated_list if file not in files_to_process]
+        for file in duplicated_list:
+            if file not in files_to_process:
+                continue
+            linked_file = next(
+                (kept for kept in kept_files if file.is_hardlink_of(kept)), None
+            )
+            if linked_file is not None:
+                pairs.append((file, linked_file))
+    return pairs
+
+
+def read_metadata(files, description="Reading metadata", creation_dates=True):
+    """
+    Reads the type (and creation date) of the files which were not read yet, see `MetadataReader`
+    """
+    files = [
+        file
+        for file in files
+        if file._mimetype is None or (creation_dates and file._creation_date is NOT_READ)
+    ]
+    if not files:
+        return 0
+    with console.progress(description) as status:
+        status.tracker.start_stage("metadata", total=len(files))
+        return get_metadata_reader().read(
+            files,
+            creation_dates=creation_dates,
+            on_read=lambda file: status.tracker.advance(),
+        )
+
+
+def _collect_files(dirpath, filenames) -> List[File]:
+    files = []
+    for filename in filenames:
+        full_path = os.path.join(dirpath, filename)
+        try:
+            # if the target is a symlink (soft one), this will
+            # dereference it - change the value to the actual target file
+            file_path = Path(os.path.realpath(full_path))
+            stat = os.stat(file_path)
+        except OSError as e:
+            # not accessible (permissions, etc) - pass on
+            logger.warning("Cannot read %s: %s", full_path, e)
+            continue
+        files.append(
+            File(path=file_path, size=stat.st_size, inode=(stat.st_dev, stat.st_ino))
+        )
+    return files
+
+
+@profiled("walk")
+def _walk_files(path, rules: Optional[WalkRules] = None, root=None) -> List[File]:
+    files = []
+    for dirpath, dirnames, filenames in (rules or get_walk_rules()).walk(path, root=root):
+        files.extend(_collect_files(dirpath, filenames))
+    return files
+
+
+def _scan_top_level(path, rules: Optional[WalkRules] = None):
+    for dirpath, dirnames, filenames in (rules or get_walk_rules()).walk(path):
+        # os.walk does not follow symlinks to directories, neither should we
+        dirnames = [
+            dirname
+            for dirname in dirnames
+            if not os.path.islink(os.path.join(dirpath, dirname))
+        ]
+        return dirpath, dirnames, filenames
+    return str(path), [], []
+
+
+def _collisions(files, key) -> List[List[File]]:
+    files_by_key = {}
+    for file in files:
+        files_by_key.setdefault(key(file), []).append(file)
+    return [items for items in files_by_key.values() if len(items) > 1]
+
+
+async def _aprefetch_hashes(executor, files, first_chunk_only=False):
+    """
+    Computes missing hashes on the executor, the results are assigned back on the event loop
+    """
+    attribute = "_short_hash" if first_chunk_only else "_hash"
+    files_to_read = [
+        file for file in _distinct_contents(files) if getattr(file, attribute) is None
+    ]
+    hashes = await executor.map(
+        lambda file: file.read_hash(first_chunk_only=first_chunk_only), files_to_read
+    )
+    for file, file_hash in zip(files_to_read, hashes):
+        if first_chunk_only:
+            file.short_hash = file_hash
+        else:
+            file.hash = file_hash
+    _share_hashes_with_hardlinks(files, attribute.lstrip("_"))
+
+
+async def _afilter_media_sizes(executor, files_by_size):
+    # if one of them is media type, all are since are duplicates
+    sizes = list(files_by_size.keys())
+    are_media = await executor.map(
+        lambda size: files_by_size[size][0].is_media_type(), sizes
+    )
+    return {
+        size: files_by_size[size] for size, is_media in zip(sizes, are_media) if is_media
+    }
+
+
+def shard_filename(key: str) -> str:
+    # "." (files at the catalogue root) has to become a regular filename too
+    return quote(key, safe="").replace(".", "%2E") + ".json"
+
+
 class Catalogue(Directory):
+    """
+    Directory which settings and files are persisted.
+
+    Files are stored in shards, one per top level directory (e.g. one per year with a %Y/%m/{file} pattern),
+    so a catalogue loaded from shards only reads the shards that are needed.
+    """
+
     name: str
     creation_date: datetime
     format_pattern: str
     unknown_format_pattern: Optional[str]
+    explored: bool = False
 
     def __init__(
         self,
@@ -218,36 +537,312 @@ class Catalogue(Directory):
         format_pattern: str,
         unknown_format_pattern: Optional[str] = None,
         creation_date: datetime = None,
+        exclude: Sequence[str] = (),
         **kwargs,
     ):
         self.name = name
         self.format_pattern = format_pattern
         self.unknown_format_pattern = unknown_format_pattern
+        # walk rules of this catalogue, on top of the global ones
+        self.exclude = tuple(exclude)
         self.creation_date = creation_date or datetime.now(timezone.utc)
+        # shards stored on disk and not loaded yet, `None` when the catalogue is not loaded from shards
+        self._shards_path: Optional[Path] = None
+        self._shard_counts: Dict[str, int] = {}
+        self._loaded_shards = set()
+        self._dirty_shards = set()
+        self._fully_loaded = True
+        self._force_reload = False
+        self.stats = CatalogueStats()
         super().__init__(**kwargs)
 
-    def dict(self):
-        def file_asdict(file):
-            file_dict = file.asdict()
-            file_dict["path"] = str(file.path.relative_to(self.path))
-            return file_dict
+    @property
+    def is_fully_loaded(self):
+        return self._fully_loaded
+
+    @property
+    def rules(self) -> WalkRules:
+        return get_walk_rules().extend(self.exclude)
+
+    @property
+    def dirty_shards(self):
+        return set(self._dirty_shards)
+
+    @property
+    def is_modified(self):
+        """
+        True when some shard changed since the catalogue was loaded or saved, e.g. files added or hashed
+        """
+        return bool(self._dirty_shards - {None})
+
+    def shard_key(self, path: Path) -> Optional[str]:
+        """
+        Returns the shard a file path belongs to or None if the path is outside the catalogue
+        """
+        try:
+            parts = path.relative_to(self.path).parts
+        except ValueError:
+            return None
+        return parts[0] if len(parts) > 1 else ROOT_SHARD
+
+    def _shard_keys(self):
+        """
+        Shards saved and shards on disk, top level directories created since are new shards
+        """
+        keys = set(self._shard_counts) | {ROOT_SHARD}
+        with suppress(StopIteration):
+            _, dirnames, _ = next(self.rules.walk(self.path))
+            keys.update(dirnames)
+        return keys
+
+    def ensure_loaded(self, paths=None):
+        if self._fully_loaded:
+            return
+        if paths is None:
+            keys = self._shard_keys()
+        else:
+            keys = {self.shard_key(path) for path in paths if path is not None}
+            keys.discard(None)
+        self._load_shards(keys)
+        if paths is None:
+            self._fully_loaded = True
+
+    def sub_directory(self, path: Path) -> Directory:
+        """
+        Returns a directory with the catalogue files under the given path, only loading its shard
+        """
+        relative_parts = path.relative_to(self.path).parts
+        if relative_parts:
+            self._load_shards({relative_parts[0]})
+            files = [file for file in self._files if file.path.is_relative_to(path)]
+        else:
+            files = self.files
+        return Directory(path=path, files=files)
+
+    def _load_shards(self, keys):
+        for key in sorted(keys - self._loaded_shards):
+            # mark it before adding files, `add_file` asks for its shard too
+            self._loaded_shards.add(key)
+            if self._shards_path is None:
+                continue
+            self._load_shard(key)
+
+    def _root_filenames(self):
+        _, _, filenames = next(self.rules.walk(self.path), (None, None, []))
+        return filenames
+
+    def _count_shard_files(self, key) -> int:
+        """
+        Number of files of the shard on disk, only listing directories
+        """
+        rules = self.rules
+        if key == ROOT_SHARD:
+            return len(self._root_filenames())
+        if rules.is_excluded(key, is_directory=True):
+            # excluded since the shard was saved
+            return 0
+        return rules.count_files(self.path.joinpath(key), root=self.path)
+
+    def _is_shard_stale(self, key):
+        stored_files = self._shard_counts.get(key, 0)
+        files_on_path = self._count_shard_files(key)
+        logger.debug(
+            f"Shard {key} files: {stored_files} vs filesystem files {files_on_path}"
+        )
+        return stored_files != files_on_path
+
+    def _load_shard(self, key):
+        if self._force_reload or self._is_shard_stale(key):
+            rules = self.rules
+            if key == ROOT_SHARD:
+                files = _collect_files(self.path, self._root_filenames())
+            elif rules.is_excluded(key, is_directory=True):
+                files = []
+            else:
+                files = _walk_files(self.path.joinpath(key), rules=rules, root=self.path)
+            self._dirty_shards.add(key)
+            self.stats.reset_shard(key)
+            if self._shard_counts.get(key) and not self._force_reload:
+                # files removed behind the catalogue back might have been duplicates
+                self.stats.duplicates = None
+            list(map(self.add_file, files))
+        elif self._shard_counts.get(key, 0):
+            # catalogues saved before keeping stats get them counted as shards load
+            count_stats = key not in self.stats.shards
+            with open(
+                self._shards_path.joinpath(shard_filename(key)), "r"
+            ) as fd, profiler.measure("catalogue load") as measurement:
+                measurement.bytes_read = os.fstat(fd.fileno()).st_size
+                _, files_data = load_object(fd, streamed_key="files")
+                for file_data in files_data:
+                    # files as stored are not modifications, so skip `add_file` bookkeeping
+                    file = File(**{**file_data, "path": self.path.joinpath(file_data["path"])})
+                    Directory.add_file(self, file)
+                    if count_stats:
+                        self.stats.add_file(key, file)
+
+    def might_contain(self, file):
+        if self._force_reload:
+            # shards still to be loaded get explored again, the filter describes what was saved
+            return True
+        return super().might_contain(file)
 
+    def explore(self):
+        self._fully_loaded = True
+        self._shard_counts = {}
+        self._files_by_path = {}
+        self._files_by_size = {}
+        self.stats = CatalogueStats()
+        return super().explore()
+
+    def add_file(self, file):
+        self.ensure_loaded([file.path])
+        if self._might_have_size(file.size):
+            self.stats.duplicates = None
+        super().add_file(file)
+        key = self.shard_key(file.path)
+        self._dirty_shards.add(key)
+        self.stats.add_file(key, file)
+
+    def _forget_file(self, file):
+        super()._forget_file(file)
+        self.stats.remove_file(self.shard_key(file.path), file)
+        if self._might_have_size(file.size):
+            self.stats.duplicates = None
+
+    def _might_have_size(self, size):
+        """
+        Returns False when no file of the catalogue has the given size, so adding or removing
+        a file of that size cannot change its duplicates
+        """
+        if self._files_by_size.get(size):
+            return True
+        if self._fully_loaded:
+            return False
+        if self.membership_filter is None:
+            return True
+        return size_key(size) in self.membership_filter
+
+    def notify(self, file, field, new_value):
+        if file.path is not None:
+            self._dirty_shards.add(self.shard_key(file.path))
+        if field in ("mimetype", "creation_date"):
+            self.stats.update_file(self.shard_key(file.path), file, field, new_value)
+        if field == "path" and new_value is not None:
+            self.ensure_loaded([new_value])
+            key, new_key = self.shard_key(file.path), self.shard_key(new_value)
+            self._dirty_shards.add(new_key)
+            if new_key is not None and new_key != key:
+                # files moved out of the catalogue are taken out of the stats when forgotten
+                self.stats.remove_file(key, file)
+                self.stats.add_file(new_key, file)
+        super().notify(file, field, new_value)
+
+    def detect_duplicates(self, media_only=True):
+        duplicated_files = super().detect_duplicates(media_only=media_only)
+        self.stats.set_duplicates(duplicated_files, media_only=media_only)
+        return duplicated_files
+
+    def summarise(self, media_only=True):
+        """
+        Returns the catalogue summary from its stats (see `CatalogueStats.summarise`) without
+        loading its files, None when it cannot be told without reading them.
+        Only the catalogue root gets listed: top level directories created or removed and files
+        at the top level since it was saved get explored again first. Changes deeper in a
+        directory which was saved are left to a full check.
+        """
+        if not self._fully_loaded:
+            _, dirnames, filenames = next(self.rules.walk(self.path), (None, [], []))
+            saved_keys = set(self._shard_counts) - {ROOT_SHARD}
+            changed_keys = saved_keys.symmetric_difference(dirnames)
+            if len(filenames) != self._shard_counts.get(ROOT_SHARD, 0):
+                changed_keys.add(ROOT_SHARD)
+            self._load_shards(changed_keys)
+        if any(
+            count and key not in self.stats.shards
+            for key, count in self._shard_counts.items()
+        ):
+            return None
+        return self.stats.summarise(media_only=media_only)
+
+    def _file_asdict(self, file):
+        file_dict = file.asdict()
+        file_dict["path"] = str(file.path.relative_to(self.path))
+        return file_dict
+
+    def _settings_dict(self):
         return {
             "name": self.name,
             "path": self.path.resolve(),
             "creation_date": self.creation_date.isoformat(),
             "format_pattern": self.format_pattern,
             "unknown_format_pattern": self.unknown_format_pattern,
-            "files": [file_asdict(file) for file in self._files],
+            "exclude": list(self.exclude),
+        }
+
+    def dict(self):
+        return {
+            **self._settings_dict(),
+            "files": [self._file_asdict(file) for file in self.files],
         }
 
     def save(self, path: Path):
-        catalogue_data = self.dict()
-        with open(path, "w") as fd:
-            json.dump(catalogue_data, fd, default=str)
+        """
+        Saves the catalogue settings on the given path and its files in a sibling ".shards" directory.
+        Only modified shards are written.
+        """
+        shards_path = path.with_suffix(".shards")
+        shards_path.mkdir(exist_ok=True)
+        if self._shards_path != shards_path:
+            # shards not loaded yet cannot be copied over to a new location
+            self.ensure_loaded()
+
+        files_by_shard = {}
+        for file in self._files:
+            files_by_shard.setdefault(self.shard_key(file.path), []).append(file)
+
+        self._dirty_shards.discard(None)
+        shard_counts = {
+            key: count
+            for key, count in self._shard_counts.items()
+            if key not in self._loaded_shards and self._shards_path == shards_path
+        }
+        with profiler.measure("catalogue save") as measurement:
+            for key, files in files_by_shard.items():
+                shard_counts[key] = len(files)
+                if key in self._dirty_shards or self._shards_path != shards_path:
+                    with open(shards_path.joinpath(shard_filename(key)), "w") as fd:
+                        dump_object(
+                            fd,
+                            fields={},
+                            streamed_key="files",
+                            items=(self._file_asdict(file) for file in files),
+                        )
+                        measurement.bytes_written += fd.tell()
+
+            with open(path, "w") as fd:
+                json.dump(
+                    {
+                        **self._settings_dict(),
+                        "shards": shard_counts,
+                        "stats": self.stats.asdict(keys=shard_counts),
+                    },
+                    fd,
+                    default=str,
+                )
+                measurement.bytes_written += fd.tell()
+
+        filenames = {shard_filename(key) for key in shard_counts}
+        for shard_file in shards_path.glob("*.json"):
+            if shard_file.name not in filenames:
+                shard_file.unlink()
+
+        self._shards_path = shards_path
+        self._shard_counts = shard_counts
+        self._dirty_shards = set()
 
     @classmethod
-    def parse_obj(cls, data, force_reload=False):
+    def parse_obj(cls, data, force_reload=False, shards_path: Optional[Path] = None):
         path = Path(data["path"]).resolve(strict=True)
         creation_date = datetime.fromisoformat(data["creation_date"])
         catalogue = cls(
@@ -256,17 +851,39 @@ class Catalogue(Directory):
             creation_date=creation_date,
             format_pattern=data["format_pattern"],
             unknown_format_pattern=data.get("unknown_format_pattern"),
+            exclude=data.get("exclude", ()),
         )
-        files_on_path = count_number_of_files(path)
-        logger.debug(
-            f"Catalogue files: {len(data['files'])} vs filesystem files {files_on_path}"
-        )
-        if force_reload or len(data["files"]) != files_on_path:
-            catalogue.explore()
-        else:
-            files = [
-                File(**{**file_data, "path": path.joinpath(file_data["path"])})
-                for file_data in data["files"]
-            ]
-            catalogue.files = files
+        if "shards" in data:
+            catalogue._shards_path = shards_path
+            catalogue._shard_counts = data["shards"]
+            if "stats" in data:
+                catalogue.stats = CatalogueStats(**data["stats"])
+            if force_reload:
+                # every shard gets explored again
+                catalogue.stats.duplicates = None
+            catalogue._force_reload = force_reload
+            catalogue._fully_loaded = False
+            return catalogue
+
+        if not force_reload:
+            files_on_path = catalogue.rules.count_files(path)
+            # `data["files"]` might be a stream, so records are consumed as files get built
+            files = []
+            for file_data in data["files"]:
+                if len(files) == files_on_path:
+                    logger.debug(f"Catalogue has more files than the filesystem {files_on_path}")
+                    break
+                files.append(
+                    File(**{**file_data, "path": path.joinpath(file_data["path"])})
+                )
+            else:
+                logger.debug(
+                    f"Catalogue files: {len(files)} vs filesystem files {files_on_path}"
+                )
+                if len(files) == files_on_path:
+                    catalogue.files = files
+                    return catalogue
+
+        catalogue.explore()
+        catalogue.explored = True
         return catalogue
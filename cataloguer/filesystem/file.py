@@ -1,11 +1,13 @@
-import shutil
 from contextlib import suppress
+from datetime import datetime
 from pathlib import PurePath, Path
+from typing import Optional, Tuple
 
-import magic
-
+from ..profiling import profiled, profiler
+from .aio import get_executor
 from .metadata import get_image_creation_date, get_path_creation_date
-from .utils import get_hash, split_extension_from_filename
+from .similarity import perceptual_hash
+from .utils import copy_file, get_hash, move_file, split_extension_from_filename
 
 
 class Observable:
@@ -24,20 +26,51 @@ class Observable:
             observer.notify(self, *args)
 
 
+# creation dates can be unknown, this tells them apart from the ones not read yet
+NOT_READ = object()
+
+
 class File(Observable):
     _path: Path
     size: int
     _hash: int
     _short_hash: int
+    # (st_dev, st_ino) when known, hard links share it
+    inode: Optional[Tuple[int, int]]
+    # perceptual hash of images, only computed when looking for similar ones
+    _phash: Optional[int]
+    # metadata cached once read, it gets saved in the catalogue and indexed for queries
+    _mimetype: Optional[str]
+    _creation_date: Optional[datetime]
 
-    def __init__(self, path, size=None, hash=None, short_hash=None):
+    def __init__(
+        self,
+        path,
+        size=None,
+        hash=None,
+        short_hash=None,
+        inode=None,
+        phash=None,
+        mimetype=None,
+        creation_date=NOT_READ,
+    ):
         super().__init__()
         if not isinstance(path, PurePath):
             path = Path(path)
         self._path = path
-        self.size = size or path.stat().st_size
+        self.inode = inode
+        if not size:
+            stat = path.stat()
+            size = stat.st_size
+            self.inode = (stat.st_dev, stat.st_ino)
+        self.size = size
         self._hash = hash
         self._short_hash = short_hash
+        self._phash = phash
+        self._mimetype = mimetype
+        if isinstance(creation_date, str):
+            creation_date = datetime.fromisoformat(creation_date)
+        self._creation_date = creation_date
 
     def __str__(self):
         return str(self.path or self._hash)
@@ -51,10 +84,16 @@ class File(Observable):
         self.notify("path", value)
         self._path = value
 
+    def read_hash(self, first_chunk_only=False):
+        """
+        Computes the hash (or the short hash) without storing it
+        """
+        return get_hash(self.path, first_chunk_only=first_chunk_only)
+
     @property
     def hash(self):
         if self._hash is None:
-            self.hash = get_hash(self.path)
+            self.hash = self.read_hash()
         return self._hash
 
     @hash.setter
@@ -65,7 +104,7 @@ class File(Observable):
     @property
     def short_hash(self):
         if self._short_hash is None:
-            self.short_hash = get_hash(self.path, first_chunk_only=True)
+            self.short_hash = self.read_hash(first_chunk_only=True)
         return self._short_hash
 
     @short_hash.setter
@@ -73,35 +112,110 @@ class File(Observable):
         self.notify("short_hash", value)
         self._short_hash = value
 
+    @property
+    def phash(self):
+        if self._phash is None and self.is_image():
+            self.phash = perceptual_hash(self.path)
+        return self._phash
+
+    @phash.setter
+    def phash(self, value):
+        self.notify("phash", value)
+        self._phash = value
+
     def clone_file(self, new_path):
         # if new_path.exists():
         #     raise FileExistsError
-        shutil.copy2(str(self.path), str(new_path))
+        with profiler.measure("copy") as measurement:
+            copy_file(str(self.path), str(new_path))
+            measurement.bytes_read = measurement.bytes_written = self.size
         return File(
-            path=new_path, size=self.size, hash=self._hash, short_hash=self._short_hash
+            path=new_path,
+            size=self.size,
+            hash=self._hash,
+            short_hash=self._short_hash,
+            phash=self._phash,
+            mimetype=self._mimetype,
+            creation_date=self._creation_date,
         )
 
+    @profiled("move")
     def move_file(self, new_path):
         # if new_path.exists():
         #     raise FileExistsError
-        shutil.move(self.path, new_path)
+        move_file(self.path, new_path)
         self.path = new_path
 
+    @profiled("delete")
     def delete(self):
         self.path.unlink()
         # TODO: delete parent folder if is empty too?
         self.path = None
 
+    async def ahash(self, executor=None):
+        if self._hash is None:
+            executor = executor or get_executor()
+            self.hash = await executor.run(get_hash, self.path)
+        return self._hash
+
+    async def ashort_hash(self, executor=None):
+        if self._short_hash is None:
+            executor = executor or get_executor()
+            self.short_hash = await executor.run(
+                get_hash, self.path, first_chunk_only=True
+            )
+        return self._short_hash
+
+    async def aclone_file(self, new_path, executor=None):
+        executor = executor or get_executor()
+        await executor.run(copy_file, str(self.path), str(new_path))
+        return File(
+            path=new_path,
+            size=self.size,
+            hash=self._hash,
+            short_hash=self._short_hash,
+            phash=self._phash,
+            mimetype=self._mimetype,
+            creation_date=self._creation_date,
+        )
+
+    async def amove_file(self, new_path, executor=None):
+        executor = executor or get_executor()
+        await executor.run(move_file, self.path, new_path)
+        self.path = new_path
+
+    async def adelete(self, executor=None):
+        executor = executor or get_executor()
+        await executor.run(self.path.unlink)
+        self.path = None
+
+    async def ais_media_type(self, executor=None):
+        executor = executor or get_executor()
+        return await executor.run(self.is_media_type)
+
     def split_extension(self):
         return split_extension_from_filename(self.path.name)
 
     def get_creation_date(self):
-        creation_date = None
-        if self.is_image():
-            creation_date = get_image_creation_date(self.path)
-        if not creation_date:
-            creation_date = get_path_creation_date(self.path)
-        return creation_date
+        if self._creation_date is NOT_READ:
+            self.set_metadata(
+                creation_date=_read_creation_date(self.path, self.get_media_type())
+            )
+        return self._creation_date
+
+    def set_metadata(self, mimetype=None, creation_date=NOT_READ):
+        """
+        Stores a type or creation date read elsewhere (e.g. by a worker process)
+        """
+        if mimetype is not None and self._mimetype is None:
+            self.notify("mimetype", mimetype)
+            self._mimetype = mimetype
+        if creation_date is not NOT_READ and self._creation_date is NOT_READ:
+            self.notify("creation_date", creation_date)
+            self._creation_date = creation_date
+
+    def is_hardlink_of(self, other: "File"):
+        return self.inode is not None and self.inode == other.inode
 
     def is_media_type(self):
         return self.is_image() or self.is_video()
@@ -117,15 +231,40 @@ class File(Observable):
         return media_type
 
     def get_type(self):
-        mimetype = magic.from_file(str(self.path), mime=True)
-        media_type = mimetype.split("/")[0]
-        media_format = "/".join(mimetype.split("/")[1:])
+        if self._mimetype is None:
+            self.set_metadata(mimetype=_read_mimetype(self.path))
+        media_type = self._mimetype.split("/")[0]
+        media_format = "/".join(self._mimetype.split("/")[1:])
         return media_type, media_format
 
     def asdict(self):
-        return {
+        file_dict = {
             "path": str(self._path),
             "size": self.size,
             "hash": self._hash,
             "short_hash": self._short_hash,
         }
+        # optional, only images which went through `find-similar` have one
+        if self._phash is not None:
+            file_dict["phash"] = self._phash
+        if self._mimetype is not None:
+            file_dict["mimetype"] = self._mimetype
+        if self._creation_date is not NOT_READ:
+            file_dict["creation_date"] = (
+                self._creation_date.isoformat() if self._creation_date else None
+            )
+        return file_dict
+
+
+@profiled("mimetype")
+def _read_mimetype(path) -> str:
+    import magic  # loads libmagic, deferred until a file gets classified
+
+    return magic.from_file(str(path), mime=True)
+
+
+def _read_creation_date(path, media_type) -> Optional[datetime]:
+    creation_date = None
+    if media_type == "image":
+        creation_date = get_image_creation_date(path)
+    return creation_date or get_path_creation_date(path)
@@ -0,0 +1,128 @@
+"""
+Incremental reading and writing of JSON objects holding a large array (e.g. catalogue files),
+so memory usage does not depend on the number of items.
+"""
+import json
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = " \t\n\r"
+
+_decoder = json.JSONDecoder()
+
+
+class _StreamReader:
+    def __init__(self, fd, chunk_size=None):
+        self.fd = fd
+        self.chunk_size = chunk_size or CHUNK_SIZE
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def _fill(self):
+        data = self.fd.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return
+        self.buffer = self.buffer[self.position :] + data
+        self.position = 0
+
+    def peek(self):
+        while True:
+            while (
+                self.position < len(self.buffer)
+                and self.buffer[self.position] in WHITESPACE
+            ):
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if self.eof:
+                raise ValueError("Unexpected end of JSON data")
+            self._fill()
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(
+                f'Expecting "{char}" but found "{self.buffer[self.position]}"'
+            )
+        self.position += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self._fill()
+                continue
+            if end == len(self.buffer) and not self.eof:
+                # a number could continue in the next chunk
+                self._fill()
+                continue
+            self.position = end
+            return value
+
+
+def _read_fields(reader, fields, streamed_key):
+    """
+    Reads object members into `fields` until the streamed array or the end of the object is found
+    """
+    while True:
+        char = reader.peek()
+        if char == "}":
+            reader.expect("}")
+            return False
+        if char == ",":
+            reader.expect(",")
+        key = reader.value()
+        reader.expect(":")
+        if key == streamed_key and reader.peek() == "[":
+            return True
+        fields[key] = reader.value()
+
+
+def _read_items(reader, fields, streamed_key):
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.expect("]")
+    else:
+        while True:
+            yield reader.value()
+            if reader.peek() == ",":
+                reader.expect(",")
+                continue
+            reader.expect("]")
+            break
+    # members written after the array
+    _read_fields(reader, fields, streamed_key)
+
+
+def load_object(fd, streamed_key):
+    """
+    Reads a JSON object from `fd` returning its members and an iterator over the `streamed_key` array.
+
+    Members placed after the array are added to the returned dict once the iterator is exhausted.
+    """
+    reader = _StreamReader(fd)
+    reader.expect("{")
+    fields = {}
+    if _read_fields(reader, fields, streamed_key):
+        return fields, _read_items(reader, fields, streamed_key)
+    return fields, iter(())
+
+
+def dump_object(fd, fields, streamed_key, items):
+    """
+    Writes a JSON object with the given members and an array under `streamed_key`
+    built from `items` one at a time. Output is the same as `json.dump`.
+    """
+    fd.write("{")
+    for key, value in fields.items():
+        fd.write(f"{json.dumps(key)}: {json.dumps(value, default=str)}, ")
+    fd.write(f"{json.dumps(streamed_key)}: [")
+    for position, item in enumerate(items):
+        if position:
+            fd.write(", ")
+        fd.write(json.dumps(item, default=str))
+    fd.write("]}")
@@ -0,0 +1,125 @@
+"""
+Read ordering following the physical layout of files, which avoids seeking on spinning disks.
+"""
+import logging
+import os
+import struct
+from enum import Enum
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FS_IOC_FIEMAP = 0xC020660B
+# struct fiemap header followed by one struct fiemap_extent
+_FIEMAP_HEADER = struct.Struct("=QQIIII")
+_FIEMAP_EXTENT = struct.Struct("=QQQQQIIII")
+
+
+class IOOrder(Enum):
+    WALK = "walk"  # the order files were found in
+    PHYSICAL = "physical"  # by disk offset (FIEMAP) or inode number
+    AUTO = "auto"  # physical on rotational devices, walk on the rest
+
+    def __str__(self):
+        return self.value
+
+
+_io_order = IOOrder.WALK
+
+
+def get_io_order() -> IOOrder:
+    return _io_order
+
+
+def set_io_order(io_order: IOOrder):
+    global _io_order
+    _io_order = IOOrder(io_order)
+
+
+def physical_offset(path) -> Optional[int]:
+    """
+    Disk offset of the first extent of the file, None when the filesystem cannot tell
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return None  # not a POSIX platform
+    buffer = bytearray(
+        _FIEMAP_HEADER.pack(0, 2**64 - 1, 0, 0, 1, 0) + bytes(_FIEMAP_EXTENT.size)
+    )
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        fcntl.ioctl(fd, FS_IOC_FIEMAP, buffer)
+    except OSError:
+        return None  # e.g. tmpfs, overlayfs or network filesystems
+    finally:
+        os.close(fd)
+    _, _, _, mapped_extents, _, _ = _FIEMAP_HEADER.unpack_from(buffer)
+    if not mapped_extents:
+        return None
+    _, physical, *_ = _FIEMAP_EXTENT.unpack_from(buffer, _FIEMAP_HEADER.size)
+    return physical
+
+
+@lru_cache(maxsize=None)
+def is_rotational(device: int) -> bool:
+    """
+    Whether the block device behind `device` (an `st_dev`) is a spinning disk
+    """
+    try:
+        block_path = Path(f"/sys/dev/block/{os.major(device)}:{os.minor(device)}")
+    except AttributeError:
+        return False  # not a POSIX platform
+    # partitions keep the queue settings in their parent disk
+    for queue_path in (block_path / "queue", block_path / ".." / "queue"):
+        try:
+            return queue_path.joinpath("rotational").read_text().strip() == "1"
+        except OSError:
+            continue
+    return False
+
+
+def _physical_key(file):
+    try:
+        stat = os.stat(file.path)
+    except OSError:
+        return (0, 0, 0)
+    offset = physical_offset(file.path)
+    if offset is None:
+        # inode numbers roughly follow allocation order on most local filesystems
+        return (stat.st_dev, 1, stat.st_ino)
+    return (stat.st_dev, 0, offset)
+
+
+def sort_for_reading(files: Iterable, io_order: Optional[IOOrder] = None) -> List:
+    """
+    Returns the files in the order they should be read
+    """
+    files = list(files)
+    io_order = io_order or _io_order
+    if io_order == IOOrder.WALK or len(files) < 2:
+        return files
+    if io_order == IOOrder.PHYSICAL:
+        return sorted(files, key=_physical_key)
+
+    # files on rotational devices get sorted, the rest keep their place
+    keys = {}
+    for index, file in enumerate(files):
+        try:
+            device = os.stat(file.path).st_dev
+        except OSError:
+            continue
+        if is_rotational(device):
+            keys[index] = _physical_key(file)
+    if not keys:
+        return files
+    sorted_indexes = iter(sorted(keys, key=keys.get))
+    return [
+        files[next(sorted_indexes)] if index in keys else file
+        for index, file in enumerate(files)
+    ]
@@ -2,10 +2,7 @@ import datetime
 import logging
 import re
 
-import PIL.ExifTags
-import dateutil.parser
-from PIL import Image
-from PIL.TiffTags import TAGS
+from ..profiling import profiled
 
 
 DATE_PATH_REGEXES = (
@@ -28,7 +25,11 @@ def get_path_creation_date(path):
     return None
 
 
+@profiled("exif")
 def get_image_creation_date(path):
+    # Pillow is only imported once an image needs dating
+    from PIL import Image
+
     try:
         image = Image.open(path)
     except IOError as e:
@@ -49,6 +50,9 @@ def get_image_creation_date(path):
 
 
 def _get_exif(image):
+    import PIL.ExifTags
+    from PIL.TiffTags import TAGS
+
     if image.format == "TIFF":
         return {TAGS.get(key): image.tag[key] for key in image.tag.keys()}
     return {
@@ -83,6 +87,8 @@ def _extract_created_date_from_exif(exif):
     if not created_data:
         return None
 
+    import dateutil.parser
+
     try:
         return dateutil.parser.parse(created_data)
     except ValueError as e:
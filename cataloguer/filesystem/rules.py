@@ -0,0 +1,153 @@
+"""
+gitignore-style rules telling which directories and files get walked. Excluded directories are
+pruned while walking, so nothing under them is listed, and excluded files are dropped before they
+get stat'ed or classified.
+"""
+import os
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# thumbnails, caches and version control data, never worth cataloguing
+DEFAULT_EXCLUDES = (
+    ".git/",
+    ".hg/",
+    ".svn/",
+    "@eaDir/",
+    ".thumbnails/",
+    ".cache/",
+    "__pycache__/",
+    "node_modules/",
+)
+
+
+def parse_patterns(value: Optional[str]) -> Tuple[str, ...]:
+    """
+    Splits comma separated patterns, e.g. "*.tmp,Backups/"
+    """
+    if not value:
+        return ()
+    return tuple(pattern.strip() for pattern in value.split(",") if pattern.strip())
+
+
+def _translate(pattern: str) -> str:
+    """
+    Glob to regex where `*` and `?` stay within a path component and `**` crosses them
+    """
+    regex = []
+    index = 0
+    while index < len(pattern):
+        if pattern.startswith("**/", index):
+            regex.append("(?:.*/)?")
+            index += 3
+        elif pattern.startswith("**", index):
+            regex.append(".*")
+            index += 2
+        elif pattern[index] == "*":
+            regex.append("[^/]*")
+            index += 1
+        elif pattern[index] == "?":
+            regex.append("[^/]")
+            index += 1
+        elif pattern[index] == "[" and "]" in pattern[index + 2 :]:
+            end = pattern.index("]", index + 2)
+            characters = pattern[index + 1 : end]
+            if characters.startswith("!"):
+                characters = "^" + characters[1:]
+            regex.append(f"[{characters}]")
+            index = end + 1
+        else:
+            regex.append(re.escape(pattern[index]))
+            index += 1
+    return "".join(regex) + r"\Z"
+
+
+class _Rule:
+    def __init__(self, pattern: str):
+        self.negated = pattern.startswith("!")
+        pattern = pattern[1:] if self.negated else pattern
+        self.directory_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        # patterns with a slash are relative to the walked root, the rest match names at any depth
+        self.anchored = "/" in pattern
+        self.regex = re.compile(_translate(pattern.lstrip("/")))
+
+    def matches(self, relative_path: str, name: str) -> bool:
+        return bool(self.regex.match(relative_path if self.anchored else name))
+
+
+class WalkRules:
+    """
+    Ordered patterns, the last one matching a path decides: excluded unless it starts with "!".
+    A trailing "/" only matches directories and a leading "/" anchors the pattern to the walked root.
+    """
+
+    def __init__(self, patterns: Iterable[str] = DEFAULT_EXCLUDES):
+        self.patterns = tuple(patterns)
+        rules = [_Rule(pattern) for pattern in self.patterns]
+        self._directory_rules = rules
+        self._file_rules = [rule for rule in rules if not rule.directory_only]
+
+    def extend(self, patterns: Iterable[str]) -> "WalkRules":
+        patterns = tuple(patterns)
+        if not patterns:
+            return self
+        return WalkRules((*self.patterns, *patterns))
+
+    @staticmethod
+    def _is_excluded(rules: List[_Rule], relative_path: str, name: str) -> bool:
+        excluded = False
+        for rule in rules:
+            if rule.matches(relative_path, name):
+                excluded = not rule.negated
+        return excluded
+
+    def is_excluded(self, relative_path: str, is_directory=False) -> bool:
+        rules = self._directory_rules if is_directory else self._file_rules
+        return self._is_excluded(rules, relative_path, os.path.basename(relative_path))
+
+    def walk(self, path, root=None) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """
+        Same as `os.walk`, without the excluded entries. Anchored patterns are relative to `root`,
+        `path` by default.
+        """
+        root = str(root or path)
+        for dirpath, dirnames, filenames in os.walk(path):
+            prefix = os.path.relpath(dirpath, root)
+            prefix = "" if prefix == "." else prefix + "/"
+            # pruned in place, os.walk does not descend into the removed directories
+            dirnames[:] = [
+                dirname
+                for dirname in dirnames
+                if not self._is_excluded(self._directory_rules, prefix + dirname, dirname)
+            ]
+            if self._file_rules:
+                filenames = [
+                    filename
+                    for filename in filenames
+                    if not self._is_excluded(self._file_rules, prefix + filename, filename)
+                ]
+            yield dirpath, dirnames, filenames
+
+    def count_files(self, path, root=None) -> int:
+        return sum(len(filenames) for _, _, filenames in self.walk(path, root=root))
+
+
+_walk_rules: Optional[WalkRules] = None
+
+
+def get_walk_rules() -> WalkRules:
+    """
+    Returns the rules applied to every walk, the defaults plus `GlobalSettings.exclude`
+    """
+    global _walk_rules
+    if _walk_rules is None:
+        _walk_rules = WalkRules()
+    return _walk_rules
+
+
+def set_walk_rules(walk_rules: Optional[WalkRules]):
+    """
+    Replaces the shared rules, None goes back to the defaults
+    """
+    global _walk_rules
+    _walk_rules = walk_rules
@@ -0,0 +1,131 @@
+"""
+Perceptual hashes of images and a BK-tree to find the ones which look alike,
+e.g. resized or re-encoded copies of the same photo.
+"""
+import logging
+from typing import Callable, Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+from ..profiling import profiled
+
+logger = logging.getLogger(__name__)
+
+# a 8x8 difference hash, 64 bits
+HASH_SIZE = 8
+DEFAULT_MAX_DISTANCE = 6
+
+T = TypeVar("T")
+
+
+@profiled("perceptual hash")
+def perceptual_hash(path) -> Optional[int]:
+    """
+    Difference hash of the image, None when it cannot be decoded
+    """
+    from PIL import Image
+
+    try:
+        with Image.open(path) as image:
+            # JPEG decoders can scale down while decoding, much faster than a full decode
+            image.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+            # one byte per pixel in "L" mode
+            pixels = (
+                image.convert("L")
+                .resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR)
+                .tobytes()
+            )
+    except (IOError, ValueError) as e:
+        logger.debug(f"Cannot compute perceptual hash of {path}: {e}")
+        return None
+
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for column in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + column] > pixels[offset + column + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class BKTree(Generic[T]):
+    """
+    Metric tree over perceptual hashes, searches only visit the branches which can hold a match
+    instead of comparing against every hash.
+    """
+
+    def __init__(self, distance: Callable[[int, int], int] = hamming_distance):
+        self.distance = distance
+        self._root = None  # [hash, items, {distance: child}]
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, value: int, item: T):
+        self._size += 1
+        if self._root is None:
+            self._root = [value, [item], {}]
+            return
+        node = self._root
+        while True:
+            distance = self.distance(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, T]]:
+        """
+        Returns `(distance, item)` of the items within `max_distance` of `value`, closest first
+        """
+        results = []
+        pending = [self._root] if self._root is not None else []
+        while pending:
+            node = pending.pop()
+            distance = self.distance(value, node[0])
+            if distance <= max_distance:
+                results.extend((distance, item) for item in node[1])
+            # triangle inequality, only children at these distances can be close enough
+            for child_distance, child in node[2].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    pending.append(child)
+        results.sort(key=lambda result: result[0])
+        return results
+
+
+def group_similar(
+    items_by_hash: Iterable[Tuple[int, T]], max_distance: int = DEFAULT_MAX_DISTANCE
+) -> List[List[T]]:
+    """
+    Groups the items whose hashes are within `max_distance` of each other, directly or
+    through other items of the group. Items without a similar one are left out.
+    """
+    items_by_hash = list(items_by_hash)
+    tree: BKTree[int] = BKTree()
+    for index, (value, _) in enumerate(items_by_hash):
+        tree.add(value, index)
+
+    parents = list(range(len(items_by_hash)))
+
+    def find(index):
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    for index, (value, _) in enumerate(items_by_hash):
+        for _, other in tree.search(value, max_distance):
+            root, other_root = find(index), find(other)
+            if root != other_root:
+                parents[max(root, other_root)] = min(root, other_root)
+
+    groups: Dict[int, List[T]] = {}
+    for index, (_, item) in enumerate(items_by_hash):
+        groups.setdefault(find(index), []).append(item)
+    return [group for group in groups.values() if len(group) > 1]
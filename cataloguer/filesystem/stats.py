@@ -0,0 +1,141 @@
+"""
+Counters of the files of a catalogue, kept up to date as files get added, moved, removed or read,
+so a catalogue can be summarised without looking at its files.
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional
+
+# key of the files which type or creation date has not been read yet
+NOT_READ_KEY = ""
+UNKNOWN_DATE_KEY = "unknown"
+MEDIA_TYPES = ("image", "video")
+
+
+def media_key(mimetype: Optional[str]) -> str:
+    if mimetype is None:
+        return NOT_READ_KEY
+    return mimetype.split("/")[0]
+
+
+def month_key(creation_date) -> str:
+    # `creation_date` might still be `NOT_READ`
+    if isinstance(creation_date, datetime):
+        return creation_date.strftime("%Y-%m")
+    if creation_date is None:
+        return UNKNOWN_DATE_KEY
+    return NOT_READ_KEY
+
+
+class ShardStats:
+    """
+    Number of files and bytes per media type and number of media files per creation month
+    """
+
+    def __init__(self, files=None, size=None, months=None):
+        self.files = Counter(files or {})
+        self.size = Counter(size or {})
+        self.months = Counter(months or {})
+
+    def add(self, mimetype, creation_date, size, sign=1):
+        media_type = media_key(mimetype)
+        self.files[media_type] += sign
+        self.size[media_type] += sign * size
+        # only photos and videos are counted by month
+        if media_type == NOT_READ_KEY:
+            self.months[NOT_READ_KEY] += sign
+        elif media_type in MEDIA_TYPES:
+            self.months[month_key(creation_date)] += sign
+
+    @property
+    def not_read(self):
+        return self.files[NOT_READ_KEY] + self.months[NOT_READ_KEY]
+
+    def asdict(self):
+        return {
+            field: {key: value for key, value in counter.items() if value}
+            for field, counter in (
+                ("files", self.files),
+                ("size", self.size),
+                ("months", self.months),
+            )
+        }
+
+
+class CatalogueStats:
+    """
+    Counters of a catalogue by shard, so a shard explored again only replaces its own counters.
+    Duplicates are the groups found by the last duplicate detection, `None` once they might have changed.
+    """
+
+    def __init__(self, shards=None, duplicates=None, duplicates_media_only=True):
+        self.shards: Dict[str, ShardStats] = {
+            key: ShardStats(**shard) for key, shard in (shards or {}).items()
+        }
+        self.duplicates: Optional[Counter] = (
+            Counter(duplicates) if duplicates is not None else None
+        )
+        self.duplicates_media_only = duplicates_media_only
+
+    def add_file(self, key, file, sign=1):
+        self.shards.setdefault(key, ShardStats()).add(
+            file._mimetype, file._creation_date, file.size, sign=sign
+        )
+
+    def remove_file(self, key, file):
+        self.add_file(key, file, sign=-1)
+
+    def update_file(self, key, file, field, new_value):
+        """
+        Moves the file between counters when its type or creation date gets read
+        """
+        mimetype, creation_date = file._mimetype, file._creation_date
+        shard = self.shards.setdefault(key, ShardStats())
+        shard.add(mimetype, creation_date, file.size, sign=-1)
+        if field == "mimetype":
+            mimetype = new_value
+        else:
+            creation_date = new_value
+        shard.add(mimetype, creation_date, file.size)
+
+    def reset_shard(self, key):
+        self.shards[key] = ShardStats()
+
+    def set_duplicates(self, duplicated_files, media_only):
+        self.duplicates = Counter(
+            duplicated_list[0].get_media_type() for duplicated_list in duplicated_files
+        )
+        self.duplicates_media_only = media_only
+
+    def summarise(self, media_only=True):
+        """
+        Returns count, size and duplicates by media type like `summarise_files`, and the
+        number of media files by creation month. None when some files were not read yet.
+        """
+        if self.duplicates is None or (self.duplicates_media_only and not media_only):
+            return None
+        if any(shard.not_read for shard in self.shards.values()):
+            return None
+
+        files, size, months = Counter(), Counter(), Counter()
+        for shard in self.shards.values():
+            files.update(shard.files)
+            size.update(shard.size)
+            months.update(shard.months)
+        media_types = {
+            media_type: {
+                "files": count,
+                "size": size[media_type],
+                "duplicates": self.duplicates.get(media_type, 0),
+            }
+            for media_type, count in sorted(files.items())
+            if count > 0 and (not media_only or media_type in MEDIA_TYPES)
+        }
+        return media_types, {month: count for month, count in sorted(months.items()) if count > 0}
+
+    def asdict(self, keys):
+        return {
+            "shards": {key: self.shards[key].asdict() for key in keys if key in self.shards},
+            "duplicates": dict(self.duplicates) if self.duplicates is not None else None,
+            "duplicates_media_only": self.duplicates_media_only,
+        }
@@ -0,0 +1,81 @@
+import threading
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """
+    Token bucket shared by threads, e.g. to cap the bytes read per second.
+
+    `consume` reserves its amount straight away and sleeps outside the lock until the
+    bucket refills, so concurrent callers queue up fairly and big amounts are allowed.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = burst or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: float = 1):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class IOBudget:
+    """
+    Bytes per second and I/O operations per second shared by every hashing and transfer worker
+    """
+
+    def __init__(
+        self,
+        bytes_per_second: Optional[float] = None,
+        operations_per_second: Optional[float] = None,
+    ):
+        self.bytes_per_second = bytes_per_second
+        self.operations_per_second = operations_per_second
+        self._bytes = RateLimiter(bytes_per_second) if bytes_per_second else None
+        self._operations = (
+            RateLimiter(operations_per_second) if operations_per_second else None
+        )
+
+    @classmethod
+    def from_settings(cls, global_settings) -> Optional["IOBudget"]:
+        if not global_settings.io_bandwidth and not global_settings.io_operations:
+            return None
+        return cls(
+            bytes_per_second=global_settings.io_bandwidth,
+            operations_per_second=global_settings.io_operations,
+        )
+
+    def consume(self, size: int = 0, operations: int = 1):
+        if self._operations is not None and operations:
+            self._operations.consume(operations)
+        if self._bytes is not None and size:
+            self._bytes.consume(size)
+
+
+_io_budget: Optional[IOBudget] = None
+
+
+def get_io_budget() -> Optional[IOBudget]:
+    return _io_budget
+
+
+def set_io_budget(budget: Optional[IOBudget]):
+    """
+    Sets the budget enforced by `get_hash` and file transfers, None removes any limit
+    """
+    global _io_budget
+    _io_budget = budget
@@ -1,7 +1,11 @@
 import hashlib
 import os
+import shutil
 from pathlib import Path
 
+from ..profiling import profiler
+from .throttle import get_io_budget
+
 
 DATABASE_LOCATION = ".cataloguer_db.json"
 
@@ -10,8 +14,25 @@ KEEP_PARENT_FOLDERS = (  # TODO: undocumented behaviour
     "Burst Sequence",
 )
 
+HASH_CHUNK_SIZE = 64 * 1024
+COPY_CHUNK_SIZE = 1024 * 1024
+
 UNITS = {1000: ["KB", "MB", "GB"], 1024: ["KiB", "MiB", "GiB"]}
 
+SIZE_SUFFIXES = {
+    "": 1,
+    "B": 1,
+    "K": 1000,
+    "KB": 1000,
+    "M": 1000**2,
+    "MB": 1000**2,
+    "G": 1000**3,
+    "GB": 1000**3,
+    "KIB": 1024,
+    "MIB": 1024**2,
+    "GIB": 1024**3,
+}
+
 
 def split_extension_from_filename(filename: str):
     name_split = filename.split(".")
@@ -91,14 +112,6 @@ def _generate_filename(
     return strftime_format
 
 
-def count_number_of_files(path):
-    file_count = 0
-    for dirpath, dirnames, filenames in os.walk(path):
-        for _ in filenames:
-            file_count += 1
-    return file_count
-
-
 def _chunk_reader(fobj, chunk_size=1024):
     """Generator that reads a file in chunks of bytes"""
     while True:
@@ -108,20 +121,88 @@ def _chunk_reader(fobj, chunk_size=1024):
         yield chunk
 
 
-def get_hash(path, first_chunk_only=False):
+def get_hash(path, first_chunk_only=False, chunk_size=HASH_CHUNK_SIZE, rate_limiter=None):
+    """
+    sha1 of the file, or of its first KB.
+    Every chunk read is charged to the I/O budget and to `rate_limiter`, if any.
+    """
+    budget = get_io_budget()
     hash_obj = hashlib.sha1()
-    with open(path, "rb") as file_object:
-        if first_chunk_only:
-            hash_obj.update(file_object.read(1024))
-        else:
-            for chunk in _chunk_reader(file_object):
+    with profiler.measure("short hash" if first_chunk_only else "hash") as measurement:
+        with open(path, "rb") as file_object:
+            if first_chunk_only:
+                chunk = file_object.read(1024)
+                if budget:
+                    budget.consume(len(chunk))
                 hash_obj.update(chunk)
+                measurement.bytes_read += len(chunk)
+            else:
+                for chunk in _chunk_reader(file_object, chunk_size=chunk_size):
+                    if budget:
+                        budget.consume(len(chunk))
+                    if rate_limiter:
+                        rate_limiter.consume(len(chunk))
+                    hash_obj.update(chunk)
+                    measurement.bytes_read += len(chunk)
     return hash_obj.hexdigest()
 
 
+def copy_file(src, dst):
+    """
+    `shutil.copy2`, copying chunk by chunk within the I/O budget when there is one
+    """
+    budget = get_io_budget()
+    if budget is None:
+        return shutil.copy2(src, dst)
+
+    with open(src, "rb") as src_object, open(dst, "wb") as dst_object:
+        for chunk in _chunk_reader(src_object, chunk_size=COPY_CHUNK_SIZE):
+            budget.consume(len(chunk), operations=2)  # read and write
+            dst_object.write(chunk)
+    shutil.copystat(src, dst)
+    return dst
+
+
+def move_file(src, dst):
+    """
+    `shutil.move`, which renames when possible and copies within the I/O budget otherwise
+    """
+    budget = get_io_budget()
+    if budget is not None:
+        budget.consume(operations=1)
+    return shutil.move(src, dst, copy_function=copy_file)
+
+
+def create_directories(directories):
+    """
+    Creates every directory (and its parents) with one `mkdir` each, those already covered by
+    a deeper one are skipped
+    """
+    created = set()
+    with profiler.measure("mkdir"):
+        for directory in sorted(set(directories), key=lambda path: len(path.parts), reverse=True):
+            if directory in created:
+                continue
+            directory.mkdir(parents=True, exist_ok=True)
+            created.add(directory)
+            created.update(directory.parents)
+
+
 def approximate_size(size, international_system=True):
     mult = 1000 if international_system else 1024
     for unit in UNITS[mult]:
         size = size / mult
         if size < mult:
             return "{0:.2f} {1}".format(size, unit)
+
+
+def parse_size(value) -> int:
+    """
+    Parses sizes like "500", "20MB", "1.5G" or "64MiB" into bytes
+    """
+    text = str(value).strip().upper().replace(" ", "")
+    number = text.rstrip("BGIKM")
+    suffix = text[len(number):]
+    if suffix not in SIZE_SUFFIXES or not number:
+        raise ValueError(f'Cannot parse size "{value}"')
+    return int(float(number) * SIZE_SUFFIXES[suffix])
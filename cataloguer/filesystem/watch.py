@@ -0,0 +1,222 @@
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from .rules import WalkRules, get_walk_rules
+
+logger = logging.getLogger(__name__)
+
+# from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+_libc = None
+
+
+def _get_libc():
+    global _libc
+    if _libc is None:
+        library = ctypes.util.find_library("c")
+        if not library:
+            raise OSError("inotify is not available, libc could not be found")
+        _libc = ctypes.CDLL(library, use_errno=True)
+        if not hasattr(_libc, "inotify_init1"):
+            raise OSError("inotify is not available on this platform")
+    return _libc
+
+
+class Inotify:
+    """
+    Minimal ctypes binding of Linux inotify, watching a directory tree.
+    Yields `(path, mask)` for every event, see `WATCH_MASK`.
+    """
+
+    def __init__(self):
+        self._libc = _get_libc()
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self._paths_by_watch: Dict[int, Path] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def add_watch(self, path: Path, mask=WATCH_MASK):
+        watch = self._libc.inotify_add_watch(
+            self.fd, os.fsencode(path), mask | IN_ONLYDIR
+        )
+        if watch < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), str(path))
+        self._paths_by_watch[watch] = Path(path)
+        return watch
+
+    def add_tree(self, path: Path, rules: Optional[WalkRules] = None, root=None) -> List[Path]:
+        """
+        Watches `path` and its sub directories but the excluded ones, returns the files already in there
+        """
+        files = []
+        for dirpath, dirnames, filenames in (rules or get_walk_rules()).walk(path, root=root):
+            try:
+                self.add_watch(Path(dirpath))
+            except OSError as e:
+                if e.errno not in (errno.ENOENT, errno.ENOTDIR):
+                    raise
+                continue
+            files.extend(Path(dirpath).joinpath(filename) for filename in filenames)
+        return files
+
+    def read_events(self, timeout: Optional[float] = None):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset < len(data):
+            watch, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_IGNORED:
+                self._paths_by_watch.pop(watch, None)
+                continue
+            directory = self._paths_by_watch.get(watch)
+            if mask & IN_Q_OVERFLOW:
+                events.append((None, mask))
+            elif directory is not None:
+                path = directory.joinpath(os.fsdecode(name)) if name else directory
+                events.append((path, mask))
+        return events
+
+
+class Debouncer:
+    """
+    Holds paths until they stopped changing for `delay` seconds, then hands them out in batches
+    """
+
+    def __init__(self, delay: float, batch_size: int):
+        self.delay = delay
+        self.batch_size = batch_size
+        self._pending: Dict[Path, float] = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, path: Path, now: Optional[float] = None):
+        # re-adding moves it to the end, dicts keep insertion order
+        self._pending.pop(path, None)
+        self._pending[path] = time.monotonic() if now is None else now
+
+    def discard(self, path: Path):
+        self._pending.pop(path, None)
+
+    def ready(self, now: Optional[float] = None) -> List[Path]:
+        now = time.monotonic() if now is None else now
+        batch = []
+        for path, last_change in self._pending.items():
+            if now - last_change < self.delay:
+                break  # ordered by last change, the rest changed later
+            batch.append(path)
+            if len(batch) == self.batch_size:
+                break
+        for path in batch:
+            del self._pending[path]
+        return batch
+
+    def next_timeout(self, now: Optional[float] = None) -> Optional[float]:
+        """
+        Seconds until the oldest pending path gets ready
+        """
+        if not self._pending:
+            return None
+        now = time.monotonic() if now is None else now
+        oldest = next(iter(self._pending.values()))
+        return max(oldest + self.delay - now, 0)
+
+
+def watch_files(
+    path: Path,
+    delay: float = 2.0,
+    batch_size: int = 100,
+    stop=None,
+    poll_interval: float = 1.0,
+    rules: Optional[WalkRules] = None,
+) -> Iterator[List[Path]]:
+    """
+    Yields batches of files written or moved into `path`, starting with the ones already there.
+    `stop` is an optional `threading.Event` ending the loop.
+    """
+    path = Path(path)
+    rules = rules or get_walk_rules()
+    debouncer = Debouncer(delay=delay, batch_size=batch_size)
+
+    def is_excluded(event_path, is_directory=False):
+        return rules.is_excluded(str(event_path.relative_to(path)), is_directory=is_directory)
+
+    with Inotify() as inotify:
+        for file_path in inotify.add_tree(path, rules=rules):
+            debouncer.add(file_path, now=float("-inf"))
+
+        while stop is None or not stop.is_set():
+            batch = debouncer.ready()
+            if batch:
+                yield batch
+                continue
+
+            timeout = debouncer.next_timeout()
+            if timeout is None or timeout > poll_interval:
+                timeout = poll_interval
+            for event_path, mask in inotify.read_events(timeout=timeout):
+                if mask & IN_Q_OVERFLOW:
+                    logger.warning("Too many file events, rescanning %s", path)
+                    for file_path in inotify.add_tree(path, rules=rules):
+                        debouncer.add(file_path)
+                elif mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and not is_excluded(
+                        event_path, is_directory=True
+                    ):
+                        # files could land before the watch is in place
+                        for file_path in inotify.add_tree(event_path, rules=rules, root=path):
+                            debouncer.add(file_path)
+                elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    if not is_excluded(event_path):
+                        debouncer.add(event_path)
+                elif mask & (IN_MOVED_FROM | IN_DELETE):
+                    debouncer.discard(event_path)
@@ -0,0 +1,288 @@
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional
+
+from .filesystem.file import NOT_READ
+from .filesystem.utils import get_hash, split_extension_from_filename
+
+INDEX_FILENAME = "index.sqlite3"
+
+logger = logging.getLogger(__name__)
+
+# bumped when the schema changes, older indexes get rebuilt from the catalogues
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalogues (
+    name TEXT PRIMARY KEY,
+    path TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    catalogue TEXT NOT NULL,
+    shard TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    short_hash TEXT,
+    hash TEXT,
+    media_type TEXT,
+    mimetype TEXT,
+    extension TEXT,
+    creation_date TEXT
+);
+CREATE INDEX IF NOT EXISTS files_content ON files (size, short_hash, hash);
+CREATE INDEX IF NOT EXISTS files_catalogue ON files (catalogue, shard);
+CREATE INDEX IF NOT EXISTS files_media_type ON files (media_type, creation_date);
+CREATE INDEX IF NOT EXISTS files_creation_date ON files (creation_date);
+CREATE INDEX IF NOT EXISTS files_extension ON files (extension);
+"""
+
+
+class IndexEntry(NamedTuple):
+    catalogue: str
+    path: Path
+
+
+class QueryResult(NamedTuple):
+    catalogue: str
+    path: Path
+    size: int
+    mimetype: Optional[str]
+    creation_date: Optional[str]
+
+
+def _indexed_date(creation_date) -> Optional[str]:
+    # NULL when not read yet, empty when unknown
+    if creation_date is NOT_READ:
+        return None
+    return creation_date.isoformat() if creation_date else ""
+
+
+def _extension(path) -> str:
+    _, extension = split_extension_from_filename(path.name)
+    return extension.lower()
+
+
+class ContentIndex:
+    """
+    Content index shared by all catalogues, mapping (size, short_hash, hash) to catalogue and path.
+
+    Duplicate lookups across catalogues become index probes instead of loading every catalogue.
+    Hashes are stored as known by the catalogue, missing ones are computed and stored on demand.
+    A single connection is opened on first use and kept until `close`.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._connection = None
+
+    def _connect(self):
+        if self._connection is not None:
+            return self._connection
+        import sqlite3
+
+        # the daemon handles requests, one at a time, from different threads
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        (version,) = connection.execute("PRAGMA user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            # catalogues missing from the index get indexed again by `Storage.update_index`
+            connection.executescript(
+                f"DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS catalogues; "
+                f"PRAGMA user_version = {SCHEMA_VERSION};"
+            )
+        connection.executescript(SCHEMA)
+        self._connection = connection
+        return connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def catalogue_names(self):
+        connection = self._connect()
+        return {name for name, in connection.execute("SELECT name FROM catalogues")}
+
+    def update_catalogue(self, catalogue, shards=None):
+        """
+        Replaces the entries of the given catalogue shards, all of them by default
+        """
+        if shards is None:
+            files = catalogue.files
+        else:
+            shards = set(shards)
+            files = [
+                file for file in catalogue._files if catalogue.shard_key(file.path) in shards
+            ]
+        rows = (
+            (
+                catalogue.name,
+                catalogue.shard_key(file.path),
+                str(file.path.relative_to(catalogue.path)),
+                file.size,
+                file._short_hash,
+                file._hash,
+                file._mimetype.split("/")[0] if file._mimetype else None,
+                file._mimetype,
+                _extension(file.path),
+                _indexed_date(file._creation_date),
+            )
+            for file in files
+        )
+        connection = self._connect()
+        with connection:
+            if shards is None:
+                connection.execute(
+                    "DELETE FROM files WHERE catalogue = ?", (catalogue.name,)
+                )
+            else:
+                connection.executemany(
+                    "DELETE FROM files WHERE catalogue = ? AND shard = ?",
+                    ((catalogue.name, shard) for shard in shards),
+                )
+            connection.execute(
+                "INSERT OR REPLACE INTO catalogues (name, path) VALUES (?, ?)",
+                (catalogue.name, str(catalogue.path)),
+            )
+            connection.executemany(
+                "INSERT INTO files (catalogue, shard, path, size, short_hash, hash, media_type, "
+                "mimetype, extension, creation_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def remove_catalogue(self, name: str):
+        connection = self._connect()
+        with connection:
+            connection.execute("DELETE FROM files WHERE catalogue = ?", (name,))
+            connection.execute("DELETE FROM catalogues WHERE name = ?", (name,))
+
+    def query(
+        self,
+        catalogue: Optional[str] = None,
+        media_type: Optional[str] = None,
+        extensions: Iterable[str] = (),
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        since: Optional[datetime] = None,
+        before: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> List[QueryResult]:
+        """
+        Returns the indexed files matching every given filter, sizes are inclusive and dates
+        go from `since` (inclusive) to `before` (exclusive). Files without a known creation date
+        are left out by date filters.
+        """
+        conditions = []
+        parameters = []
+        if catalogue is not None:
+            conditions.append("files.catalogue = ?")
+            parameters.append(catalogue)
+        if media_type is not None:
+            conditions.append("files.media_type = ?")
+            parameters.append(media_type)
+        extensions = [extension.lower().lstrip(".") for extension in extensions]
+        if extensions:
+            conditions.append(f"files.extension IN ({', '.join('?' for _ in extensions)})")
+            parameters.extend(extensions)
+        if min_size is not None:
+            conditions.append("files.size >= ?")
+            parameters.append(min_size)
+        if max_size is not None:
+            conditions.append("files.size <= ?")
+            parameters.append(max_size)
+        # ISO dates sort as text
+        if since is not None:
+            conditions.append("files.creation_date >= ?")
+            parameters.append(since.isoformat())
+        if before is not None:
+            conditions.append("files.creation_date != '' AND files.creation_date < ?")
+            parameters.append(before.isoformat())
+
+        statement = (
+            "SELECT files.catalogue, catalogues.path, files.path, files.size, files.mimetype, "
+            "files.creation_date FROM files JOIN catalogues ON files.catalogue = catalogues.name"
+        )
+        if conditions:
+            statement += " WHERE " + " AND ".join(conditions)
+        statement += " ORDER BY files.catalogue, files.creation_date, files.path"
+        if limit is not None:
+            statement += " LIMIT ?"
+            parameters.append(limit)
+
+        connection = self._connect()
+        return [
+            QueryResult(
+                catalogue=catalogue_name,
+                path=Path(root).joinpath(path),
+                size=size,
+                mimetype=mimetype,
+                creation_date=creation_date or None,
+            )
+            for catalogue_name, root, path, size, mimetype, creation_date in connection.execute(
+                statement, parameters
+            )
+        ]
+
+    def count_missing_metadata(self, catalogue: str) -> int:
+        """
+        Number of files of the catalogue indexed before their type and creation date were read
+        """
+        connection = self._connect()
+        (count,) = connection.execute(
+            "SELECT COUNT(*) FROM files WHERE catalogue = ? "
+            "AND (mimetype IS NULL OR creation_date IS NULL)",
+            (catalogue,),
+        ).fetchone()
+        return count
+
+    def lookup(self, file) -> List[IndexEntry]:
+        """
+        Returns the catalogued files with the same content as the given file
+        """
+        connection = self._connect()
+        with connection:
+            candidates = connection.execute(
+                "SELECT files.rowid, files.catalogue, catalogues.path, files.path, files.short_hash, files.hash "
+                "FROM files JOIN catalogues ON files.catalogue = catalogues.name "
+                "WHERE files.size = ?",
+                (file.size,),
+            ).fetchall()
+            if not candidates:
+                return []
+
+            candidates = self._filter_by_hash(
+                connection, candidates, file.short_hash, column=4, first_chunk_only=True
+            )
+            if not candidates:
+                return []
+
+            candidates = self._filter_by_hash(
+                connection, candidates, file.hash, column=5, first_chunk_only=False
+            )
+        return [
+            IndexEntry(catalogue=catalogue, path=Path(root).joinpath(path))
+            for _, catalogue, root, path, _, _ in candidates
+        ]
+
+    @staticmethod
+    def _filter_by_hash(connection, candidates, file_hash, column, first_chunk_only):
+        field = "short_hash" if first_chunk_only else "hash"
+        matching = []
+        for candidate in candidates:
+            candidate_hash = candidate[column]
+            if candidate_hash is None:
+                rowid, _, root, path, _, _ = candidate
+                try:
+                    candidate_hash = get_hash(
+                        Path(root).joinpath(path), first_chunk_only=first_chunk_only
+                    )
+                except OSError as e:
+                    logger.warning("Cannot read %s: %s", Path(root).joinpath(path), e)
+                    continue
+                connection.execute(
+                    f"UPDATE files SET {field} = ? WHERE rowid = ?",
+                    (candidate_hash, rowid),
+                )
+            if candidate_hash == file_hash:
+                matching.append(candidate)
+        return matching
@@ -0,0 +1,152 @@
+import json
+import threading
+import time
+from functools import wraps
+from typing import Dict
+
+
+class StageStats:
+    __slots__ = ("calls", "wall_time", "bytes_read", "bytes_written")
+
+    def __init__(self):
+        self.calls = 0
+        self.wall_time = 0.0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def asdict(self):
+        return {
+            "calls": self.calls,
+            "wall_time": self.wall_time,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+        }
+
+
+class Measurement:
+    """
+    Times one call of a stage, callers may add the bytes they read or wrote
+    """
+
+    __slots__ = ("profiler", "name", "start", "bytes_read", "bytes_written")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.profiler.record(
+            self.name,
+            wall_time=time.perf_counter() - self.start,
+            bytes_read=self.bytes_read,
+            bytes_written=self.bytes_written,
+        )
+
+
+class _NullMeasurement:
+    """
+    Shared measurement handed out while profiling is disabled, anything recorded on it is dropped
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def __setattr__(self, key, value):
+        pass
+
+    bytes_read = 0
+    bytes_written = 0
+
+
+NULL_MEASUREMENT = _NullMeasurement()
+
+
+class Profiler:
+    """
+    Collects wall time, call counts and bytes read and written per stage.
+    Disabled by default, so instrumented code only pays for a flag check.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stages: Dict[str, StageStats] = {}
+        self._lock = threading.Lock()
+        self._start = None
+        self._end = None
+
+    def enable(self):
+        self.enabled = True
+        self._start = time.perf_counter()
+        self._end = None
+
+    def disable(self):
+        self.enabled = False
+        self._end = time.perf_counter()
+
+    def reset(self):
+        self.stages = {}
+        self._start = self._end = None
+
+    @property
+    def wall_time(self):
+        if self._start is None:
+            return 0.0
+        return (self._end or time.perf_counter()) - self._start
+
+    def measure(self, name: str):
+        if not self.enabled:
+            return NULL_MEASUREMENT
+        return Measurement(self, name)
+
+    def record(self, name: str, wall_time=0.0, bytes_read=0, bytes_written=0, calls=1):
+        # stages get measured from executor threads too
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = StageStats()
+            stats.calls += calls
+            stats.wall_time += wall_time
+            stats.bytes_read += bytes_read
+            stats.bytes_written += bytes_written
+
+    def report(self):
+        return {
+            "wall_time": self.wall_time,
+            "stages": {name: stats.asdict() for name, stats in self.stages.items()},
+        }
+
+    def save_report(self, path):
+        with open(path, "w") as fd:
+            json.dump(self.report(), fd, indent=2)
+
+
+profiler = Profiler()
+
+
+def profiled(name: str):
+    """
+    Decorator measuring every call of the decorated function as the `name` stage
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            with profiler.measure(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -4,6 +4,11 @@ from typing import Optional
 import click
 from pydantic import BaseSettings, validator
 
+from .filesystem.layout import IOOrder
+from .filesystem.utils import parse_size
+
+
+SOCKET_FILENAME = "cataloguer.sock"
 
 ALLOWED_FORMAT_VARIABLES = (
     "media_type",
@@ -19,6 +24,19 @@ class GlobalSettings(BaseSettings):
     format_pattern: Optional[str] = None
     unknown_format_pattern: Optional[str] = None
     storage_location: Path = Path.home().joinpath(".catalogues/")
+    # defaults to a "cataloguer.sock" file in the storage location
+    socket_path: Optional[Path] = None
+    # I/O budget shared by hashing and file transfers, unlimited by default
+    io_bandwidth: Optional[int] = None
+    io_operations: Optional[int] = None
+    # order hashing and transfers read files in
+    io_order: IOOrder = IOOrder.WALK
+    # concurrent reads (and writes) per disk, see `DeviceQueues`
+    device_workers: Optional[int] = None
+    # processes reading file types and creation dates, see `MetadataReader`
+    metadata_workers: Optional[int] = None
+    # comma separated gitignore-style patterns skipped by every walk, on top of `DEFAULT_EXCLUDES`
+    exclude: Optional[str] = None
 
     class Config:
         env_prefix = "CATALOGUER_"
@@ -36,6 +54,33 @@ class GlobalSettings(BaseSettings):
                 )
         return format_pattern
 
+    @validator("io_bandwidth", pre=True)
+    def parse_io_bandwidth(cls, io_bandwidth):
+        if io_bandwidth in (None, ""):
+            return None
+        try:
+            return parse_size(io_bandwidth)
+        except ValueError as exception:
+            raise click.BadParameter(str(exception))
+
+    @validator("io_bandwidth", "io_operations")
+    def must_be_positive(cls, value: Optional[int]):
+        if value is not None and value <= 0:
+            raise click.BadParameter("I/O budgets must be positive")
+        return value
+
+    @validator("device_workers")
+    def device_workers_must_be_positive(cls, device_workers: Optional[int]):
+        if device_workers is not None and device_workers <= 0:
+            raise click.BadParameter("--device-workers must be positive")
+        return device_workers
+
+    @validator("metadata_workers")
+    def metadata_workers_must_be_positive(cls, metadata_workers: Optional[int]):
+        if metadata_workers is not None and metadata_workers <= 0:
+            raise click.BadParameter("--metadata-workers must be positive")
+        return metadata_workers
+
     @validator("storage_location")
     def storage_location_must_exists(cls, storage_location: Path):
         if storage_location:
@@ -44,3 +89,9 @@ class GlobalSettings(BaseSettings):
                 raise ValueError(f"{storage_location} is not a directory")
             storage_location.mkdir(parents=True, exist_ok=True)
         return storage_location
+
+    @validator("socket_path", always=True)
+    def default_socket_path(cls, socket_path: Optional[Path], values):
+        if socket_path is None and values.get("storage_location"):
+            return values["storage_location"].joinpath(SOCKET_FILENAME)
+        return socket_path
@@ -1,29 +1,146 @@
-import json
 import logging
+import os
+import shutil
+from contextlib import suppress
 from pathlib import Path
+from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
-from .filesystem.directory import Catalogue
+from .filesystem.bloom import BloomFilter
+from .filesystem.directory import Catalogue, read_metadata, shard_filename
+from .filesystem.jsonstream import load_object
+from .index import ContentIndex, INDEX_FILENAME
+from .profiling import profiler
 
 logger = logging.getLogger(__name__)
 
 
 class Storage(BaseModel):
     path: Path
+    _index: Optional[ContentIndex] = PrivateAttr(default=None)
+
+    @property
+    def index(self) -> ContentIndex:
+        # one connection for every lookup of a command
+        if self._index is None:
+            self._index = ContentIndex(self.path.joinpath(INDEX_FILENAME))
+        return self._index
+
+    def list_catalogue_names(self):
+        return sorted(path.stem for path in self.path.glob("*.json"))
+
+    def verification_state_path(self, name: str) -> Path:
+        # not a `.json` file, which would be listed as a catalogue
+        return self.path.joinpath(f"{name}.verify")
+
+    def catalogue_exists(self, name: str):
+        return self.path.joinpath(f"{name}.json").is_file()
+
+    def catalogue_version(self, name: str):
+        """
+        Changes every time the catalogue gets saved (its shards are written before it), None if it does not exist
+        """
+        try:
+            stat = self.path.joinpath(f"{name}.json").stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
 
     def load_catalogue(self, name: str, force_reload=True):
         try:
-            with open(self.path.joinpath(f"{name}.json"), "r") as fd:
-                return Catalogue.parse_obj(json.load(fd), force_reload=force_reload)
+            with open(
+                self.path.joinpath(f"{name}.json"), "r"
+            ) as fd, profiler.measure("catalogue load") as measurement:
+                measurement.bytes_read = os.fstat(fd.fileno()).st_size
+                # catalogues saved before sharding hold all their files, those are streamed
+                data, files = load_object(fd, streamed_key="files")
+                catalogue = Catalogue.parse_obj(
+                    {**data, "files": files},
+                    force_reload=force_reload,
+                    shards_path=self.path.joinpath(f"{name}.shards"),
+                )
         except FileNotFoundError:
             return None
         except Exception as exception:
             logger.warning(f'Error happen when loading "{name}": {exception}')
             return None
 
+        if not catalogue.explored:
+            # a filter saved alongside the catalogue data only describes that data
+            catalogue.membership_filter = self.load_membership_filter(name)
+        return catalogue
+
+    def stored_file_records(self, name: str):
+        """
+        Yields the file records as saved, with absolute paths, without looking at the filesystem
+        """
+        with open(self.path.joinpath(f"{name}.json"), "r") as fd:
+            data, files = load_object(fd, streamed_key="files")
+            for file_data in files:
+                yield {**file_data, "path": Path(data["path"]).joinpath(file_data["path"])}
+
+        shards_path = self.path.joinpath(f"{name}.shards")
+        for key in data.get("shards", {}):
+            with open(shards_path.joinpath(shard_filename(key)), "r") as fd:
+                _, files = load_object(fd, streamed_key="files")
+                for file_data in files:
+                    yield {
+                        **file_data,
+                        "path": Path(data["path"]).joinpath(file_data["path"]),
+                    }
+
+    def load_membership_filter(self, name: str):
+        try:
+            return BloomFilter.load(self.path.joinpath(f"{name}.bloom"))
+        except FileNotFoundError:
+            return None
+        except Exception as exception:
+            logger.warning(f'Error happen when loading "{name}" filter: {exception}')
+            return None
+
     def delete_catalogue(self, name: str):
         self.path.joinpath(f"{name}.json").unlink()
+        with suppress(FileNotFoundError):
+            self.path.joinpath(f"{name}.bloom").unlink()
+        shutil.rmtree(self.path.joinpath(f"{name}.shards"), ignore_errors=True)
+        with suppress(FileNotFoundError):
+            self.verification_state_path(name).unlink()
+        self.index.remove_catalogue(name)
 
     def save_catalogue(self, catalogue: Catalogue):
+        # the filter gets keys added as files are added or hashed, it is only built again
+        # (loading every shard) once it holds more keys than it was sized for
+        membership_filter = catalogue.membership_filter
+        if membership_filter is None or membership_filter.is_full:
+            membership_filter = catalogue.build_membership_filter()
+        modified_shards = catalogue.dirty_shards
         catalogue.save(self.path.joinpath(f"{catalogue.name}.json"))
+        membership_filter.save(self.path.joinpath(f"{catalogue.name}.bloom"))
+        self.index.update_catalogue(catalogue, shards=modified_shards)
+
+    def read_missing_metadata(self, name: str) -> int:
+        """
+        Reads the type and creation date of the catalogue files indexed without them,
+        so queries can filter on them. Returns the number of files read.
+        """
+        if not self.index.count_missing_metadata(name):
+            return 0
+        catalogue = self.load_catalogue(name, force_reload=False)
+        if not catalogue:
+            return 0
+        files_read = read_metadata(catalogue.files, f"Reading metadata of {name}")
+        self.save_catalogue(catalogue)
+        return files_read
+
+    def update_index(self):
+        """
+        Indexes catalogues saved before the content index existed
+        """
+        indexed_names = self.index.catalogue_names()
+        for name in self.list_catalogue_names():
+            if name in indexed_names:
+                continue
+            catalogue = self.load_catalogue(name, force_reload=False)
+            if catalogue:
+                self.index.update_catalogue(catalogue)
@@ -0,0 +1,146 @@
+import json
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+from enum import Enum
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+
+from .filesystem.devices import DeviceQueues
+from .filesystem.utils import get_hash
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+CHECKPOINT_SECONDS = 10
+
+
+class VerifyStatus(Enum):
+    OK = "ok"
+    MISMATCH = "mismatch"
+    MISSING = "missing"
+    HASHED = "hashed"  # saved without a hash, the computed one gets stored for next time
+
+    def __str__(self):
+        return self.value
+
+
+class VerificationState:
+    """
+    Results of a verification in progress, saved periodically so an interrupted run can resume
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        started=None,
+        results: Optional[Dict[str, str]] = None,
+        hashes: Optional[Dict[str, str]] = None,
+    ):
+        self.path = path
+        self.started = started or datetime.now(timezone.utc).isoformat()
+        self.results = results or {}
+        # hashes of files saved without one
+        self.hashes = hashes or {}
+
+    @classmethod
+    def load(cls, path: Path):
+        try:
+            with open(path, "r") as fd:
+                data = json.load(fd)
+        except FileNotFoundError:
+            return cls(path)
+        return cls(
+            path, started=data["started"], results=data["results"], hashes=data["hashes"]
+        )
+
+    def save(self):
+        temporary_path = self.path.with_suffix(".tmp")
+        with open(temporary_path, "w") as fd:
+            json.dump(
+                {"started": self.started, "results": self.results, "hashes": self.hashes},
+                fd,
+            )
+        temporary_path.replace(self.path)
+
+    def delete(self):
+        self.path.unlink(missing_ok=True)
+
+    def record(self, path: Path, status: VerifyStatus, current_hash=None):
+        self.results[str(path)] = str(status)
+        if status == VerifyStatus.HASHED:
+            self.hashes[str(path)] = current_hash
+
+    def is_verified(self, path: Path):
+        return str(path) in self.results
+
+    def paths_with(self, status: VerifyStatus):
+        return [path for path, result in self.results.items() if result == str(status)]
+
+
+def verify_file(path: Path, expected_hash: Optional[str], rate_limiter=None):
+    """
+    Returns the status and the current hash of the file
+    """
+    try:
+        current_hash = get_hash(path, chunk_size=HASH_CHUNK_SIZE, rate_limiter=rate_limiter)
+    except (FileNotFoundError, IsADirectoryError):
+        return VerifyStatus.MISSING, None
+    if expected_hash is None:
+        return VerifyStatus.HASHED, current_hash
+    if current_hash != expected_hash:
+        return VerifyStatus.MISMATCH, current_hash
+    return VerifyStatus.OK, current_hash
+
+
+def verify_records(
+    records: Iterable[dict],
+    state: VerificationState,
+    workers: int = 4,
+    rate_limiter=None,
+    on_result: Optional[Callable] = None,
+):
+    """
+    Rehashes the recorded files not verified yet on `workers` threads per device.
+    `on_result(record, status)` gets called as results arrive, the state is saved every few seconds.
+    """
+    last_checkpoint = time.monotonic()
+    in_flight = {}
+
+    def collect(done):
+        nonlocal last_checkpoint
+        for future in done:
+            record = in_flight.pop(future)
+            status, current_hash = future.result()
+            state.record(record["path"], status, current_hash)
+            if on_result:
+                on_result(record, status)
+        if time.monotonic() - last_checkpoint > CHECKPOINT_SECONDS:
+            state.save()
+            last_checkpoint = time.monotonic()
+
+    # files on different disks get rehashed at the same time
+    device_queues = DeviceQueues(workers_per_device=workers)
+    try:
+        for record in records:
+            if state.is_verified(record["path"]):
+                continue
+            # a bounded window keeps memory flat on big catalogues
+            if len(in_flight) >= workers * 4 * max(len(device_queues.devices), 1):
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            future = device_queues.submit(
+                verify_file,
+                record["path"],
+                record.get("hash"),
+                rate_limiter,
+                read_from=record["path"],
+            )
+            in_flight[future] = record
+        collect(wait(in_flight).done)
+    finally:
+        for future in in_flight:
+            future.cancel()
+        device_queues.shutdown()
+        state.save()
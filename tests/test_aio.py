@@ -0,0 +1,57 @@
+import asyncio
+import os
+from pathlib import Path
+
+from cataloguer.filesystem.aio import IOExecutor
+from cataloguer.filesystem.directory import Directory
+
+TEST_FILES_PATH = (
+    Path(os.path.dirname(os.path.realpath(__file__)))
+    .joinpath("fixtures/test-files")
+    .resolve(strict=True)
+)
+
+
+def test_aexplore_finds_same_files_as_explore():
+    directory = asyncio.run(Directory.afrom_path(TEST_FILES_PATH))
+
+    assert {file.path for file in directory.files} == {
+        file.path for file in Directory.from_path(TEST_FILES_PATH).files
+    }
+
+
+def test_adetect_duplicates():
+    async def detect():
+        async with IOExecutor(max_workers=2, max_concurrency=1) as executor:
+            directory = await Directory.afrom_path(
+                TEST_FILES_PATH.joinpath("duplicates"), executor=executor
+            )
+            return await directory.adetect_duplicates(executor=executor)
+
+    duplicates = asyncio.run(detect())
+
+    assert [sorted(file.path.name for file in files) for files in duplicates] == [
+        ["ffffffff.png", "ffffffff_with_long_name.png"]
+    ]
+
+
+def test_adetect_duplicates_with(storage_path):
+    async def detect():
+        directory = await Directory.afrom_path(TEST_FILES_PATH.joinpath("duplicates"))
+        other = await Directory.afrom_path(TEST_FILES_PATH.joinpath("different_files"))
+        return await directory.adetect_duplicates_with(other.files)
+
+    duplicates = asyncio.run(detect())
+
+    assert len(duplicates) == 1
+    assert len(duplicates[0]) == 3
+
+
+def test_aclone_file(storage_path, text_file):
+    new_path = storage_path.joinpath("text.txt")
+
+    new_file = asyncio.run(text_file.aclone_file(new_path))
+
+    assert new_path.exists()
+    assert new_file.path == new_path
+    assert asyncio.run(new_file.ahash()) == text_file.hash
@@ -0,0 +1,162 @@
+import shutil
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from cataloguer.cli import cli, Context, GlobalSettings, Storage
+from cataloguer.console.events import OutputFormat
+from cataloguer.filesystem.archive import Archive, is_archive
+from cataloguer.filesystem.utils import get_hash
+
+FIXTURES_PATH = Path(__file__).parent.joinpath("fixtures/test-files").resolve()
+
+
+@pytest.fixture(params=["zip", "tar.gz"])
+def archive_path(request, tmp_path):
+    src_path = tmp_path.joinpath("src")
+    shutil.copytree(FIXTURES_PATH.joinpath("different_files"), src_path)
+    src_path.joinpath("sub").mkdir()
+    shutil.copy(FIXTURES_PATH.joinpath("duplicates", "ffffffff.png"), src_path.joinpath("sub"))
+
+    path = tmp_path.joinpath(f"backup.{request.param}")
+    if request.param == "zip":
+        with zipfile.ZipFile(path, "w") as archive:
+            for file_path in sorted(src_path.rglob("*")):
+                archive.write(file_path, file_path.relative_to(src_path))
+    else:
+        with tarfile.open(path, "w:gz") as archive:
+            archive.add(src_path, arcname="")
+    return path
+
+
+def test_is_archive(archive_path):
+    assert is_archive(archive_path)
+    assert not is_archive(FIXTURES_PATH.joinpath("different_files", "000000ff.jpg"))
+
+
+def test_archive_members_are_scanned(archive_path):
+    archive = Archive.from_path(archive_path)
+
+    files = {str(file.path.relative_to(archive.path)): file for file in archive.files}
+    assert sorted(files) == [
+        "00000000.png",
+        "000000ff.jpg",
+        "000000ff.png",
+        "ffffffff.jpg",
+        "ffffffff.png",
+        "sub/ffffffff.png",
+    ]
+    original_path = FIXTURES_PATH.joinpath("different_files", "000000ff.jpg")
+    member = files["000000ff.jpg"]
+    assert member.hash == get_hash(original_path)
+    assert member.short_hash == get_hash(original_path, first_chunk_only=True)
+    assert member.get_type() == ("image", "jpeg")
+    assert member.is_media_type()
+    assert len(archive.detect_duplicates()) == 1
+
+
+def test_copy_from_archive(archive_path, tmp_path, monkeypatch, storage_path):
+    monkeypatch.setenv("CATALOGUER_STORAGE_LOCATION", str(storage_path))
+    dst_path = tmp_path.joinpath("dst")
+    dst_path.mkdir()
+    # already in the destination, it should not be written again
+    existing_path = dst_path.joinpath("existing.jpg")
+    shutil.copy(FIXTURES_PATH.joinpath("different_files", "000000ff.jpg"), existing_path)
+    global_settings = GlobalSettings(format_pattern="{relative_path}/{file}")
+    context = Context(
+        global_settings=global_settings,
+        storage=Storage(path=global_settings.storage_location),
+        workdir=Path.cwd(),
+        verbose=False,
+        interactive=False,
+        output=OutputFormat.NDJSON,
+    )
+
+    result = CliRunner().invoke(
+        cli, args=("copy", str(archive_path), str(dst_path)), obj=context
+    )
+
+    assert result.exit_code == 0, result.output
+    copied = sorted(str(path.relative_to(dst_path)) for path in dst_path.rglob("*.*"))
+    assert copied == [
+        "00000000.png",
+        "000000ff.png",
+        "existing.jpg",
+        "ffffffff.jpg",
+        "ffffffff.png",
+    ]
+    assert dst_path.joinpath("ffffffff.png").read_bytes() == FIXTURES_PATH.joinpath(
+        "different_files", "ffffffff.png"
+    ).read_bytes()
+
+    result = CliRunner().invoke(
+        cli, args=("move", str(archive_path), str(dst_path)), obj=context
+    )
+    assert result.exit_code != 0
+    assert "can only be copied" in result.output
+
+
+def test_archive_members_are_extracted_in_one_pass(archive_path, tmp_path, monkeypatch):
+    archive = Archive.from_path(archive_path)
+    # members are not looked up one by one, which seeks back through compressed archives
+    monkeypatch.setattr(archive.reader, "open", None)
+    dst_path = tmp_path.joinpath("dst")
+    dst_path.mkdir()
+    transfers = [
+        (member, dst_path.joinpath(f"{index}-{member.path.name}"))
+        for index, member in enumerate(archive.files)
+    ]
+
+    extracted = list(archive.extract(reversed(transfers)))
+
+    assert [member for member, _ in extracted] == list(archive.files)
+    for member, extracted_file in extracted:
+        assert extracted_file.path.is_file()
+        assert get_hash(extracted_file.path) == member.hash
+        assert extracted_file.path.stat().st_mtime == member.modified
+
+
+def test_archive_members_are_looked_up_by_offset(archive_path, tmp_path, mocker):
+    archive = Archive.from_path(archive_path)
+    # every member is known after exploring, the archive is not listed again per member
+    reader = archive.reader._zip or archive.reader._tar
+    mocker.patch.object(reader, "getmembers" if archive.reader._tar else "infolist")
+
+    for index, member in enumerate(archive.files):
+        copied_file = member.clone_file(tmp_path.joinpath(f"{index}-{member.path.name}"))
+        assert get_hash(copied_file.path) == member.hash
+
+
+def test_copy_from_archive_to_taken_destination(tmp_path, monkeypatch, storage_path):
+    monkeypatch.setenv("CATALOGUER_STORAGE_LOCATION", str(storage_path))
+    archive_path = tmp_path.joinpath("backup.zip")
+    with zipfile.ZipFile(archive_path, "w") as archive:
+        archive.write(FIXTURES_PATH.joinpath("different_files", "000000ff.png"), "a.png")
+    dst_path = tmp_path.joinpath("dst")
+    dst_path.mkdir()
+    taken_path = dst_path.joinpath("a.png")
+    shutil.copy(FIXTURES_PATH.joinpath("different_files", "ffffffff.png"), taken_path)
+    global_settings = GlobalSettings(format_pattern="{file}")
+    context = Context(
+        global_settings=global_settings,
+        storage=Storage(path=global_settings.storage_location),
+        workdir=Path.cwd(),
+        verbose=False,
+        interactive=False,
+        output=OutputFormat.NDJSON,
+    )
+
+    result = CliRunner().invoke(
+        cli, args=("copy", str(archive_path), str(dst_path)), obj=context
+    )
+
+    assert result.exit_code == 0, result.output
+    assert taken_path.read_bytes() == FIXTURES_PATH.joinpath(
+        "different_files", "ffffffff.png"
+    ).read_bytes()
+    assert dst_path.joinpath("a_1.png").read_bytes() == FIXTURES_PATH.joinpath(
+        "different_files", "000000ff.png"
+    ).read_bytes()
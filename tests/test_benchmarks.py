@@ -0,0 +1,51 @@
+import json
+
+from benchmarks.library import LibrarySpec, generate_library, library_files
+from benchmarks.run import run_benchmarks
+from cataloguer.filesystem.directory import Directory
+from cataloguer.filesystem.metadata import get_image_creation_date
+
+
+def test_generated_library_is_reproducible(tmp_path):
+    spec = LibrarySpec(files=60, depth=2, fanout=3, median_size=500)
+    generate_library(tmp_path.joinpath("a"), spec)
+    generate_library(tmp_path.joinpath("b"), spec)
+
+    files_a = sorted(path.relative_to(tmp_path.joinpath("a")) for path in library_files(tmp_path.joinpath("a")))
+    files_b = sorted(path.relative_to(tmp_path.joinpath("b")) for path in library_files(tmp_path.joinpath("b")))
+    assert len(files_a) == 60
+    assert files_a == files_b
+    assert all(len(path.parts) == 3 for path in files_a)
+    for path in files_a:
+        assert tmp_path.joinpath("a", path).read_bytes() == tmp_path.joinpath("b", path).read_bytes()
+
+
+def test_generated_library_content(tmp_path):
+    spec = LibrarySpec(files=200, duplicate_ratio=0.2, image_ratio=1, exif_ratio=1)
+    generate_library(tmp_path, spec)
+
+    directory = Directory.from_path(tmp_path)
+    duplicated_files = directory.detect_duplicates(media_only=True)
+    assert sum(len(group) - 1 for group in duplicated_files) > 10
+
+    image_path = next(library_files(tmp_path))
+    creation_date = get_image_creation_date(image_path)
+    assert spec.date_from <= creation_date < spec.date_to
+
+
+def test_run_benchmarks_records_results(tmp_path):
+    results_path = tmp_path.joinpath("results.jsonl")
+    for _ in range(2):
+        compared_results = run_benchmarks(
+            sizes=[20],
+            cases=["explore", "catalogue_load"],
+            library_root=tmp_path,
+            results_path=results_path,
+            spec_overrides={"depth": 1},
+        )
+
+    assert [result["case"] for result, _ in compared_results] == ["explore", "catalogue_load"]
+    assert all(previous is not None for _, previous in compared_results)
+    with open(results_path) as fd:
+        assert len([json.loads(line) for line in fd]) == 4
+
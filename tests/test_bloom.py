@@ -0,0 +1,90 @@
+from cataloguer.filesystem.bloom import BloomFilter
+from cataloguer.filesystem.directory import Catalogue
+from cataloguer.filesystem.file import File
+from cataloguer.storage import Storage
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom_filter = BloomFilter.for_capacity(1000)
+    for i in range(1000):
+        bloom_filter.add(f"key-{i}")
+
+    assert all(f"key-{i}" in bloom_filter for i in range(1000))
+    false_positives = sum(f"other-{i}" in bloom_filter for i in range(1000))
+    assert false_positives < 50
+
+
+def test_bloom_filter_serialization(storage_path):
+    bloom_filter = BloomFilter.for_capacity(10)
+    bloom_filter.add("key")
+    bloom_filter.save(storage_path.joinpath("test.bloom"))
+
+    loaded_filter = BloomFilter.load(storage_path.joinpath("test.bloom"))
+
+    assert "key" in loaded_filter
+    assert loaded_filter.bits == bloom_filter.bits
+    assert loaded_filter.capacity == 10
+
+
+def test_catalogue_membership_filter(storage_path, tmp_path, text_file):
+    storage = Storage(path=storage_path)
+    catalogue = Catalogue(name="Test", path=tmp_path, format_pattern="{file}")
+    catalogue.add_file(text_file.clone_file(catalogue.path.joinpath("text.txt")))
+    storage.save_catalogue(catalogue)
+
+    loaded_catalogue = storage.load_catalogue(catalogue.name, force_reload=False)
+
+    assert loaded_catalogue.membership_filter is not None
+    assert loaded_catalogue.might_contain(text_file)
+    assert loaded_catalogue.detect_duplicates_with([text_file], media_only=False)
+
+
+def test_catalogue_membership_filter_discards_unknown_files(storage_path, tmp_path, text_file):
+    storage = Storage(path=storage_path)
+    catalogue = Catalogue(name="Test", path=tmp_path, format_pattern="{file}")
+    storage.save_catalogue(catalogue)
+
+    loaded_catalogue = storage.load_catalogue(catalogue.name, force_reload=False)
+
+    assert not loaded_catalogue.might_contain(text_file)
+
+
+def test_bloom_filter_capacity():
+    bloom_filter = BloomFilter.for_capacity(100)
+    for i in range(100):
+        bloom_filter.add(f"key-{i}")
+        # adding a key again does not count
+        bloom_filter.add(f"key-{i}")
+
+    assert bloom_filter.count <= bloom_filter.capacity
+    assert not bloom_filter.is_full
+    for i in range(bloom_filter.capacity):
+        bloom_filter.add(f"other-{i}")
+    assert bloom_filter.is_full
+
+
+def test_catalogue_membership_filter_is_updated_without_hashing(
+    storage_path, tmp_path, monkeypatch
+):
+    storage = Storage(path=storage_path)
+    catalogue = Catalogue(name="Test", path=tmp_path, format_pattern="{file}")
+    for size in range(1, 51):
+        tmp_path.joinpath(f"{size}.txt").write_bytes(b"x" * size)
+    catalogue.explore()
+    storage.save_catalogue(catalogue)
+
+    # files of unique sizes are not read
+    assert all(file._short_hash is None for file in catalogue.files)
+
+    def rebuild():
+        raise AssertionError("The filter should not be built again")
+
+    monkeypatch.setattr(catalogue, "build_membership_filter", rebuild)
+    tmp_path.joinpath("new.txt").write_text("new file")
+    new_file = File(tmp_path.joinpath("new.txt"))
+    catalogue.add_file(new_file)
+    storage.save_catalogue(catalogue)
+
+    loaded_catalogue = storage.load_catalogue(catalogue.name, force_reload=False)
+    assert loaded_catalogue.might_contain(File(tmp_path.joinpath("new.txt")))
+    assert loaded_catalogue.detect_duplicates_with([new_file], media_only=False)
@@ -1,4 +1,10 @@
+import json
+from pathlib import Path
+
 from cataloguer.filesystem.directory import Catalogue
+from cataloguer.filesystem.file import File
+
+FIXTURES_PATH = Path(__file__).parent.joinpath("fixtures/test-files").resolve()
 
 
 def test_catalogue_serialization(catalogue, text_file):
@@ -28,3 +34,125 @@ def test_catalogue_subscribes_for_file_changes(catalogue, text_file):
     test_file.hash = "new"
 
     assert catalogue.dict()["files"][0]["hash"] == "new"
+
+
+def test_catalogue_is_saved_in_shards(storage_path, tmp_path, text_file):
+    catalogue = Catalogue(name="Test", path=tmp_path, format_pattern="{file}")
+    tmp_path.joinpath("2023").mkdir()
+    tmp_path.joinpath("2024").mkdir()
+    catalogue.add_file(text_file.clone_file(tmp_path.joinpath("2023/text.txt")))
+    catalogue.add_file(text_file.clone_file(tmp_path.joinpath("2024/text.txt")))
+    catalogue.add_file(text_file.clone_file(tmp_path.joinpath("text.txt")))
+
+    catalogue.save(storage_path.joinpath("Test.json"))
+
+    assert sorted(
+        path.name for path in storage_path.joinpath("Test.shards").iterdir()
+    ) == ["%2E.json", "2023.json", "2024.json"]
+
+
+def test_catalogue_loads_shards_lazily(storage_path, tmp_path, text_file):
+    catalogue = Catalogue(name="Test", path=tmp_path, format_pattern="{file}")
+    tmp_path.joinpath("2023").mkdir()
+    tmp_path.joinpath("2024").mkdir()
+    catalogue.add_file(text_file.clone_file(tmp_path.joinpath("2023/text.txt")))
+    catalogue.add_file(text_file.clone_file(tmp_path.joinpath("2024/text.txt")))
+    catalogue.save(storage_path.joinpath("Test.json"))
+
+    with open(storage_path.joinpath("Test.json")) as fd:
+        loaded_catalogue = Catalogue.parse_obj(
+            json.load(fd), shards_path=storage_path.joinpath("Test.shards")
+        )
+    sub_directory = loaded_catalogue.sub_directory(tmp_path.joinpath("2024"))
+
+    assert [file.path for file in sub_directory.files] == [tmp_path.joinpath("2024/text.txt")]
+    assert loaded_catalogue._loaded_shards == {"2024"}
+    assert len(loaded_catalogue.files) == 2
+
+
+def test_catalogue_only_writes_modified_shards(storage_path, tmp_path, text_file):
+    catalogue = Catalogue(name="Test", path=tmp_path, format_pattern="{file}")
+    tmp_path.joinpath("2023").mkdir()
+    tmp_path.joinpath("2024").mkdir()
+    catalogue.add_file(text_file.clone_file(tmp_path.joinpath("2023/text.txt")))
+    catalogue.save(storage_path.joinpath("Test.json"))
+    with open(storage_path.joinpath("Test.json")) as fd:
+        loaded_catalogue = Catalogue.parse_obj(
+            json.load(fd), shards_path=storage_path.joinpath("Test.shards")
+        )
+
+    loaded_catalogue.add_file(text_file.clone_file(tmp_path.joinpath("2024/text.txt")))
+
+    assert loaded_catalogue.dirty_shards == {"2024"}
+    loaded_catalogue.save(storage_path.joinpath("Test.json"))
+    assert loaded_catalogue._loaded_shards == {"2024"}
+    with open(storage_path.joinpath("Test.json")) as fd:
+        assert json.load(fd)["shards"] == {"2023": 1, "2024": 1}
+
+
+def test_catalogue_stats_are_kept_up_to_date(storage_path, tmp_path, text_file):
+    catalogue = Catalogue(name="Test", path=tmp_path, format_pattern="{file}")
+    tmp_path.joinpath("2023").mkdir()
+    image_path = FIXTURES_PATH.joinpath("different_files", "000000ff.png")
+    image = File(image_path).clone_file(tmp_path.joinpath("2023/image.png"))
+    catalogue.add_file(image)
+    catalogue.add_file(text_file.clone_file(tmp_path.joinpath("text.txt")))
+    # not read yet
+    assert catalogue.summarise() is None
+
+    catalogue.detect_duplicates()
+    for file in catalogue.files:
+        file.get_type()
+        file.get_creation_date()
+    media_types, months = catalogue.summarise()
+    assert media_types == {
+        "image": {"files": 1, "size": image.size, "duplicates": 0}
+    }
+    assert months == {"unknown": 1}
+
+    tmp_path.joinpath("2024").mkdir()
+    image.move_file(tmp_path.joinpath("2024/image.png"))
+    catalogue.save(storage_path.joinpath("Test.json"))
+    with open(storage_path.joinpath("Test.json")) as fd:
+        loaded_catalogue = Catalogue.parse_obj(
+            json.load(fd), shards_path=storage_path.joinpath("Test.shards")
+        )
+
+    assert loaded_catalogue.summarise() == (media_types, months)
+    assert not loaded_catalogue.is_fully_loaded
+    assert loaded_catalogue.stats.shards["2024"].files == {"image": 1}
+    assert "2023" not in loaded_catalogue.stats.shards
+
+    # a copy of the image makes the duplicates unknown until detected again
+    copy_path = tmp_path.joinpath("2024/image copy.png")
+    loaded_catalogue.ensure_loaded([copy_path])
+    loaded_catalogue.add_file(image.clone_file(copy_path))
+    assert loaded_catalogue.summarise() is None
+    loaded_catalogue.detect_duplicates()
+    assert loaded_catalogue.summarise()[0]["image"] == {
+        "files": 2,
+        "size": 2 * image.size,
+        "duplicates": 1,
+    }
+
+
+def test_catalogue_exclude_rules(storage_path, tmp_path, text_file):
+    catalogue = Catalogue(
+        name="Test", path=tmp_path, format_pattern="{file}", exclude=["*.xmp"]
+    )
+    tmp_path.joinpath("2023", ".thumbnails").mkdir(parents=True)
+    text_file.clone_file(tmp_path.joinpath("2023/text.txt"))
+    text_file.clone_file(tmp_path.joinpath("2023/text.xmp"))
+    text_file.clone_file(tmp_path.joinpath("2023/.thumbnails/text.txt"))
+    catalogue.explore()
+    catalogue.save(storage_path.joinpath("Test.json"))
+
+    with open(storage_path.joinpath("Test.json")) as fd:
+        loaded_catalogue = Catalogue.parse_obj(
+            json.load(fd), shards_path=storage_path.joinpath("Test.shards")
+        )
+
+    assert loaded_catalogue.exclude == ("*.xmp",)
+    assert [file.path.name for file in loaded_catalogue.files] == ["text.txt"]
+    # the shard matches what gets walked, it is not explored again
+    assert not loaded_catalogue.dirty_shards
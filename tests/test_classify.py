@@ -0,0 +1,61 @@
+from pathlib import Path
+
+from cataloguer.filesystem.classify import MetadataReader
+from cataloguer.filesystem.file import NOT_READ, File
+
+FIXTURES_PATH = Path(__file__).parent.joinpath("fixtures/test-files").resolve()
+
+
+def fixture_files():
+    return [File(path) for path in sorted(FIXTURES_PATH.rglob("*.*"))]
+
+
+def test_metadata_is_read_on_worker_processes():
+    expected = [(file.get_type(), file.get_creation_date()) for file in fixture_files()]
+    files = fixture_files()
+    reader = MetadataReader(workers=2, batch_size=2, min_files=0)
+    read_files = []
+
+    try:
+        assert reader.read(files, on_read=read_files.append) == len(files)
+    finally:
+        reader.shutdown()
+
+    assert read_files == files
+    assert [(file.get_type(), file._creation_date) for file in files] == expected
+
+
+def test_metadata_reader_skips_files_already_read(mocker):
+    files = fixture_files()
+    files[0].get_type()
+    read_batch = mocker.patch("cataloguer.filesystem.classify._read_batch")
+
+    # too few files for worker processes
+    assert MetadataReader(workers=2).read(files, creation_dates=False) == len(files) - 1
+    read_batch.assert_not_called()
+    assert all(file._mimetype for file in files)
+    assert all(file._creation_date is NOT_READ for file in files)
+
+
+def test_unreadable_files_are_left_unread(tmp_path):
+    missing = File(tmp_path.joinpath("missing.jpg"), size=1)
+    reader = MetadataReader(workers=2, min_files=0)
+
+    try:
+        reader.read([missing])
+    finally:
+        reader.shutdown()
+
+    assert missing._mimetype is None
+
+
+def test_files_are_read_here_when_workers_stop(mocker):
+    from concurrent.futures.process import BrokenProcessPool
+
+    files = fixture_files()
+    reader = MetadataReader(workers=2, min_files=0)
+    executor = mocker.patch.object(reader, "_get_executor").return_value
+    executor.map.side_effect = BrokenProcessPool("killed")
+
+    assert reader.read(files, creation_dates=False) == len(files)
+    assert all(file._mimetype for file in files)
@@ -1,4 +1,6 @@
+import json
 import os
+import shutil
 import tempfile
 from pathlib import Path
 
@@ -6,6 +8,7 @@ import pytest
 from click.testing import CliRunner
 
 from cataloguer.cli import cli, Context, GlobalSettings, Storage
+from cataloguer.console.events import OutputFormat
 
 FIXTURES_PATH = (
     Path(os.path.dirname(os.path.realpath(__file__)))
@@ -28,7 +31,7 @@ def cli_runner(monkeypatch, storage_path):
         yield runner
 
 
-def invoke(args, runner):
+def invoke(args, runner, output=OutputFormat.RICH):
     global_settings = GlobalSettings()
     context = Context(
         global_settings=global_settings,
@@ -36,6 +39,7 @@ def invoke(args, runner):
         workdir=Path.cwd(),
         verbose=False,
         interactive=False,
+        output=output,
     )
     return runner.invoke(args=args, cli=cli, obj=context)
 
@@ -97,6 +101,96 @@ def test_copy_files_without_duplicates(monkeypatch, cli_runner, test_catalogue_p
     assert "Detected 0 files" in result.stdout
 
 
+def test_move_renames_into_created_directories(
+    monkeypatch, mocker, cli_runner, test_catalogue_path, tmp_path
+):
+    monkeypatch.setenv("CATALOGUER_FORMAT_PATTERN", "{media_type}/{media_format}/{file}")
+    src_path = tmp_path.joinpath("src")
+    shutil.copytree(FIXTURES_PATH.joinpath("different_files"), src_path)
+    move_file = mocker.patch("cataloguer.filesystem.devices.move_file")
+
+    result = invoke(
+        args=("move", str(src_path), str(test_catalogue_path)), runner=cli_runner
+    )
+
+    assert result.exit_code == 0, result.output
+    # same filesystem, nothing gets copied
+    move_file.assert_not_called()
+    assert not list(src_path.iterdir())
+    assert sorted(
+        str(path.relative_to(test_catalogue_path))
+        for path in test_catalogue_path.rglob("*.*")
+    ) == [
+        "image/jpeg/000000ff.jpg",
+        "image/jpeg/ffffffff.jpg",
+        "image/png/00000000.png",
+        "image/png/000000ff.png",
+        "image/png/ffffffff.png",
+    ]
+
+
+def test_copy_to_taken_path_gets_a_new_name(monkeypatch, cli_runner, test_catalogue_path):
+    monkeypatch.setenv("CATALOGUER_FORMAT_PATTERN", "{file}")
+    taken_path = test_catalogue_path.joinpath("000000ff.png")
+    shutil.copy(FIXTURES_PATH.joinpath("different_files", "ffffffff.png"), taken_path)
+
+    result = invoke(
+        args=("copy", str(FIXTURES_PATH.joinpath("different_files")), str(test_catalogue_path)),
+        runner=cli_runner,
+    )
+
+    assert result.exit_code == 0, result.output
+    assert taken_path.read_bytes() == FIXTURES_PATH.joinpath(
+        "different_files", "ffffffff.png"
+    ).read_bytes()
+    assert test_catalogue_path.joinpath("000000ff_1.png").read_bytes() == FIXTURES_PATH.joinpath(
+        "different_files", "000000ff.png"
+    ).read_bytes()
+
+
+def test_failed_transfers_are_reported_and_completed_ones_saved(
+    monkeypatch, mocker, cli_runner, storage_path, test_catalogue_path, tmp_path
+):
+    monkeypatch.setenv("CATALOGUER_FORMAT_PATTERN", "{file}")
+    src_path = tmp_path.joinpath("src")
+    shutil.copytree(FIXTURES_PATH.joinpath("different_files"), src_path)
+    result = invoke(
+        args=("create-catalogue", "test_catalogue", str(test_catalogue_path)),
+        runner=cli_runner,
+    )
+    assert result.exit_code == 0, result.output
+    rename = os.rename
+
+    def failing_rename(src, dst):
+        if Path(src).name == "000000ff.png":
+            raise PermissionError("Permission denied")
+        rename(src, dst)
+
+    mocker.patch("cataloguer.filesystem.devices.os.rename", side_effect=failing_rename)
+
+    result = invoke(
+        args=("move", str(src_path), "test_catalogue"),
+        runner=cli_runner,
+        output=OutputFormat.NDJSON,
+    )
+
+    assert result.exit_code != 0
+    events = [json.loads(line) for line in result.stdout.splitlines() if line.startswith("{")]
+    [failed] = [event for event in events if event["event"] == "failed"]
+    assert failed["path"] == str(src_path.joinpath("000000ff.png"))
+    assert failed["reason"] == "Permission denied"
+    assert "1 files could not be transferred" in result.output
+    # the other moves are in the saved catalogue
+    records = Storage(path=storage_path).stored_file_records("test_catalogue")
+    assert sorted(record["path"].name for record in records) == [
+        "00000000.png",
+        "000000ff.jpg",
+        "ffffffff.jpg",
+        "ffffffff.png",
+    ]
+    assert [path.name for path in src_path.iterdir()] == ["000000ff.png"]
+
+
 def test_delete_duplicates(cli_runner, test_catalogue_path):
     # Only one copy of the same file should be imported
     result = invoke(
@@ -124,3 +218,277 @@ def test_delete_duplicates_across_directories(cli_runner, test_catalogue_path):
     )
     assert result.exit_code == 0, result.output
     assert "Detected 1 file" in result.stdout
+
+
+def test_delete_duplicates_reports_hardlinks(cli_runner, test_catalogue_path):
+    original_path = test_catalogue_path.joinpath("ffffffff.png")
+    original_path.write_bytes(FIXTURES_PATH.joinpath("duplicates", "ffffffff.png").read_bytes())
+    os.link(original_path, test_catalogue_path.joinpath("ffffffff_link.png"))
+
+    result = invoke(
+        args=("delete-duplicates", str(test_catalogue_path), "--dry-run"),
+        runner=cli_runner,
+        output=OutputFormat.NDJSON,
+    )
+
+    assert result.exit_code == 0, result.output
+    events = [json.loads(line) for line in result.stdout.splitlines()]
+    hardlinks = [event for event in events if event["event"] == "hardlink"]
+    assert hardlinks == [
+        {
+            "event": "hardlink",
+            "path": str(test_catalogue_path.joinpath("ffffffff_link.png")),
+            "linked_to": str(original_path),
+        }
+    ]
+
+
+def test_delete_duplicates_reports_hardlinks_into_catalogue(cli_runner, test_catalogue_path, tmp_path):
+    src_path = tmp_path.joinpath("src")
+    src_path.mkdir()
+    original_path = src_path.joinpath("ffffffff.png")
+    original_path.write_bytes(FIXTURES_PATH.joinpath("duplicates", "ffffffff.png").read_bytes())
+    os.link(original_path, test_catalogue_path.joinpath("ffffffff_link.png"))
+    result = invoke(
+        args=("create-catalogue", "--format-pattern", "{file}", "test_catalogue", str(test_catalogue_path)),
+        runner=cli_runner,
+    )
+    assert result.exit_code == 0, result.output
+
+    result = invoke(
+        args=("delete-duplicates", str(src_path), "test_catalogue", "--dry-run"),
+        runner=cli_runner,
+        output=OutputFormat.NDJSON,
+    )
+
+    assert result.exit_code == 0, result.output
+    events = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [event for event in events if event["event"] == "hardlink"] == [
+        {
+            "event": "hardlink",
+            "path": str(test_catalogue_path.joinpath("ffffffff_link.png")),
+            "linked_to": str(original_path),
+        }
+    ]
+
+
+def test_find_similar(cli_runner, test_catalogue_path):
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", (400, 300), (20, 120, 200))
+    ImageDraw.Draw(image).ellipse((50, 40, 250, 220), fill=(240, 200, 10))
+    image.save(test_catalogue_path.joinpath("photo.jpg"))
+    image.resize((200, 150)).save(test_catalogue_path.joinpath("photo_small.jpg"))
+    Image.new("RGB", (400, 300), (0, 0, 0)).save(test_catalogue_path.joinpath("dark.png"))
+
+    result = invoke(
+        args=("find-similar", str(test_catalogue_path)),
+        runner=cli_runner,
+        output=OutputFormat.NDJSON,
+    )
+
+    assert result.exit_code == 0, result.output
+    events = [json.loads(line) for line in result.stdout.splitlines()]
+    assert [sorted(Path(path).name for path in event["paths"]) for event in events[:-1]] == [
+        ["photo.jpg", "photo_small.jpg"]
+    ]
+    assert events[-1] == {"event": "summary", "images": 3, "similar": 1}
+
+
+def test_locate(cli_runner, test_catalogue_path):
+    result = invoke(
+        args=("create-catalogue", "--format-pattern", "{file}", "test_catalogue", str(test_catalogue_path)),
+        runner=cli_runner,
+    )
+    assert result.exit_code == 0, result.output
+    result = invoke(
+        args=("copy", str(FIXTURES_PATH.joinpath("different_files")), "test_catalogue"),
+        runner=cli_runner,
+    )
+    assert result.exit_code == 0, result.output
+
+    result = invoke(
+        args=("locate", str(FIXTURES_PATH.joinpath("duplicates"))), runner=cli_runner
+    )
+    assert result.exit_code == 0, result.output
+    assert "2 of 2 files are already catalogued" in result.stdout
+
+
+def test_query(cli_runner, test_catalogue_path):
+    result = invoke(
+        args=("create-catalogue", "--format-pattern", "{file}", "test_catalogue", str(test_catalogue_path)),
+        runner=cli_runner,
+    )
+    assert result.exit_code == 0, result.output
+    result = invoke(
+        args=("copy", str(FIXTURES_PATH.joinpath("different_files")), "test_catalogue"),
+        runner=cli_runner,
+    )
+    assert result.exit_code == 0, result.output
+
+    result = invoke(
+        args=("query", "test_catalogue", "--type", "image", "--extension", "png"),
+        runner=cli_runner,
+        output=OutputFormat.NDJSON,
+    )
+
+    assert result.exit_code == 0, result.output
+    events = [json.loads(line) for line in result.stdout.splitlines()]
+    assert sorted(Path(event["path"]).name for event in events[:-1]) == [
+        "00000000.png",
+        "000000ff.png",
+        "ffffffff.png",
+    ]
+    assert {event["mimetype"] for event in events[:-1]} == {"image/png"}
+    assert events[-1] == {"event": "summary", "files": 3}
+
+    result = invoke(args=("query", "missing_catalogue"), runner=cli_runner)
+    assert result.exit_code != 0
+
+
+def test_inspect_catalogue_uses_stats(cli_runner, test_catalogue_path):
+    result = invoke(
+        args=("create-catalogue", "--format-pattern", "{file}", "test_catalogue", str(test_catalogue_path)),
+        runner=cli_runner,
+    )
+    assert result.exit_code == 0, result.output
+    result = invoke(
+        args=("copy", str(FIXTURES_PATH.joinpath("different_files")), "test_catalogue"),
+        runner=cli_runner,
+    )
+    assert result.exit_code == 0, result.output
+
+    def inspect(*args):
+        result = invoke(
+            args=("inspect", "test_catalogue", *args),
+            runner=cli_runner,
+            output=OutputFormat.NDJSON,
+        )
+        assert result.exit_code == 0, result.output
+        return json.loads(result.stdout.splitlines()[-1])
+
+    summary = inspect()
+    assert summary["files"] == 5
+    assert summary["months"] == {"unknown": 5}
+    # files removed behind the catalogue back change the shard file count
+    test_catalogue_path.joinpath("00000000.png").unlink()
+    assert inspect()["files"] == 4
+    assert inspect()["media_types"]["image"]["files"] == 4
+    assert inspect("--rescan")["files"] == 4
+
+
+def test_inspect_catalogue_only_lists_its_root(mocker, cli_runner, test_catalogue_path):
+    result = invoke(
+        args=("create-catalogue", "--format-pattern", "{media_type}/{media_format}/{file}", "test_catalogue", str(test_catalogue_path)),
+        runner=cli_runner,
+    )
+    assert result.exit_code == 0, result.output
+    result = invoke(
+        args=("copy", str(FIXTURES_PATH.joinpath("different_files")), "test_catalogue"),
+        runner=cli_runner,
+    )
+    assert result.exit_code == 0, result.output
+
+    def inspect(*args):
+        result = invoke(
+            args=("inspect", "test_catalogue", *args),
+            runner=cli_runner,
+            output=OutputFormat.NDJSON,
+        )
+        assert result.exit_code == 0, result.output
+        return json.loads(result.stdout.splitlines()[-1])
+
+    assert inspect()["files"] == 5
+    count_files = mocker.patch(
+        "cataloguer.filesystem.rules.WalkRules.count_files", side_effect=AssertionError
+    )
+    test_catalogue_path.joinpath("image", "png", "00000000.png").unlink()
+    # changes inside a top level directory are left to a full check
+    assert inspect()["files"] == 5
+    count_files.assert_not_called()
+
+    mocker.stopall()
+    assert inspect("--rescan")["files"] == 4
+
+
+def test_inspect_catalogue_sub_path(cli_runner, test_catalogue_path):
+    result = invoke(
+        args=("create-catalogue", "--format-pattern", "{media_type}/{file}", "test_catalogue", str(test_catalogue_path)),
+        runner=cli_runner,
+    )
+    assert result.exit_code == 0, result.output
+    result = invoke(
+        args=("copy", str(FIXTURES_PATH.joinpath("different_files")), "test_catalogue"),
+        runner=cli_runner,
+    )
+    assert result.exit_code == 0, result.output
+
+    result = invoke(args=("inspect", "test_catalogue/image"), runner=cli_runner)
+    assert result.exit_code == 0, result.output
+    assert f"test_catalogue : {test_catalogue_path.joinpath('image')}" in result.stdout
+
+
+def test_ndjson_output(monkeypatch, cli_runner, test_catalogue_path):
+    monkeypatch.setenv("CATALOGUER_FORMAT_PATTERN", "{file}")
+
+    result = invoke(
+        args=("copy", str(FIXTURES_PATH.joinpath("duplicates")), str(test_catalogue_path)),
+        runner=cli_runner,
+        output=OutputFormat.NDJSON,
+    )
+    assert result.exit_code == 0, result.output
+    events = [json.loads(line) for line in result.stdout.splitlines()]
+
+    assert [event["event"] for event in events] == ["duplicates", "detected", "copy", "summary"]
+    assert events[2]["dst"] == str(test_catalogue_path.joinpath("ffffffff.png"))
+    assert events[-1]["processed"] == 1
+
+
+def test_ndjson_output_inspect(cli_runner):
+    result = invoke(
+        args=("inspect", str(FIXTURES_PATH.joinpath("duplicates"))),
+        runner=cli_runner,
+        output=OutputFormat.NDJSON,
+    )
+    assert result.exit_code == 0, result.output
+    events = [json.loads(line) for line in result.stdout.splitlines()]
+
+    assert [event["event"] for event in events] == ["duplicates", "summary"]
+    assert events[-1]["media_types"] == {"image": {"files": 2, "size": 136, "duplicates": 1}}
+
+
+def test_profile_report(monkeypatch, cli_runner, test_catalogue_path):
+    monkeypatch.setenv("CATALOGUER_FORMAT_PATTERN", "{file}")
+    result = invoke(
+        args=("create-catalogue", "test_catalogue", str(test_catalogue_path)),
+        runner=cli_runner,
+    )
+    assert result.exit_code == 0, result.output
+
+    result = invoke(
+        args=(
+            "--profile-report",
+            "profile.json",
+            "copy",
+            str(FIXTURES_PATH.joinpath("duplicates")),
+            "test_catalogue",
+        ),
+        runner=cli_runner,
+    )
+    assert result.exit_code == 0, result.output
+    assert "Profile" in result.stdout
+
+    with open("profile.json") as fd:
+        report = json.load(fd)
+    stages = report["stages"]
+    assert stages["copy"]["calls"] == 1
+    assert stages["copy"]["bytes_written"] == 68
+    assert stages["catalogue save"]["bytes_written"] > 0
+    assert {"walk", "mimetype", "short hash"} <= set(stages)
+
+
+def test_heavy_dependencies_are_imported_lazily():
+    from benchmarks.startup import imported_heavy_modules
+
+    assert imported_heavy_modules("import cataloguer.cli") == []
+    assert imported_heavy_modules("from cataloguer.cli import Context") == ["pydantic"]
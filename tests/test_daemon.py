@@ -0,0 +1,152 @@
+import json
+import threading
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from cataloguer.cli import cli
+from cataloguer.console.events import OutputFormat
+from cataloguer.context import Context
+from cataloguer.daemon import CatalogueDaemon, DaemonClient, DaemonError, create_server
+from cataloguer.filesystem.directory import Catalogue
+from cataloguer.settings import GlobalSettings
+from cataloguer.storage import Storage
+
+FIXTURES_PATH = Path(__file__).parent.joinpath("fixtures/test-files").resolve(strict=True)
+
+
+@pytest.fixture
+def context(monkeypatch, storage_path):
+    monkeypatch.setenv("CATALOGUER_STORAGE_LOCATION", str(storage_path))
+    global_settings = GlobalSettings()
+    return Context(
+        global_settings=global_settings,
+        storage=Storage(path=global_settings.storage_location),
+        workdir=Path.cwd(),
+        verbose=False,
+        interactive=False,
+        output=OutputFormat.NDJSON,
+    )
+
+
+@pytest.fixture
+def catalogue_path(tmp_path, context):
+    path = tmp_path.joinpath("catalogue")
+    path.mkdir()
+    catalogue = Catalogue(name="photos", path=path, format_pattern="{file}")
+    catalogue.explore()
+    context.storage.save_catalogue(catalogue)
+    return path
+
+
+@pytest.fixture
+def client(context):
+    server = create_server(context, context.global_settings.socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield DaemonClient(context.global_settings.socket_path, timeout=10)
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_daemon_import_and_inspect(client, catalogue_path):
+    assert client.is_running()
+
+    events = client.request(
+        "import", name="photos", path=FIXTURES_PATH.joinpath("duplicates/ffffffff.png")
+    )
+    assert [event["event"] for event in events] == ["detected", "copy"]
+    assert events[-1]["dst"] == str(catalogue_path.joinpath("ffffffff.png"))
+    assert catalogue_path.joinpath("ffffffff.png").exists()
+
+    # the catalogue stays loaded, so the same content is now a duplicate
+    events = client.request(
+        "import",
+        name="photos",
+        path=FIXTURES_PATH.joinpath("duplicates/ffffffff_with_long_name.png"),
+    )
+    assert [event["event"] for event in events] == ["duplicates", "detected"]
+    assert events[-1]["files"] == 0
+
+    result = client.request("inspect", name="photos")
+    assert result["files"] == 1
+    assert client.request("ping")["catalogues"] == ["photos"]
+
+
+def test_ping_answers_during_long_requests(client, mocker):
+    started, finish = threading.Event(), threading.Event()
+
+    def long_request():
+        started.set()
+        finish.wait(30)
+        return {}
+
+    mocker.patch.object(CatalogueDaemon, "op_reload", side_effect=long_request)
+    thread = threading.Thread(target=client.request, args=("reload",))
+    thread.start()
+    try:
+        assert started.wait(10)
+        assert client.is_running()
+    finally:
+        finish.set()
+        thread.join()
+
+
+def test_daemon_errors(client, catalogue_path):
+    with pytest.raises(DaemonError, match="not found"):
+        client.request("inspect", name="unknown")
+    with pytest.raises(DaemonError, match="Unknown command"):
+        client.request("unknown")
+
+
+def test_create_server_refuses_second_daemon(client, context):
+    with pytest.raises(DaemonError, match="already listening"):
+        create_server(context, context.global_settings.socket_path)
+
+
+def test_cli_uses_running_daemon(client, context, catalogue_path):
+    result = CliRunner().invoke(
+        cli,
+        args=("copy", str(FIXTURES_PATH.joinpath("different_files/00000000.png")), "photos"),
+        obj=context,
+    )
+    assert result.exit_code == 0, result.output
+    events = [json.loads(line) for line in result.stdout.splitlines()]
+
+    assert [event["event"] for event in events] == ["detected", "copy", "summary"]
+    assert client.request("ping")["catalogues"] == ["photos"]
+    assert catalogue_path.joinpath("00000000.png").exists()
+
+    result = CliRunner().invoke(cli, args=("inspect", "photos"), obj=context)
+    assert result.exit_code == 0, result.output
+    events = [json.loads(line) for line in result.stdout.splitlines()]
+    assert events[-1]["files"] == 1
+
+
+def test_daemon_reloads_catalogues_saved_elsewhere(client, context, catalogue_path):
+    result = client.request("inspect", name="photos")
+    assert result["files"] == 0
+    version = context.storage.catalogue_version("photos")
+
+    # nothing changed, so nothing is saved
+    client.request("inspect", name="photos")
+    assert context.storage.catalogue_version("photos") == version
+
+    result = CliRunner().invoke(
+        cli,
+        args=(
+            "--no-daemon",
+            "copy",
+            str(FIXTURES_PATH.joinpath("different_files")),
+            "photos",
+        ),
+        obj=context,
+    )
+    assert result.exit_code == 0, result.output
+
+    result = client.request("inspect", name="photos")
+    assert result["files"] == 5
+    catalogue = context.storage.load_catalogue("photos", force_reload=False)
+    assert len(catalogue.files) == 5
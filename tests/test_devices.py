@@ -0,0 +1,119 @@
+import errno
+import os
+import threading
+import time
+
+from cataloguer.filesystem.devices import DeviceQueues, Renamer, device_of
+
+
+def fake_devices(mocker, devices):
+    return mocker.patch(
+        "cataloguer.filesystem.devices.device_of",
+        side_effect=lambda path: devices[str(path)],
+    )
+
+
+def test_device_of_missing_path(tmp_path):
+    assert device_of(tmp_path.joinpath("not", "created", "yet.jpg")) == os.stat(tmp_path).st_dev
+
+
+def test_devices_work_in_parallel(mocker):
+    fake_devices(mocker, {"a": 1, "b": 2})
+    # only completes if both devices run at the same time, each one having a single worker
+    barrier = threading.Barrier(2, timeout=5)
+    device_queues = DeviceQueues(workers_per_device=1)
+
+    results = dict(
+        device_queues.map_unordered(
+            lambda item: barrier.wait() >= 0, ["a/1.jpg", "b/1.jpg"], path=str
+        )
+    )
+
+    assert results == {"a/1.jpg": True, "b/1.jpg": True}
+    assert sorted(device_queues.devices) == [1, 2]
+    device_queues.shutdown()
+
+
+def test_device_runs_its_items_in_order(mocker):
+    device_of = fake_devices(mocker, {"a": 1})
+    device_queues = DeviceQueues(workers_per_device=1)
+    started = []
+
+    list(device_queues.map_unordered(started.append, [f"a/{i}" for i in range(5)], path=str))
+
+    assert started == [f"a/{i}" for i in range(5)]
+    # looked up once for the directory
+    assert device_of.call_count == 1
+    device_queues.shutdown()
+
+
+def test_map_unordered_bounds_items_in_flight(mocker):
+    fake_devices(mocker, {"a": 1})
+    device_queues = DeviceQueues(workers_per_device=2)
+    submitted = []
+    submit = device_queues.submit
+
+    def counting_submit(*args, **kwargs):
+        submitted.append(args[1])
+        return submit(*args, **kwargs)
+
+    mocker.patch.object(device_queues, "submit", side_effect=counting_submit)
+    items = (f"a/{i}" for i in range(100))
+
+    yielded = 0
+    for _ in device_queues.map_unordered(lambda item: item, items, path=str, window=10):
+        yielded += 1
+        assert len(submitted) - yielded < 10
+
+    assert yielded == len(submitted) == 100
+    device_queues.shutdown()
+
+
+def test_writes_are_limited_per_device(mocker):
+    fake_devices(mocker, {"a": 1, "b": 2, "dst": 3})
+    device_queues = DeviceQueues(workers_per_device=1)
+    writing = []
+    overlaps = []
+
+    def write():
+        writing.append(True)
+        overlaps.append(len(writing))
+        time.sleep(0.05)
+        writing.pop()
+
+    futures = [
+        device_queues.submit(write, read_from=f"{source}/1.jpg", write_to="dst/1.jpg")
+        for source in ("a", "b")
+    ]
+    for future in futures:
+        future.result()
+
+    assert overlaps == [1, 1]
+    device_queues.shutdown()
+
+
+def test_renamer_renames_on_the_same_device(tmp_path, mocker):
+    src = tmp_path.joinpath("a.jpg")
+    src.write_text("a")
+    move_file = mocker.patch("cataloguer.filesystem.devices.move_file")
+
+    Renamer().move(src, tmp_path.joinpath("b.jpg"))
+
+    assert tmp_path.joinpath("b.jpg").read_text() == "a"
+    move_file.assert_not_called()
+
+
+def test_renamer_remembers_cross_device_pairs(tmp_path, mocker):
+    paths = [tmp_path.joinpath(f"{i}.jpg") for i in range(2)]
+    rename = mocker.patch(
+        "cataloguer.filesystem.devices.os.rename",
+        side_effect=OSError(errno.EXDEV, "Invalid cross-device link"),
+    )
+    move_file = mocker.patch("cataloguer.filesystem.devices.move_file")
+    renamer = Renamer()
+
+    for path in paths:
+        renamer.move(path, tmp_path.joinpath("dst", path.name))
+
+    assert rename.call_count == 1
+    assert move_file.call_count == 2
@@ -0,0 +1,69 @@
+import os
+import shutil
+from pathlib import Path
+
+from cataloguer.filesystem import file as file_module
+from cataloguer.filesystem.directory import Catalogue, Directory, hardlinked_files
+from cataloguer.storage import Storage
+
+FIXTURES_PATH = Path(__file__).parent.joinpath("fixtures/test-files").resolve()
+
+
+def create_links(path):
+    original_path = path.joinpath("photo.png")
+    shutil.copy(FIXTURES_PATH.joinpath("duplicates", "ffffffff.png"), original_path)
+    os.link(original_path, path.joinpath("photo_link.png"))
+    shutil.copy(original_path, path.joinpath("photo_copy.png"))
+
+
+def test_explore_records_inodes(tmp_path):
+    create_links(tmp_path)
+
+    files = {file.path.name: file for file in Directory.from_path(tmp_path).files}
+
+    assert files["photo.png"].inode == files["photo_link.png"].inode
+    assert files["photo.png"].is_hardlink_of(files["photo_link.png"])
+    assert not files["photo.png"].is_hardlink_of(files["photo_copy.png"])
+
+
+def test_hardlinks_are_hashed_once(tmp_path, mocker):
+    create_links(tmp_path)
+    get_hash = mocker.spy(file_module, "get_hash")
+
+    duplicates = Directory.from_path(tmp_path).detect_duplicates()
+
+    assert len(duplicates) == 1
+    assert {file.path.name for file in duplicates[0]} == {
+        "photo.png",
+        "photo_link.png",
+        "photo_copy.png",
+    }
+    # one short and one full hash for the inode with two links, same for the copy
+    assert get_hash.call_count == 4
+
+
+def test_hardlinked_files(tmp_path):
+    create_links(tmp_path)
+    files = {file.path.name: file for file in Directory.from_path(tmp_path).files}
+    duplicates = [[files["photo.png"], files["photo_link.png"], files["photo_copy.png"]]]
+
+    pairs = hardlinked_files(duplicates, [files["photo_link.png"], files["photo_copy.png"]])
+
+    assert pairs == [(files["photo_link.png"], files["photo.png"])]
+
+
+def test_catalogue_files_get_their_inodes(storage_path, tmp_path):
+    create_links(tmp_path)
+    storage = Storage(path=storage_path)
+    catalogue = Catalogue(name="Test", path=tmp_path, format_pattern="{file}")
+    catalogue.explore()
+    storage.save_catalogue(catalogue)
+
+    loaded_catalogue = storage.load_catalogue(catalogue.name, force_reload=False)
+    # inodes are not stored, they might change (e.g. removable disks)
+    assert all(file.inode is None for file in loaded_catalogue.files)
+    (duplicated_list,) = loaded_catalogue.detect_duplicates()
+
+    files = {file.path.name: file for file in duplicated_list}
+    assert files["photo.png"].is_hardlink_of(files["photo_link.png"])
+    assert not files["photo.png"].is_hardlink_of(files["photo_copy.png"])
@@ -0,0 +1,108 @@
+from datetime import datetime
+
+from cataloguer.filesystem.directory import Catalogue
+from cataloguer.filesystem.file import File
+from cataloguer.storage import Storage
+
+
+def test_index_lookup_across_catalogues(storage_path, catalogue, text_file):
+    storage = Storage(path=storage_path)
+    catalogued_file = text_file.clone_file(catalogue.path.joinpath("text.txt"))
+    catalogue.add_file(catalogued_file)
+    storage.save_catalogue(catalogue)
+
+    entries = storage.index.lookup(text_file)
+
+    assert [(entry.catalogue, entry.path) for entry in entries] == [
+        ("Test", catalogued_file.path)
+    ]
+
+
+def test_index_is_cleaned_when_deleting_catalogue(storage_path, catalogue, text_file):
+    storage = Storage(path=storage_path)
+    catalogue.add_file(text_file.clone_file(catalogue.path.joinpath("text.txt")))
+    storage.save_catalogue(catalogue)
+
+    storage.delete_catalogue(catalogue.name)
+
+    assert storage.index.lookup(text_file) == []
+    assert storage.index.catalogue_names() == set()
+
+
+def create_catalogue(path):
+    path.mkdir()
+    return Catalogue(
+        name="Media", path=path, creation_date=datetime(2021, 1, 1), format_pattern="{file}"
+    )
+
+
+def test_index_query(storage_path, tmp_path):
+    storage = Storage(path=storage_path)
+    catalogue = create_catalogue(tmp_path.joinpath("media"))
+    for name, size, mimetype, creation_date in (
+        ("2019.mp4", 2000, "video/mp4", datetime(2019, 5, 1)),
+        ("2020.MP4", 3000, "video/mp4", datetime(2020, 1, 1)),
+        ("2019.jpg", 100, "image/jpeg", datetime(2019, 6, 1)),
+        ("unknown.mp4", 4000, "video/mp4", None),
+    ):
+        path = catalogue.path.joinpath(name)
+        path.write_bytes(name.encode() * size)
+        catalogue.add_file(
+            File(
+                path,
+                size=size,
+                mimetype=mimetype,
+                creation_date=creation_date,
+            )
+        )
+    storage.save_catalogue(catalogue)
+
+    def query(**kwargs):
+        return [result.path.name for result in storage.index.query(**kwargs)]
+
+    assert query(media_type="video") == ["unknown.mp4", "2019.mp4", "2020.MP4"]
+    assert query(media_type="video", since=datetime(2019, 1, 1)) == ["2019.mp4", "2020.MP4"]
+    assert query(since=datetime(2019, 1, 1), before=datetime(2020, 1, 1)) == [
+        "2019.mp4",
+        "2019.jpg",
+    ]
+    assert query(extensions=[".mp4"], min_size=2500) == ["unknown.mp4", "2020.MP4"]
+    assert query(max_size=2000, limit=1) == ["2019.mp4"]
+    assert query(catalogue="Test") == []
+
+
+def test_index_metadata_is_read_once(storage_path, tmp_path, text_file):
+    storage = Storage(path=storage_path)
+    catalogue = create_catalogue(tmp_path.joinpath("media"))
+    catalogue.add_file(text_file.clone_file(catalogue.path.joinpath("text.txt")))
+    storage.save_catalogue(catalogue)
+    assert storage.index.count_missing_metadata(catalogue.name) == 1
+
+    assert storage.read_missing_metadata(catalogue.name) == 1
+
+    assert storage.index.count_missing_metadata(catalogue.name) == 0
+    assert storage.read_missing_metadata(catalogue.name) == 0
+    (result,) = storage.index.query(catalogue=catalogue.name)
+    assert result.mimetype == "inode/x-empty"
+
+
+def test_index_connection_is_reused(storage_path, catalogue, text_file, monkeypatch):
+    import sqlite3
+
+    storage = Storage(path=storage_path)
+    catalogue.add_file(text_file.clone_file(catalogue.path.joinpath("text.txt")))
+    storage.save_catalogue(catalogue)
+    connections = []
+    connect = sqlite3.connect
+
+    def counting_connect(*args, **kwargs):
+        connections.append(args)
+        return connect(*args, **kwargs)
+
+    monkeypatch.setattr(sqlite3, "connect", counting_connect)
+    storage.index.close()
+
+    for _ in range(3):
+        assert storage.index.lookup(text_file)
+
+    assert len(connections) == 1
@@ -0,0 +1,44 @@
+import io
+import json
+
+import pytest
+
+from cataloguer.filesystem.jsonstream import dump_object, load_object
+
+
+def test_dump_object_is_compatible_with_json():
+    fd = io.StringIO()
+
+    dump_object(
+        fd,
+        fields={"name": "test", "count": 2},
+        streamed_key="files",
+        items=iter([{"path": "a", "size": 1}, {"path": "b", "size": 22}]),
+    )
+
+    assert fd.getvalue() == json.dumps(
+        {"name": "test", "count": 2, "files": [{"path": "a", "size": 1}, {"path": "b", "size": 22}]}
+    )
+
+
+@pytest.mark.parametrize("chunk_size", (1, 3, 1024))
+def test_load_object(monkeypatch, chunk_size):
+    monkeypatch.setattr("cataloguer.filesystem.jsonstream.CHUNK_SIZE", chunk_size)
+    data = {
+        "name": 'test "quoted"',
+        "files": [{"path": "a", "size": 1}, {"path": "b", "size": 123456}],
+        "after": None,
+    }
+
+    fields, items = load_object(io.StringIO(json.dumps(data, indent=2)), streamed_key="files")
+
+    assert fields == {"name": data["name"]}
+    assert list(items) == data["files"]
+    assert fields == {"name": data["name"], "after": None}
+
+
+def test_load_object_without_streamed_key():
+    fields, items = load_object(io.StringIO('{"name": "test", "files": []}'), streamed_key="other")
+
+    assert fields == {"name": "test", "files": []}
+    assert list(items) == []
@@ -0,0 +1,116 @@
+import os
+import sys
+
+import pytest
+
+from cataloguer.filesystem.directory import Directory
+from cataloguer.filesystem.file import File
+from cataloguer.filesystem.layout import (
+    IOOrder,
+    get_io_order,
+    is_rotational,
+    physical_offset,
+    set_io_order,
+    sort_for_reading,
+)
+from cataloguer.settings import GlobalSettings
+
+
+@pytest.fixture
+def physical_order():
+    set_io_order(IOOrder.PHYSICAL)
+    yield
+    set_io_order(IOOrder.WALK)
+
+
+def create_files(path, names, content=b"same content"):
+    files = []
+    for name in names:
+        file_path = path.joinpath(name)
+        file_path.write_bytes(content)
+        files.append(File(file_path))
+    return files
+
+
+def test_settings_io_order(monkeypatch, storage_path):
+    monkeypatch.setenv("CATALOGUER_STORAGE_LOCATION", str(storage_path))
+    assert GlobalSettings().io_order == IOOrder.WALK
+
+    monkeypatch.setenv("CATALOGUER_IO_ORDER", "physical")
+    assert GlobalSettings().io_order == IOOrder.PHYSICAL
+
+
+def test_walk_order_keeps_files_in_place(tmp_path):
+    files = create_files(tmp_path, ["c.txt", "a.txt", "b.txt"])
+
+    assert get_io_order() == IOOrder.WALK
+    assert sort_for_reading(files) == files
+    assert sort_for_reading(reversed(files)) == files[::-1]
+
+
+def test_physical_order_follows_disk_layout(tmp_path, mocker):
+    files = create_files(tmp_path, ["c.txt", "a.txt", "b.txt"])
+    offsets = {"c.txt": 300, "a.txt": 100, "b.txt": None}
+    mocker.patch(
+        "cataloguer.filesystem.layout.physical_offset",
+        side_effect=lambda path: offsets[path.name],
+    )
+
+    # files with a known offset come first, the rest fall back to inode order
+    assert [file.path.name for file in sort_for_reading(files, IOOrder.PHYSICAL)] == [
+        "a.txt",
+        "c.txt",
+        "b.txt",
+    ]
+
+
+def test_physical_order_falls_back_to_inodes(tmp_path, mocker):
+    files = create_files(tmp_path, ["c.txt", "a.txt", "b.txt"])
+    mocker.patch("cataloguer.filesystem.layout.physical_offset", return_value=None)
+
+    inodes = [os.stat(file.path).st_ino for file in sort_for_reading(files, IOOrder.PHYSICAL)]
+    assert inodes == sorted(inodes)
+
+
+def test_layout_is_unknown_without_posix_calls(tmp_path, monkeypatch):
+    # e.g. on Windows, where there is no fcntl nor device numbers
+    [file] = create_files(tmp_path, ["a.txt"])
+    monkeypatch.setitem(sys.modules, "fcntl", None)
+    monkeypatch.delattr(os, "major")
+    is_rotational.cache_clear()
+
+    assert physical_offset(file.path) is None
+    assert is_rotational(os.stat(file.path).st_dev) is False
+    is_rotational.cache_clear()
+
+
+def test_auto_order_only_sorts_rotational_devices(tmp_path, mocker):
+    files = create_files(tmp_path, ["c.txt", "a.txt", "b.txt"])
+    offsets = {"c.txt": 300, "a.txt": 100, "b.txt": 200}
+    mocker.patch(
+        "cataloguer.filesystem.layout.physical_offset",
+        side_effect=lambda path: offsets[path.name],
+    )
+
+    mocker.patch("cataloguer.filesystem.layout.is_rotational", return_value=False)
+    assert sort_for_reading(files, IOOrder.AUTO) == files
+
+    mocker.patch("cataloguer.filesystem.layout.is_rotational", return_value=True)
+    assert [file.path.name for file in sort_for_reading(files, IOOrder.AUTO)] == [
+        "a.txt",
+        "b.txt",
+        "c.txt",
+    ]
+
+
+def test_physical_order_keeps_duplicate_groups(tmp_path, physical_order, mocker):
+    files = create_files(tmp_path, ["c.txt", "a.txt", "b.txt"])
+    offsets = {"c.txt": 300, "a.txt": 100, "b.txt": 200}
+    mocker.patch(
+        "cataloguer.filesystem.layout.physical_offset",
+        side_effect=lambda path: offsets[path.name],
+    )
+
+    duplicates = Directory.detect_duplicates_on_files({files[0].size: files})
+
+    assert duplicates == [files]
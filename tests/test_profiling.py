@@ -0,0 +1,52 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from cataloguer.profiling import Profiler, profiled, profiler
+
+
+def test_profiler_records_stages():
+    stage_profiler = Profiler()
+    stage_profiler.enable()
+    with stage_profiler.measure("hash") as measurement:
+        measurement.bytes_read += 10
+    with stage_profiler.measure("hash") as measurement:
+        measurement.bytes_read += 5
+    with stage_profiler.measure("copy") as measurement:
+        measurement.bytes_written = 3
+    stage_profiler.disable()
+
+    report = stage_profiler.report()
+    assert report["stages"]["hash"]["calls"] == 2
+    assert report["stages"]["hash"]["bytes_read"] == 15
+    assert report["stages"]["copy"]["bytes_written"] == 3
+    assert report["wall_time"] >= report["stages"]["hash"]["wall_time"]
+
+
+def test_profiler_disabled_records_nothing():
+    stage_profiler = Profiler()
+    with stage_profiler.measure("hash") as measurement:
+        measurement.bytes_read += 10
+
+    assert stage_profiler.stages == {}
+
+
+def test_profiled_decorator_from_threads(tmp_path):
+    @profiled("work")
+    def work(value):
+        return value * 2
+
+    profiler.reset()
+    profiler.enable()
+    try:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(work, range(100)))
+    finally:
+        profiler.disable()
+
+    assert results == [value * 2 for value in range(100)]
+    assert profiler.stages["work"].calls == 100
+
+    report_path = tmp_path.joinpath("report.json")
+    profiler.save_report(report_path)
+    assert json.loads(report_path.read_text())["stages"]["work"]["calls"] == 100
+    profiler.reset()
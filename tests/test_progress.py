@@ -0,0 +1,27 @@
+from cataloguer.console.progress import ProgressTracker
+
+
+def test_progress_tracker_stages():
+    tracker = ProgressTracker("Inspecting")
+    tracker.start_stage("short hash", total=4, total_bytes=4000)
+    tracker.advance(size=1000)
+    tracker.advance(size=1000)
+    tracker.start_stage("full hash", total=1)
+
+    assert [stage.name for stage in tracker.stages] == ["short hash", "full hash"]
+    assert tracker.stages[0].completed == 2
+    assert tracker.stages[0].completed_bytes == 2000
+    assert tracker.stages[0].end is not None
+    assert tracker.current.eta is None
+
+
+def test_progress_tracker_render():
+    tracker = ProgressTracker("Processing files")
+    tracker.start_stage("transfer", total=10, total_bytes=10000)
+    tracker.advance(size=5000)
+
+    rendered = tracker.__rich__().plain
+
+    assert rendered.startswith("Processing files transfer: 1/10 files")
+    assert "files/s" in rendered
+    assert "ETA" in rendered
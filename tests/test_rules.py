@@ -0,0 +1,74 @@
+import os
+
+from cataloguer.filesystem.directory import Directory
+from cataloguer.filesystem.rules import WalkRules, parse_patterns
+
+
+def create_tree(root, paths):
+    for path in paths:
+        path = root.joinpath(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("")
+
+
+def walked_files(rules, root):
+    return sorted(
+        os.path.relpath(os.path.join(dirpath, filename), root)
+        for dirpath, _, filenames in rules.walk(root)
+        for filename in filenames
+    )
+
+
+def test_parse_patterns():
+    assert parse_patterns(" *.tmp, Backups/ ,,") == ("*.tmp", "Backups/")
+    assert parse_patterns(None) == ()
+
+
+def test_default_rules_prune_the_walk(tmp_path, mocker):
+    create_tree(
+        tmp_path,
+        ["photo.jpg", ".git/objects/1", "2020/@eaDir/photo.jpg/SYNOPHOTO_THUMB_M.jpg", "2020/a.jpg"],
+    )
+    is_excluded = mocker.spy(WalkRules, "_is_excluded")
+
+    assert walked_files(WalkRules(), tmp_path) == ["2020/a.jpg", "photo.jpg"]
+    # nothing under excluded directories is looked at, files are not checked without file rules
+    checked = {call.args[1] for call in is_excluded.call_args_list}
+    assert checked == {".git", "2020", "2020/@eaDir"}
+
+
+def test_rules_are_gitignore_like(tmp_path):
+    create_tree(
+        tmp_path,
+        [
+            "a.jpg",
+            "a.xmp",
+            "tmp/b.jpg",
+            "2020/tmp/c.jpg",
+            "2020/important.xmp",
+            "raw/2020/d.cr2",
+        ],
+    )
+    rules = WalkRules(["*.xmp", "!important.xmp", "/tmp/", "raw/**/*.cr2"])
+
+    assert walked_files(rules, tmp_path) == [
+        "2020/important.xmp",
+        "2020/tmp/c.jpg",
+        "a.jpg",
+    ]
+    assert rules.is_excluded("tmp", is_directory=True)
+    assert not rules.is_excluded("tmp")
+
+
+def test_excluded_files_are_not_stat(tmp_path, mocker):
+    create_tree(tmp_path, ["a.jpg", "b.tmp", ".thumbnails/a.jpg"])
+    mocker.patch(
+        "cataloguer.filesystem.directory.get_walk_rules",
+        return_value=WalkRules().extend(["*.tmp"]),
+    )
+    stat = mocker.spy(os, "stat")
+
+    directory = Directory.from_path(tmp_path)
+
+    assert [file.path.name for file in directory.files] == ["a.jpg"]
+    assert not [call for call in stat.call_args_list if str(call.args[0]).endswith("b.tmp")]
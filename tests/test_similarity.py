@@ -0,0 +1,86 @@
+import json
+import random
+
+from PIL import Image, ImageDraw
+
+from cataloguer.filesystem.file import File
+from cataloguer.filesystem.similarity import (
+    BKTree,
+    group_similar,
+    hamming_distance,
+    perceptual_hash,
+)
+
+
+def create_image(path, size=(640, 480), seed=1):
+    rng = random.Random(seed)
+    image = Image.new("RGB", (640, 480))
+    draw = ImageDraw.Draw(image)
+    for _ in range(30):
+        x, y = rng.randint(0, 640), rng.randint(0, 480)
+        draw.ellipse(
+            (x, y, x + rng.randint(20, 200), y + rng.randint(20, 200)),
+            fill=tuple(rng.randint(0, 255) for _ in range(3)),
+        )
+    image.resize(size).save(path, quality=70)
+    return path
+
+
+def test_hamming_distance():
+    assert hamming_distance(0b1011, 0b1011) == 0
+    assert hamming_distance(0b1011, 0b0010) == 2
+
+
+def test_bk_tree_search_matches_brute_force():
+    rng = random.Random(0)
+    hashes = [rng.getrandbits(64) for _ in range(500)]
+    # a few near copies
+    hashes += [value ^ (1 << rng.randrange(64)) for value in hashes[:20]]
+    tree = BKTree()
+    for index, value in enumerate(hashes):
+        tree.add(value, index)
+
+    query = hashes[3]
+    expected = sorted(
+        index
+        for index, value in enumerate(hashes)
+        if hamming_distance(query, value) <= 6
+    )
+    results = tree.search(query, 6)
+
+    assert len(tree) == len(hashes)
+    assert sorted(index for _, index in results) == expected
+    assert results[0] == (0, 3)
+
+
+def test_group_similar():
+    groups = group_similar(
+        [(0b0000, "a"), (0b0001, "b"), (0b0011, "c"), (0b1111_0000, "d")], max_distance=1
+    )
+
+    # "a" and "c" are two bits apart, but both are close to "b"
+    assert groups == [["a", "b", "c"]]
+
+
+def test_perceptual_hash_of_resized_copies(tmp_path):
+    original = perceptual_hash(create_image(tmp_path.joinpath("original.jpg")))
+    resized = perceptual_hash(
+        create_image(tmp_path.joinpath("resized.jpg"), size=(320, 240))
+    )
+    different = perceptual_hash(create_image(tmp_path.joinpath("other.jpg"), seed=2))
+
+    assert hamming_distance(original, resized) <= 6
+    assert hamming_distance(original, different) > 6
+
+
+def test_perceptual_hash_is_stored(tmp_path):
+    file = File(create_image(tmp_path.joinpath("original.jpg")))
+    assert "phash" not in file.asdict()
+
+    assert file.phash == perceptual_hash(file.path)
+    assert json.loads(json.dumps(file.asdict()))["phash"] == file.phash
+    assert File(**file.asdict()).phash == file.phash
+
+
+def test_perceptual_hash_of_non_images(text_file):
+    assert text_file.phash is None
@@ -0,0 +1,56 @@
+import os
+import time
+
+import pytest
+
+from cataloguer.filesystem.throttle import IOBudget, get_io_budget, set_io_budget
+from cataloguer.filesystem.utils import copy_file, get_hash, move_file
+from cataloguer.settings import GlobalSettings
+
+
+@pytest.fixture
+def io_budget():
+    budget = IOBudget(bytes_per_second=200_000, operations_per_second=1000)
+    set_io_budget(budget)
+    yield budget
+    set_io_budget(None)
+
+
+def test_settings_io_budget(monkeypatch, storage_path):
+    monkeypatch.setenv("CATALOGUER_STORAGE_LOCATION", str(storage_path))
+    monkeypatch.setenv("CATALOGUER_IO_BANDWIDTH", "20MB")
+    monkeypatch.setenv("CATALOGUER_IO_OPERATIONS", "300")
+
+    budget = IOBudget.from_settings(GlobalSettings())
+
+    assert budget.bytes_per_second == 20_000_000
+    assert budget.operations_per_second == 300
+    monkeypatch.delenv("CATALOGUER_IO_BANDWIDTH")
+    monkeypatch.delenv("CATALOGUER_IO_OPERATIONS")
+    assert IOBudget.from_settings(GlobalSettings()) is None
+
+
+def test_budget_throttles_hashing_and_copies(io_budget, tmp_path):
+    src_path = tmp_path.joinpath("src.bin")
+    src_path.write_bytes(os.urandom(300_000))
+    os.utime(src_path, (0, 0))
+
+    start = time.monotonic()
+    copy_file(src_path, tmp_path.joinpath("copy.bin"))
+    get_hash(tmp_path.joinpath("copy.bin"))
+    # 600 KB at 200 KB/s, the first 200 KB being the initial burst
+    assert time.monotonic() - start >= 1.8
+
+    assert src_path.read_bytes() == tmp_path.joinpath("copy.bin").read_bytes()
+    assert tmp_path.joinpath("copy.bin").stat().st_mtime == 0
+
+
+def test_move_file_within_budget(io_budget, tmp_path):
+    src_path = tmp_path.joinpath("src.bin")
+    src_path.write_bytes(b"data")
+
+    move_file(src_path, tmp_path.joinpath("moved.bin"))
+
+    assert not src_path.exists()
+    assert tmp_path.joinpath("moved.bin").read_bytes() == b"data"
+    assert get_io_budget() is io_budget
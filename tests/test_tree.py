@@ -0,0 +1,48 @@
+from rich.console import Console
+
+from cataloguer.console.tree import DirectoryTree
+from cataloguer.filesystem.file import File
+
+
+def render(tree):
+    console = Console(width=200, color_system=None)
+    with console.capture() as capture:
+        console.print(tree)
+    return capture.get()
+
+
+def test_directory_tree_counts(tmp_path):
+    tree = DirectoryTree()
+    for name in ("a/1.txt", "a/2.txt", "a/b/3.txt"):
+        tree.add_imported_file(File(tmp_path.joinpath(name), size=10), old_path=tmp_path.joinpath(name))
+
+    assert tree.file_count == 3
+    assert tree.tree[tmp_path.joinpath("a")].file_count == 3
+    assert tree.tree[tmp_path.joinpath("a")].size == 30
+    assert tree.tree[tmp_path.joinpath("a/b")].file_count == 1
+
+
+def test_directory_tree_ignores_repeated_files(tmp_path):
+    tree = DirectoryTree()
+    file = File(tmp_path.joinpath("1.txt"), size=10)
+    tree.add_imported_file(file, old_path=file.path)
+    tree.add_imported_file(file, old_path=file.path)
+
+    assert tree.file_count == 1
+
+
+def test_directory_tree_collapses_big_directories(tmp_path):
+    tree = DirectoryTree()
+    for i in range(5):
+        path = tmp_path.joinpath(f"big/{i}.txt")
+        tree.add_imported_file(File(path, size=1000), old_path=path)
+    for i in range(3):
+        path = tmp_path.joinpath(f"{i}.txt")
+        tree.add_imported_file(File(path, size=1000), old_path=path)
+
+    output = render(tree.generate_tree(tmp_path, collapse_threshold=2))
+
+    assert "big 5 files 5.00 KB" in output
+    assert "... 1 more files 1.00 KB" in output
+    assert "4.txt" not in output
+    assert "4.txt" in render(tree.generate_tree(tmp_path))
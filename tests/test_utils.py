@@ -1,7 +1,10 @@
+import os
+from pathlib import Path
+
 import pytest
 from pydantic import BaseModel
 
-from cataloguer.filesystem.utils import split_extension_from_filename
+from cataloguer.filesystem.utils import create_directories, split_extension_from_filename
 
 
 @pytest.mark.parametrize(
@@ -33,3 +36,21 @@ def test_pydantic_hash_override():
     obj_id_1_with_new_data = TestHash(id=2, data="third")
 
     assert {obj_id_1, obj_id_2, obj_id_1_with_new_data} == {obj_id_1, obj_id_2}
+
+
+def test_create_directories(tmp_path, mocker):
+    mkdir = mocker.spy(os, "mkdir")
+    directories = [
+        tmp_path.joinpath("2020", "01"),
+        tmp_path.joinpath("2020", "01"),
+        tmp_path.joinpath("2020"),
+        tmp_path.joinpath("2021", "03"),
+    ]
+
+    create_directories(directories)
+
+    assert tmp_path.joinpath("2020", "01").is_dir()
+    assert tmp_path.joinpath("2021", "03").is_dir()
+    # "2020" gets created along with "2020/01" and is not tried again
+    created = [Path(call.args[0]) for call in mkdir.call_args_list]
+    assert created.count(tmp_path.joinpath("2020")) == 1
@@ -0,0 +1,130 @@
+import json
+import time
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from cataloguer.cli import cli
+from cataloguer.console.events import OutputFormat
+from cataloguer.context import Context
+from cataloguer.filesystem.directory import Catalogue
+from cataloguer.filesystem.throttle import RateLimiter
+from cataloguer.settings import GlobalSettings
+from cataloguer.storage import Storage
+from cataloguer.verify import VerificationState, VerifyStatus, verify_records
+
+
+def create_catalogue(storage, path):
+    for name in ("a.txt", "b.txt", "c.txt"):
+        path.joinpath(name).write_text(name * 100)
+    catalogue = Catalogue(name="archive", path=path, format_pattern="{file}")
+    catalogue.explore()
+    for file in catalogue.files:
+        if file.path.name != "c.txt":
+            file.hash  # computes it, so it gets stored
+    storage.save_catalogue(catalogue)
+
+
+def test_verify_command(monkeypatch, storage_path, tmp_path):
+    monkeypatch.setenv("CATALOGUER_STORAGE_LOCATION", str(storage_path))
+    global_settings = GlobalSettings()
+    ctx = Context(
+        global_settings=global_settings,
+        storage=Storage(path=global_settings.storage_location),
+        workdir=Path.cwd(),
+        verbose=False,
+        interactive=False,
+        output=OutputFormat.NDJSON,
+    )
+    catalogue_path = tmp_path.joinpath("archive")
+    catalogue_path.mkdir()
+    create_catalogue(ctx.storage, catalogue_path)
+    catalogue_path.joinpath("a.txt").write_text("bitrot" * 50)
+    catalogue_path.joinpath("b.txt").unlink()
+
+    result = CliRunner().invoke(cli, args=("verify", "archive", "--bandwidth", "10MB"), obj=ctx)
+    assert result.exit_code == 1, result.output
+    events = [json.loads(line) for line in result.stdout.splitlines()]
+    assert {event["event"]: event["path"] for event in events[:-1]} == {
+        "mismatch": str(catalogue_path.joinpath("a.txt")),
+        "missing": str(catalogue_path.joinpath("b.txt")),
+    }
+    assert events[-1]["ok"] == 0
+    assert events[-1]["hashed"] == 1
+    assert not ctx.storage.verification_state_path("archive").exists()
+
+    # the hash computed for c.txt got stored, so it gets checked now
+    records = {record["path"].name: record for record in ctx.storage.stored_file_records("archive")}
+    assert records["c.txt"]["hash"] is not None
+    result = CliRunner().invoke(cli, args=("verify", "archive"), obj=ctx)
+    events = [json.loads(line) for line in result.stdout.splitlines()]
+    assert events[-1]["ok"] == 1
+
+
+def test_interrupted_verification_is_not_listed_as_catalogue(
+    monkeypatch, mocker, caplog, storage_path, tmp_path
+):
+    monkeypatch.setenv("CATALOGUER_STORAGE_LOCATION", str(storage_path))
+    global_settings = GlobalSettings()
+    ctx = Context(
+        global_settings=global_settings,
+        storage=Storage(path=global_settings.storage_location),
+        workdir=Path.cwd(),
+        verbose=False,
+        interactive=False,
+        output=OutputFormat.NDJSON,
+    )
+    catalogue_path = tmp_path.joinpath("archive")
+    catalogue_path.mkdir()
+    create_catalogue(ctx.storage, catalogue_path)
+
+    def interrupted_verification(records, state, **kwargs):
+        state.record(next(iter(records))["path"], VerifyStatus.OK)
+        state.save()
+        raise KeyboardInterrupt
+
+    mocker.patch("cataloguer.verify.verify_records", side_effect=interrupted_verification)
+    result = CliRunner().invoke(cli, args=("verify", "archive"), obj=ctx)
+    assert result.exit_code == 130, result.output
+    assert ctx.storage.verification_state_path("archive").exists()
+
+    assert ctx.storage.list_catalogue_names() == ["archive"]
+    result = CliRunner().invoke(cli, args=("query",), obj=ctx)
+    assert result.exit_code == 0, result.output
+    assert "Error happen" not in caplog.text
+    events = [json.loads(line) for line in result.stdout.splitlines()]
+    assert events[-1]["event"] == "summary"
+
+
+def test_verify_records_resumes(tmp_path):
+    paths = []
+    for name in ("a", "b"):
+        path = tmp_path.joinpath(name)
+        path.write_text(name)
+        paths.append(path)
+    state = VerificationState(tmp_path.joinpath("state.json"))
+    state.record(paths[0], VerifyStatus.OK)
+    state.save()
+
+    verified = []
+    verify_records(
+        ({"path": path, "size": 1, "hash": None} for path in paths),
+        VerificationState.load(state.path),
+        workers=2,
+        on_result=lambda record, status: verified.append((record["path"], status)),
+    )
+
+    assert verified == [(paths[1], VerifyStatus.HASHED)]
+    assert VerificationState.load(state.path).results == {
+        str(paths[0]): "ok",
+        str(paths[1]): "hashed",
+    }
+
+
+def test_rate_limiter():
+    rate_limiter = RateLimiter(rate=100, burst=10)
+    start = time.monotonic()
+    for _ in range(3):
+        rate_limiter.consume(10)
+    # the burst is free, the next 20 units take 0.2 seconds
+    assert time.monotonic() - start >= 0.18
@@ -0,0 +1,109 @@
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from cataloguer.cli import Operation, watch_and_ingest
+from cataloguer.console.events import EventCollector, OutputFormat
+from cataloguer.context import Context
+from cataloguer.filesystem.directory import Catalogue
+from cataloguer.filesystem.watch import Debouncer, watch_files
+from cataloguer.settings import GlobalSettings
+from cataloguer.storage import Storage
+
+FIXTURES_PATH = Path(__file__).parent.joinpath("fixtures/test-files").resolve(strict=True)
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_debouncer_batches():
+    debouncer = Debouncer(delay=1, batch_size=2)
+    debouncer.add(Path("a"), now=0)
+    debouncer.add(Path("b"), now=0.5)
+    debouncer.add(Path("c"), now=0.6)
+    debouncer.add(Path("a"), now=0.7)  # modified again
+
+    assert debouncer.ready(now=0.9) == []
+    assert debouncer.next_timeout(now=0.9) == pytest.approx(0.6)
+    assert debouncer.ready(now=1.65) == [Path("b"), Path("c")]
+    assert debouncer.ready(now=1.65) == []
+    assert debouncer.ready(now=1.7) == [Path("a")]
+    assert len(debouncer) == 0
+
+
+def test_watch_files(tmp_path):
+    existing_path = tmp_path.joinpath("existing.txt")
+    existing_path.write_text("existing")
+    stop = threading.Event()
+    batches = []
+
+    def consume():
+        for batch in watch_files(tmp_path, delay=0.1, stop=stop, poll_interval=0.05):
+            batches.append(batch)
+
+    thread = threading.Thread(target=consume)
+    thread.start()
+    try:
+        wait_for(lambda: batches == [[existing_path]])
+        tmp_path.joinpath("new").mkdir()
+        new_path = tmp_path.joinpath("new", "file.txt")
+        new_path.write_text("new")
+        wait_for(lambda: len(batches) == 2)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert batches[1] == [new_path]
+
+
+def test_watch_and_ingest(monkeypatch, storage_path, tmp_path):
+    monkeypatch.setenv("CATALOGUER_STORAGE_LOCATION", str(storage_path))
+    global_settings = GlobalSettings(unknown_format_pattern="{file}")
+    ctx = Context(
+        global_settings=global_settings,
+        storage=Storage(path=global_settings.storage_location),
+        workdir=Path.cwd(),
+        verbose=False,
+        interactive=False,
+        output=OutputFormat.NDJSON,
+    )
+    src_path = tmp_path.joinpath("ingest")
+    src_path.mkdir()
+    catalogue_path = tmp_path.joinpath("catalogue")
+    catalogue_path.mkdir()
+    catalogue = Catalogue(name="photos", path=catalogue_path, format_pattern="%Y/{file}")
+    catalogue.explore()
+
+    events = EventCollector()
+    monkeypatch.setattr("cataloguer.cli.get_event_stream", lambda ctx: events)
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=watch_and_ingest,
+        args=(ctx, src_path, catalogue, Operation.MOVE),
+        kwargs={"delay": 0.1, "batch_size": 10, "dry_run": False, "stop": stop},
+    )
+    thread.start()
+    try:
+        shutil.copy(FIXTURES_PATH.joinpath("duplicates/ffffffff.png"), src_path)
+        wait_for(lambda: catalogue_path.joinpath("ffffffff.png").exists())
+        # same content again is left where it is
+        shutil.copy(
+            FIXTURES_PATH.joinpath("duplicates/ffffffff_with_long_name.png"), src_path
+        )
+        wait_for(lambda: events.counts["detected"] == 2)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert not src_path.joinpath("ffffffff.png").exists()
+    assert src_path.joinpath("ffffffff_with_long_name.png").exists()
+    assert [event["event"] for event in events.events] == ["watching", "detected", "move", "detected"]
+    loaded_catalogue = ctx.storage.load_catalogue("photos", force_reload=False)
+    assert [file.path.name for file in loaded_catalogue.files] == ["ffffffff.png"]